@@ -0,0 +1 @@
+"""Benchmarks of urlman hot paths."""
@@ -0,0 +1,71 @@
+"""
+Measure how many urls per second can be created.
+
+Run with ``python -m benchmarks.bulk_create``.
+"""
+import asyncio
+import json
+import time
+from typing import Dict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from benchmarks.utils import bench_engine
+from urlman.db.models import UserModel
+from urlman.web.api.urls.repos.services import (
+    bulk_create_shorted_urls,
+    create_shorted_url,
+)
+from urlman.web.api.urls.schemas import UrlIn
+
+URLS_COUNT = 5000
+BULK_SIZES = (100, 1000, 5000)
+
+
+async def run() -> None:
+    """Compare single url creation with bulk creation of different sizes."""
+    results: Dict[str, float] = {}
+    async with bench_engine() as engine:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            user = UserModel(
+                username="bench",
+                email="bench@test.com",
+                password="bench",
+            )
+            session.add(user)
+            await session.commit()
+
+            started = time.perf_counter()
+            for _ in range(URLS_COUNT):
+                await create_shorted_url(
+                    url=UrlIn(url="https://bench.com"),
+                    user=user,
+                    session=session,
+                )
+            results["single"] = round(
+                URLS_COUNT / (time.perf_counter() - started),
+                1,
+            )
+
+            for bulk_size in BULK_SIZES:
+                started = time.perf_counter()
+                for _ in range(URLS_COUNT // bulk_size):
+                    await bulk_create_shorted_urls(
+                        urls=[UrlIn(url="https://bench.com")] * bulk_size,
+                        user=user,
+                        session=session,
+                    )
+                results[f"bulk_{bulk_size}"] = round(
+                    URLS_COUNT / (time.perf_counter() - started),
+                    1,
+                )
+    print(json.dumps({"urls_per_sec": results}, indent=2))
+
+
+def main() -> None:
+    """Entrypoint of the benchmark."""
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Compare query plans of the hot queries without and with the indexes.
+
+Run with ``python -m benchmarks.indexes``.
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.schema import CreateIndex, DropIndex
+
+from benchmarks.utils import bench_engine
+from urlman.db.models import TransitionModel, UrlModel
+from urlman.web.api.transitions.repos.partitions import create_partitions
+
+USERS_COUNT = 100
+URLS_COUNT = 100000
+TRANSITIONS_COUNT = 1000000
+MONTHS = 6
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+QUERIES = {
+    "redirect": (
+        "SELECT id, url, is_protected, key FROM urls "
+        "WHERE short_code = 'code500' AND is_deleted = false"
+    ),
+    "list_urls": (
+        "SELECT * FROM urls WHERE user_id = (SELECT user_id FROM urls LIMIT 1) "
+        "AND is_deleted = false ORDER BY created_at, id LIMIT 50"
+    ),
+    "recent_transitions": (
+        "SELECT * FROM transitions WHERE url_id = (SELECT id FROM urls LIMIT 1) "
+        "ORDER BY check_time DESC, id DESC LIMIT 10"
+    ),
+    "transitions_page": (
+        "SELECT * FROM transitions WHERE url_id = (SELECT id FROM urls LIMIT 1) "
+        "AND check_time >= '2026-03-01' "
+        "AND (check_time, id) > ('2026-03-01', 0) "
+        "ORDER BY check_time, id LIMIT 51"
+    ),
+    "transitions_period": (
+        "SELECT count(*) FROM transitions "
+        "WHERE check_time >= '2026-03-10' AND check_time < '2026-03-11'"
+    ),
+}
+
+
+async def seed(conn: AsyncConnection) -> None:
+    """
+    Insert urls and transitions spread over several months.
+
+    :param conn: database connection.
+    """
+    await create_partitions(
+        since=START,
+        until=START + timedelta(days=31 * (MONTHS - 1)),
+        connection=conn,
+    )
+    await conn.execute(
+        text(
+            "INSERT INTO users (id, username, email, password) "
+            "SELECT md5(n::text)::uuid, 'user' || n, n || '@test.com', '-' "
+            "FROM generate_series(1, :users) AS n",
+        ),
+        {"users": USERS_COUNT},
+    )
+    await conn.execute(
+        text(
+            "INSERT INTO urls (id, url, short_code, is_deleted, user_id, created_at) "
+            "SELECT gen_random_uuid(), 'https://example.com/' || n, 'code' || n, "
+            "n % 10 = 0, md5((n % :users + 1)::text)::uuid, "
+            "now() - n * interval '1 second' "
+            "FROM generate_series(1, :urls) AS n",
+        ),
+        {"users": USERS_COUNT, "urls": URLS_COUNT},
+    )
+    # Transitions are inserted in time order, as redirects write them.
+    await conn.execute(
+        text(
+            "INSERT INTO transitions (ip, check_time, url_id) "
+            "SELECT '127.0.0.1', "
+            "CAST(:start AS timestamptz) + n * CAST(:step AS interval), ids.id "
+            "FROM generate_series(1, :transitions) AS n "
+            "JOIN (SELECT id, row_number() OVER () AS number FROM urls) AS ids "
+            "ON ids.number = n % :urls + 1 ORDER BY n",
+        ),
+        {
+            "start": START,
+            "step": timedelta(days=30 * MONTHS) / TRANSITIONS_COUNT,
+            "transitions": TRANSITIONS_COUNT,
+            "urls": URLS_COUNT,
+        },
+    )
+
+
+def node_types(plan: Dict[str, Any]) -> List[str]:
+    """
+    Flatten plan tree to the list of its node types.
+
+    :param plan: node of the JSON plan.
+    :return: node types in depth-first order.
+    """
+    node_type = plan["Node Type"]
+    if "Index Name" in plan:
+        node_type = f"{node_type} ({plan['Index Name']})"
+    types = [node_type]
+    for child in plan.get("Plans", []):
+        types.extend(node_types(child))
+    return types
+
+
+async def explain(conn: AsyncConnection) -> Dict[str, Any]:
+    """
+    Explain and run every query.
+
+    :param conn: database connection.
+    :return: plan, execution time and read buffers of the queries.
+    """
+    await conn.execute(text("ANALYZE"))
+    explained = {}
+    for name, query in QUERIES.items():
+        result = await conn.execute(
+            text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}"),
+        )
+        plan = result.scalar()[0]
+        explained[name] = {
+            "plan": node_types(plan["Plan"]),
+            "execution_ms": plan["Execution Time"],
+            "shared_buffers": plan["Plan"].get("Shared Hit Blocks", 0)
+            + plan["Plan"].get("Shared Read Blocks", 0),
+        }
+    return explained
+
+
+async def run() -> None:
+    """Seed data, explain queries, create indexes and explain again."""
+    indexes = [
+        *UrlModel.__table__.indexes,
+        *TransitionModel.__table__.indexes,
+    ]
+    async with bench_engine() as engine:
+        async with engine.begin() as conn:
+            for index in indexes:
+                await conn.execute(DropIndex(index))
+            await seed(conn)
+        async with engine.begin() as conn:
+            before = await explain(conn)
+            for index in indexes:
+                await conn.execute(CreateIndex(index))
+            after = await explain(conn)
+    print(
+        json.dumps(
+            {name: {"before": before[name], "after": after[name]} for name in QUERIES},
+            indent=2,
+        ),
+    )
+
+
+def main() -> None:
+    """Entrypoint of the benchmark."""
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
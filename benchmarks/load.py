@@ -0,0 +1,537 @@
+"""
+Load the API served by uvicorn with mixed scenarios.
+
+A scratch database is seeded, the application is started from
+``urlman.web.application:get_app`` with ``URLMAN_WORKERS_COUNT`` workers
+and concurrent keep-alive clients send requests of every scenario
+for a fixed time. Throughput and latency percentiles of every endpoint
+are printed as JSON, so runs of different commits can be compared.
+
+Run with ``python -m benchmarks.load``.
+"""
+import argparse
+import asyncio
+import collections
+import json
+import os
+import random
+import statistics
+import subprocess  # noqa: S404
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import ujson
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from benchmarks.utils import bench_engine
+from urlman.services.hashing import hash_password
+from urlman.settings import settings
+from urlman.web.api.transitions.repos.services import backfill_rollups
+
+HOST = "127.0.0.1"
+PASSWORD = "password"
+TRANSITIONS_PER_URL = 20
+STARTUP_TIMEOUT = 60
+
+Operation = Callable[["BenchClient"], Awaitable[int]]
+
+
+class HttpConnection:
+    """Keep-alive HTTP/1.1 connection sending JSON requests."""
+
+    def __init__(self, host: str, port: int) -> None:
+        self.host = host
+        self.port = port
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        body: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Tuple[int, bytes]:
+        """
+        Send request and read the whole response.
+
+        :param method: HTTP method.
+        :param path: path with the query.
+        :param body: JSON body.
+        :param headers: extra headers.
+        :return: status code and body of the response.
+        """
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(
+                self.host,
+                self.port,
+            )
+        payload = b"" if body is None else ujson.dumps(body).encode()
+        lines = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            f"Content-Length: {len(payload)}",
+        ]
+        if body is not None:
+            lines.append("Content-Type: application/json")
+        lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        self._writer.write("\r\n".join(lines).encode() + b"\r\n\r\n" + payload)
+        try:
+            return await self._read_response()
+        except Exception:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        """Close the connection, the next request opens a new one."""
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = None
+        self._writer = None
+
+    async def _read_response(self) -> Tuple[int, bytes]:
+        reader = self._reader
+        status_line = await reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:  # noqa: WPS457
+            line = await reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, header_value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = header_value.strip()
+        if response_headers.get("transfer-encoding") == "chunked":
+            response_body = await self._read_chunks()
+        else:
+            length = int(response_headers.get("content-length", 0))
+            response_body = await reader.readexactly(length)
+        if response_headers.get("connection") == "close":
+            self.close()
+        return status, response_body
+
+    async def _read_chunks(self) -> bytes:
+        chunks = []
+        while True:  # noqa: WPS457
+            size = int((await self._reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            chunk = await self._reader.readexactly(size + 2)
+            if not size:
+                return b"".join(chunks)
+            chunks.append(chunk[:-2])
+
+
+class BenchClient:
+    """Client logged in as one of the seeded users."""
+
+    def __init__(
+        self,
+        connection: HttpConnection,
+        username: str,
+        url_ids: List[str],
+        short_codes: List[str],
+    ) -> None:
+        self.connection = connection
+        self.username = username
+        self.url_ids = url_ids
+        self.short_codes = short_codes
+        self.headers: Dict[str, str] = {}
+
+    async def login(self) -> int:
+        """
+        Get a new token of the user.
+
+        :return: status code.
+        """
+        status, response_body = await self.connection.request(
+            "POST",
+            "/api/users/login",
+            {"username": self.username, "password": PASSWORD},
+        )
+        if status == 200:
+            token = ujson.loads(response_body)["access_token"]
+            self.headers = {"Authorization": f"Bearer {token}"}
+        return status
+
+    async def redirect(self) -> int:
+        """
+        Follow a random short code.
+
+        :return: status code.
+        """
+        short_code = random.choice(self.short_codes)
+        status, _ = await self.connection.request(
+            "GET",
+            f"/api/urls/redirect/{short_code}",
+        )
+        return status
+
+    async def create_url(self) -> int:
+        """
+        Create an url with a generated short code.
+
+        :return: status code.
+        """
+        status, _ = await self.connection.request(
+            "POST",
+            "/api/urls",
+            {"url": f"https://example.com/{random.random()}"},
+            self.headers,
+        )
+        return status
+
+    async def list_urls(self) -> int:
+        """
+        Get the first page of the user urls.
+
+        :return: status code.
+        """
+        status, _ = await self.connection.request(
+            "GET", "/api/urls", None, self.headers
+        )
+        return status
+
+    async def url_transitions(self) -> int:
+        """
+        Get the first page of transitions of an url.
+
+        :return: status code.
+        """
+        status, _ = await self.connection.request(
+            "GET",
+            f"/api/urls/{random.choice(self.url_ids)}/transitions",
+            None,
+            self.headers,
+        )
+        return status
+
+    async def url_stats(self) -> int:
+        """
+        Get daily transitions of an url.
+
+        :return: status code.
+        """
+        status, _ = await self.connection.request(
+            "GET",
+            f"/api/urls/{random.choice(self.url_ids)}/stats",
+            None,
+            self.headers,
+        )
+        return status
+
+
+# Weights of the operations in every scenario.
+SCENARIOS: Dict[str, Dict[str, int]] = {
+    "redirect_heavy": {"redirect": 95, "create_url": 5},
+    "create_heavy": {"create_url": 80, "redirect": 20},
+    "reads": {"list_urls": 40, "url_transitions": 30, "url_stats": 30},
+    "logins": {"login": 100},
+}
+
+
+async def seed(conn: AsyncConnection, users: int, urls: int) -> None:
+    """
+    Insert users with urls, transitions of the urls and their rollups.
+
+    :param conn: database connection.
+    :param users: number of users.
+    :param urls: number of urls of every user.
+    """
+    await conn.execute(
+        text(
+            "INSERT INTO users (id, username, email, password, is_deleted) "
+            "SELECT md5(n::text)::uuid, 'bench' || n, 'bench' || n || '@test.com', "
+            ":password, false FROM generate_series(1, :users) AS n",
+        ),
+        {"users": users, "password": hash_password(PASSWORD)},
+    )
+    await conn.execute(
+        text(
+            "INSERT INTO urls (id, url, short_code, is_protected, is_deleted, "
+            "user_id, created_at, updated_at) "
+            "SELECT gen_random_uuid(), 'https://example.com/' || n, 'bench' || n, "
+            "false, false, md5((n % :users + 1)::text)::uuid, now(), now() "
+            "FROM generate_series(1, :urls) AS n",
+        ),
+        {"users": users, "urls": users * urls},
+    )
+    await conn.execute(
+        text(
+            "INSERT INTO transitions (ip, check_time, url_id) "
+            "SELECT '127.0.0.1', now() - n * interval '1 hour', id "
+            "FROM urls, generate_series(1, :transitions) AS n",
+        ),
+        {"transitions": TRANSITIONS_PER_URL},
+    )
+    # The scratch database has every transition, count them all.
+    await backfill_rollups(
+        connection=conn,
+        since=datetime.min.replace(tzinfo=timezone.utc),
+    )
+
+
+async def load_clients(
+    conn: AsyncConnection,
+    port: int,
+    concurrency: int,
+) -> List[BenchClient]:
+    """
+    Create clients spread over the seeded users.
+
+    :param conn: database connection.
+    :param port: port of the server.
+    :param concurrency: number of clients.
+    :return: clients, not logged in yet.
+    """
+    rows = (
+        await conn.execute(
+            text(
+                "SELECT users.username, urls.id::text, urls.short_code "
+                "FROM urls JOIN users ON users.id = urls.user_id",
+            ),
+        )
+    ).all()
+    short_codes = [short_code for _, _, short_code in rows]
+    url_ids: Dict[str, List[str]] = {}
+    for username, url_id, _ in rows:
+        url_ids.setdefault(username, []).append(url_id)
+    usernames = sorted(url_ids)
+    return [
+        BenchClient(
+            HttpConnection(HOST, port),
+            usernames[number % len(usernames)],
+            url_ids[usernames[number % len(usernames)]],
+            short_codes,
+        )
+        for number in range(concurrency)
+    ]
+
+
+def start_server(port: int, workers: int) -> subprocess.Popen:  # type: ignore
+    """
+    Start uvicorn serving the application from the scratch database.
+
+    :param port: port to listen.
+    :param workers: number of uvicorn workers.
+    :return: server process.
+    """
+    env = {**os.environ, "URLMAN_DB_BASE": settings.db_base}
+    return subprocess.Popen(  # noqa: S603
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "urlman.web.application:get_app",
+            "--factory",
+            "--host",
+            HOST,
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--no-access-log",
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+    )
+
+
+async def wait_for_server(port: int) -> None:
+    """
+    Wait until the health check answers.
+
+    :param port: port of the server.
+    :raises RuntimeError: if the server did not start in time.
+    """
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        connection = HttpConnection(HOST, port)
+        try:
+            status, _ = await connection.request("GET", "/api/health")
+        except OSError:
+            await asyncio.sleep(0.2)
+            continue
+        finally:
+            connection.close()
+        if status == 200:
+            return
+    raise RuntimeError("Server did not start")
+
+
+async def run_client(
+    client: BenchClient,
+    weights: Dict[str, int],
+    deadline: float,
+    timings: Dict[str, List[Tuple[float, int]]],
+) -> None:
+    """
+    Send requests of the scenario until the deadline.
+
+    :param client: logged in client.
+    :param weights: weights of the operations.
+    :param deadline: monotonic time to stop at.
+    :param timings: durations and statuses by operations.
+    """
+    names = list(weights)
+    operations: Dict[str, Operation] = {
+        name: getattr(BenchClient, name) for name in names
+    }
+    while time.monotonic() < deadline:
+        name = random.choices(names, weights=[weights[op] for op in names])[0]
+        started = time.perf_counter()
+        try:
+            status = await operations[name](client)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            status = 0
+        timings[name].append((time.perf_counter() - started, status))
+
+
+def summarize_requests(
+    timings: List[Tuple[float, int]],
+    elapsed: float,
+) -> Dict[str, float]:
+    """
+    Summarize requests of an endpoint.
+
+    :param timings: durations and statuses of the requests.
+    :param elapsed: duration of the scenario in seconds.
+    :return: requests, errors by status codes, RPS and latency percentiles
+        in milliseconds, failed connections have status 0.
+    """
+    durations = [duration for duration, _ in timings]
+    if len(durations) > 1:
+        quantiles = statistics.quantiles(durations, n=100)
+    else:
+        # Too few requests for percentiles.
+        quantiles = (durations or [0.0]) * 99
+
+    def percentile(number: int) -> float:
+        return round(quantiles[number - 1] * 1000, 3)
+
+    return {
+        "requests": len(timings),
+        "errors": dict(
+            collections.Counter(
+                str(status) for _, status in timings if not 200 <= status < 400
+            ),
+        ),
+        "rps": round(len(timings) / elapsed, 1),
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+    }
+
+
+async def run_scenario(
+    clients: List[BenchClient],
+    weights: Dict[str, int],
+    duration: float,
+) -> Dict[str, Any]:
+    """
+    Run all clients through the scenario.
+
+    :param clients: logged in clients.
+    :param weights: weights of the operations.
+    :param duration: seconds to run.
+    :return: summary of all requests and of every endpoint.
+    """
+    timings: Dict[str, List[Tuple[float, int]]] = {name: [] for name in weights}
+    started = time.monotonic()
+    await asyncio.gather(
+        *(
+            run_client(client, weights, started + duration, timings)
+            for client in clients
+        ),
+    )
+    elapsed = time.monotonic() - started
+    return {
+        "total": summarize_requests(
+            [timing for endpoint in timings.values() for timing in endpoint],
+            elapsed,
+        ),
+        "endpoints": {
+            name: summarize_requests(endpoint, elapsed)
+            for name, endpoint in timings.items()
+        },
+    }
+
+
+def current_commit() -> Optional[str]:
+    """
+    Get commit of the benchmarked code.
+
+    :return: hash of HEAD or None outside of a git checkout.
+    """
+    try:
+        return subprocess.check_output(  # noqa: S603, S607
+            ["git", "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args: argparse.Namespace) -> None:
+    """
+    Seed the database, start the server and run the scenarios.
+
+    :param args: command line arguments.
+    """
+    results: Dict[str, Any] = {
+        "commit": current_commit(),
+        "workers": args.workers,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "scenarios": {},
+    }
+    async with bench_engine() as engine:
+        async with engine.begin() as conn:
+            await seed(conn, args.users, args.urls)
+        async with engine.connect() as conn:
+            clients = await load_clients(conn, args.port, args.concurrency)
+        server = start_server(args.port, args.workers)
+        try:
+            await wait_for_server(args.port)
+            for client in clients:
+                await client.login()
+            for name in args.scenarios:
+                weights = SCENARIOS[name]
+                if args.warmup:
+                    await run_scenario(clients, weights, args.warmup)
+                results["scenarios"][name] = await run_scenario(
+                    clients,
+                    weights,
+                    args.duration,
+                )
+        finally:
+            for client in clients:
+                client.connection.close()
+            server.terminate()
+            server.wait()
+    print(json.dumps(results, indent=2))
+
+
+def main() -> None:
+    """Entrypoint of the benchmark."""
+    parser = argparse.ArgumentParser(description="Load the API with scenarios.")
+    parser.add_argument("--workers", type=int, default=settings.workers_count)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--urls", type=int, default=100, help="urls of every user")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        choices=list(SCENARIOS),
+        default=list(SCENARIOS),
+    )
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Measure redirect latency while logins hash passwords.
+
+Requests are sent straight to the ASGI application,
+so redirects and logins share one event loop as on a worker.
+
+Run with ``python -m benchmarks.password_hashing``.
+"""
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Tuple
+
+import ujson
+from fastapi import FastAPI
+from sqlalchemy import insert
+
+from benchmarks.utils import bench_engine, summarize
+from urlman.db.models import UrlModel, UserModel
+from urlman.services.hashing import hash_password
+from urlman.settings import settings
+from urlman.web.application import get_app
+
+REDIRECTS = 300
+CONCURRENT_LOGINS = 8
+POOL_WORKERS = 4
+
+
+async def request(
+    app: FastAPI,
+    method: str,
+    path: str,
+    body: bytes = b"",
+) -> int:
+    """
+    Send request to the application without a server.
+
+    :param app: application.
+    :param method: HTTP method.
+    :param path: path of the request.
+    :param body: JSON body.
+    :return: status code of the response.
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 8000),
+    }
+    messages: List[Dict[str, Any]] = [
+        {"type": "http.request", "body": body, "more_body": False},
+    ]
+    statuses: List[int] = []
+
+    async def receive() -> Dict[str, Any]:
+        if messages:
+            return messages.pop()
+        await asyncio.sleep(3600)
+        return {"type": "http.disconnect"}
+
+    async def send(message: Dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    await app(scope, receive, send)
+    return statuses[0]
+
+
+async def login_forever(app: FastAPI) -> None:
+    """
+    Log in the benchmark user in a loop.
+
+    :param app: application.
+    """
+    credentials = ujson.dumps({"username": "bench", "password": "password"})
+    while True:  # noqa: WPS457
+        await request(app, "POST", "/api/users/login", credentials.encode())
+
+
+async def measure_redirects(app: FastAPI, logins: int) -> Dict[str, float]:
+    """
+    Time redirects while logins run concurrently.
+
+    :param app: application.
+    :param logins: number of concurrent login loops.
+    :return: summary of the redirects.
+    """
+    login_tasks = [asyncio.create_task(login_forever(app)) for _ in range(logins)]
+    timings = []
+    try:
+        for _ in range(REDIRECTS):
+            started = time.perf_counter()
+            await request(app, "GET", "/api/urls/redirect/bench")
+            timings.append(time.perf_counter() - started)
+    finally:
+        for task in login_tasks:
+            task.cancel()
+        await asyncio.gather(*login_tasks, return_exceptions=True)
+    return summarize(timings)
+
+
+async def run_app(workers: int) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """
+    Start application with the given hashing processes and measure it.
+
+    :param workers: processes hashing passwords, 0 hashes in the event loop.
+    :return: redirects without and with concurrent logins.
+    """
+    settings.password_hash_workers = workers
+    app = get_app()
+    await app.router.startup()
+    try:
+        idle = await measure_redirects(app, 0)
+        loaded = await measure_redirects(app, CONCURRENT_LOGINS)
+    finally:
+        await app.router.shutdown()
+    return idle, loaded
+
+
+async def run() -> None:
+    """Seed an url and a user and measure redirects with both hashers."""
+    async with bench_engine() as engine:
+        async with engine.begin() as conn:
+            user_id = await conn.scalar(
+                insert(UserModel)
+                .values(
+                    username="bench",
+                    email="bench@test.com",
+                    password=hash_password("password"),
+                )
+                .returning(UserModel.id),
+            )
+            await conn.execute(
+                insert(UrlModel).values(
+                    url="https://example.com",
+                    short_code="bench",
+                    user_id=user_id,
+                    is_deleted=False,
+                ),
+            )
+        results = {}
+        for name, workers in (("event_loop", 0), ("process_pool", POOL_WORKERS)):
+            idle, loaded = await run_app(workers)
+            results[name] = {"idle": idle, "during_logins": loaded}
+    print(json.dumps(results, indent=2))
+
+
+def main() -> None:
+    """Entrypoint of the benchmark."""
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Compare ORM and prepared asyncpg lookups of the redirect target.
+
+Run with ``python -m benchmarks.redirect_lookup``.
+"""
+import asyncio
+import json
+import random
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from benchmarks.utils import bench_engine, measure
+from urlman.db.models import UrlModel, UserModel
+from urlman.web.api.urls.repos.selectors import (
+    fetch_redirect_by_shortcode,
+    get_url_by_shortcode,
+)
+
+URLS_COUNT = 10000
+ITERATIONS = 20000
+
+
+async def run() -> None:
+    """Seed urls and measure both lookups on the same session."""
+    async with bench_engine() as engine:
+        async with engine.begin() as conn:
+            user_id = await conn.scalar(
+                insert(UserModel)
+                .values(username="bench", email="bench@test.com", password="-")
+                .returning(UserModel.id),
+            )
+            await conn.execute(
+                insert(UrlModel),
+                [
+                    {
+                        "url": f"https://example.com/{number}",
+                        "short_code": f"code{number}",
+                        "user_id": user_id,
+                        "is_deleted": False,
+                    }
+                    for number in range(URLS_COUNT)
+                ],
+            )
+
+        def random_code() -> str:
+            return f"code{random.randrange(URLS_COUNT)}"
+
+        async with AsyncSession(engine) as session:
+            results = {
+                "orm": await measure(
+                    lambda: get_url_by_shortcode(random_code(), session),
+                    ITERATIONS,
+                ),
+                "prepared": await measure(
+                    lambda: fetch_redirect_by_shortcode(random_code(), session),
+                    ITERATIONS,
+                ),
+            }
+    print(json.dumps(results, indent=2))
+
+
+def main() -> None:
+    """Entrypoint of the benchmark."""
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Measure how many short codes per second can be generated.
+
+Run with ``python -m benchmarks.shortcodes``.
+"""
+import asyncio
+import json
+import time
+from typing import Awaitable, Callable, Dict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from benchmarks.utils import bench_engine
+from urlman.services.generators import ShortCodeAllocator
+from urlman.settings import settings
+
+CODES_COUNT = 100000
+BLOCK_SIZES = (1, 100, 1000)
+
+
+async def codes_per_second(generate: Callable[[], Awaitable[object]]) -> float:
+    """
+    Generate codes one by one and measure the rate.
+
+    :param generate: coroutine function generating one code.
+    :return: codes per second.
+    """
+    started = time.perf_counter()
+    for _ in range(CODES_COUNT):
+        await generate()
+    return round(CODES_COUNT / (time.perf_counter() - started), 1)
+
+
+async def run() -> None:
+    """Compare sequence allocator blocks of different sizes."""
+    results: Dict[str, float] = {}
+    async with bench_engine() as engine:
+        async with AsyncSession(engine) as session:
+            for block_size in BLOCK_SIZES:
+                allocator = ShortCodeAllocator(
+                    alphabet=settings.shortcode_alphabet,
+                    length=settings.shortcode_length,
+                    block_size=block_size,
+                )
+                results[f"allocator_block_{block_size}"] = await codes_per_second(
+                    lambda: allocator.allocate(session),  # noqa: B023
+                )
+    print(json.dumps(results, indent=2))
+
+
+def main() -> None:
+    """Entrypoint of the benchmark."""
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import os
+import statistics
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, Awaitable, Callable, Dict, List
+
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from urlman.settings import settings
+
+
+@asynccontextmanager
+async def bench_engine() -> AsyncGenerator[AsyncEngine, None]:
+    """
+    Create a scratch database for a benchmark and drop it afterwards.
+
+    The database name is taken from ``URLMAN_BENCH_DB_BASE``,
+    so the benchmark never touches the application database.
+
+    :yield: engine connected to the scratch database.
+    """
+    from urlman.db.meta import meta
+    from urlman.db.models import load_all_models
+    from urlman.db.utils import create_database, drop_database
+
+    settings.db_base = os.environ.get("URLMAN_BENCH_DB_BASE", "urlman_bench")
+    load_all_models()
+    await create_database()
+    engine = create_async_engine(str(settings.db_url))
+    async with engine.begin() as conn:
+        await conn.run_sync(meta.create_all)
+    try:
+        yield engine
+    finally:
+        await engine.dispose()
+        await drop_database()
+
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    """
+    Summarize durations of benchmarked calls.
+
+    :param timings: durations of the calls in seconds.
+    :return: calls per second and latency percentiles in milliseconds.
+    """
+    quantiles = statistics.quantiles(timings, n=100)
+    return {
+        "calls": len(timings),
+        "ops_per_sec": round(len(timings) / sum(timings), 1),
+        "p50_ms": round(quantiles[49] * 1000, 4),
+        "p95_ms": round(quantiles[94] * 1000, 4),
+        "p99_ms": round(quantiles[98] * 1000, 4),
+    }
+
+
+async def measure(
+    func: Callable[[], Awaitable[object]],
+    iterations: int,
+) -> Dict[str, float]:
+    """
+    Call coroutine function sequentially and summarize its latency.
+
+    :param func: benchmarked coroutine function.
+    :param iterations: number of calls.
+    :return: summary of the calls.
+    """
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await func()
+        timings.append(time.perf_counter() - started)
+    return summarize(timings)
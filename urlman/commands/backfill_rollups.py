@@ -0,0 +1,37 @@
+"""
+Recalculate hourly and daily transitions counts.
+
+Run with ``python -m urlman.commands.backfill_rollups``.
+Only counts since the oldest complete day of transitions are rebuilt,
+counts of transitions dropped by retention are kept.
+
+The transaction holds ``LOCK TABLE transitions IN SHARE MODE``
+until the counts are rebuilt, so no transitions are written meanwhile:
+the writers of the workers keep them buffered and drop the overflow
+of ``URLMAN_TRANSITIONS_BUFFER_SIZE``. Run it off-peak.
+"""
+import asyncio
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from urlman.settings import settings
+from urlman.web.api.transitions.repos.services import backfill_rollups
+
+
+async def run() -> None:
+    """Rebuild rollups in a single transaction."""
+    engine = create_async_engine(str(settings.db_url), echo=settings.db_echo)
+    try:
+        async with engine.begin() as conn:
+            await backfill_rollups(connection=conn)
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    """Entrypoint of the command."""
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Import urls of a user from a CSV or NDJSON file.
+
+Run with ``python -m urlman.commands.import_urls --username johndoe urls.csv``.
+CSV files must have a header with any of url, short_code,
+is_protected and key columns. The summary is printed as JSON.
+"""
+import argparse
+import asyncio
+from typing import AsyncIterator, BinaryIO
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from urlman.settings import settings
+from urlman.web.api.urls.repos.importer import import_urls, iter_records
+from urlman.web.api.users.repos.selectors import get_user_by_username
+
+READ_SIZE = 1024 * 1024
+
+
+async def read_chunks(file: BinaryIO) -> AsyncIterator[bytes]:
+    """
+    Read file by chunks.
+
+    :param file: file opened in binary mode.
+    :yield: chunks of the file.
+    """
+    while True:
+        chunk = file.read(READ_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def run(path: str, username: str, import_format: str) -> None:
+    """
+    Import file in batches.
+
+    :param path: path to the file.
+    :param username: owner of the urls.
+    :param import_format: "csv" or "ndjson".
+    :raises SystemExit: if the user doesn't exist.
+    """
+    engine = create_async_engine(str(settings.db_url), echo=settings.db_echo)
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            user = await get_user_by_username(username=username, session=session)
+            if user is None:
+                raise SystemExit(f"User {username} not found")
+            with open(path, "rb") as file:
+                import_result = await import_urls(
+                    records=iter_records(read_chunks(file), import_format),
+                    user=user,
+                    session=session,
+                )
+    finally:
+        await engine.dispose()
+    print(import_result.json(indent=2))
+
+
+def main() -> None:
+    """Entrypoint of the command."""
+    parser = argparse.ArgumentParser(description="Import urls from a file.")
+    parser.add_argument("path")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--format", choices=("csv", "ndjson"), default=None)
+    args = parser.parse_args()
+    import_format = args.format
+    if import_format is None:
+        import_format = "ndjson" if args.path.endswith(".ndjson") else "csv"
+    asyncio.run(run(args.path, args.username, import_format))
+
+
+if __name__ == "__main__":
+    main()
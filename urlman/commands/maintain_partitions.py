@@ -0,0 +1,45 @@
+"""
+Create future partitions of transitions and drop expired ones.
+
+Run with ``python -m urlman.commands.maintain_partitions``, e.g. daily by cron.
+Partitions which end more than ``URLMAN_TRANSITIONS_RETENTION_DAYS`` ago
+are dropped, nothing is dropped if the setting is not set.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from urlman.settings import settings
+from urlman.web.api.transitions.repos.partitions import (
+    create_future_partitions,
+    drop_expired_partitions,
+)
+
+
+async def run() -> None:
+    """Create partitions, then drop expired ones in separate transactions."""
+    engine = create_async_engine(str(settings.db_url), echo=settings.db_echo)
+    now = datetime.now(timezone.utc)
+    try:
+        async with engine.begin() as conn:
+            created = await create_future_partitions(conn, now=now)
+        dropped = []
+        if settings.transitions_retention_days is not None:
+            dropped = await drop_expired_partitions(
+                before=now - timedelta(days=settings.transitions_retention_days),
+                engine=engine,
+            )
+    finally:
+        await engine.dispose()
+    print(f"Created: {', '.join(created) or '-'}")
+    print(f"Dropped: {', '.join(dropped) or '-'}")
+
+
+def main() -> None:
+    """Entrypoint of the command."""
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
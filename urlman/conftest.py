@@ -1,6 +1,6 @@
 import asyncio
 import sys
-from typing import AsyncGenerator, Generator
+from typing import AsyncGenerator, Dict, Generator
 
 import nest_asyncio
 import pytest
@@ -14,10 +14,15 @@ from sqlalchemy.ext.asyncio import (
 )
 from sqlalchemy.orm import sessionmaker
 
-from urlman.db.dependencies import get_db_session
+from urlman.db.dependencies import get_db_read_session, get_db_session
 from urlman.db.utils import create_database, drop_database
 from urlman.settings import settings
+from urlman.web.api.transitions.dependencies import get_transition_writer
+from urlman.web.api.transitions.repos.writer import TransitionWriter
+from urlman.web.api.urls.repos.selectors import url_cache
+from urlman.web.api.users.repos.selectors import user_cache
 from urlman.web.application import get_app
+from urlman.web.metrics import listen_queries
 
 nest_asyncio.apply()
 
@@ -62,6 +67,7 @@ async def _engine() -> AsyncGenerator[AsyncEngine, None]:
     engine = create_async_engine(str(settings.db_url))
     async with engine.begin() as conn:
         await conn.run_sync(meta.create_all)
+    listen_queries(engine, "primary")
 
     try:
         yield engine
@@ -116,9 +122,34 @@ async def transaction(_engine: AsyncEngine) -> AsyncGenerator[AsyncConnection, N
         await conn.rollback()
 
 
+@pytest.fixture(autouse=True)
+@pytest.mark.asyncio
+async def _clear_caches() -> AsyncGenerator[None, None]:
+    """
+    Clear worker caches, because every test rolls its data back.
+
+    :yield: nothing.
+    """
+    yield
+    await url_cache.clear()
+    await user_cache.clear()
+
+
+@pytest.fixture()
+def transition_writer(_engine: AsyncEngine) -> TransitionWriter:
+    """
+    Create transitions writer which is flushed only explicitly.
+
+    :param _engine: current engine.
+    :return: transition writer.
+    """
+    return TransitionWriter(engine=_engine)
+
+
 @pytest.fixture()
 def fastapi_app(
     dbsession: AsyncSession,
+    transition_writer: TransitionWriter,
 ) -> FastAPI:
     """
     Fixture for creating FastAPI app.
@@ -127,6 +158,10 @@ def fastapi_app(
     """
     application = get_app()
     application.dependency_overrides[get_db_session] = lambda: dbsession
+    application.dependency_overrides[get_db_read_session] = lambda: dbsession
+    application.dependency_overrides[get_transition_writer] = lambda: (
+        transition_writer
+    )
 
     return application
 
@@ -142,3 +177,21 @@ def client(
     :return: client for the app.
     """
     return TestClient(app=fastapi_app)
+
+
+@pytest.fixture()
+def auth_headers(fastapi_app: FastAPI, client: TestClient) -> Dict[str, str]:
+    """
+    Register user and get authorization headers with his token.
+
+    :param fastapi_app: the application.
+    :param client: client for the app.
+    :return: headers with bearer token.
+    """
+    credentials = {"username": "johndoe", "password": "password"}
+    client.post(
+        fastapi_app.url_path_for("create_user"),
+        json={**credentials, "email": "johndoe@test.com"},
+    )
+    response = client.post(fastapi_app.url_path_for("login"), json=credentials)
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
@@ -18,3 +18,28 @@ async def get_db_session(request: Request) -> AsyncGenerator[AsyncSession, None]
     finally:
         await session.commit()
         await session.close()
+
+
+async def get_db_read_session(
+    request: Request,
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Create and get session for reads which may lag behind writes.
+
+    The session is bound to the read replica while it is available,
+    otherwise to the primary database.
+
+    :param request: current request.
+    :yield: database session.
+    """
+    replica = request.app.state.db_replica
+    if (replica is not None) and replica.is_available():
+        session: AsyncSession = request.app.state.db_read_session_factory()
+    else:
+        session = request.app.state.db_session_factory()
+
+    try:
+        yield session
+    finally:
+        await session.commit()
+        await session.close()
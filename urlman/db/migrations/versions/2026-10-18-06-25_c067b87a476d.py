@@ -0,0 +1,46 @@
+"""Add hourly and daily transitions rollups
+
+Revision ID: c067b87a476d
+Revises: 579318267e25
+Create Date: 2026-10-18 06:25:44.990554
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "c067b87a476d"
+down_revision = "579318267e25"
+branch_labels = None
+depends_on = None
+
+ROLLUPS = {
+    "transitions_hourly": "hour",
+    "transitions_daily": "day",
+}
+
+
+def upgrade() -> None:
+    for table_name, precision in ROLLUPS.items():
+        op.create_table(
+            table_name,
+            sa.Column("url_id", postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column("bucket", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("count", sa.BigInteger(), nullable=False),
+            sa.ForeignKeyConstraint(["url_id"], ["urls.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("url_id", "bucket"),
+        )
+        op.execute(
+            f"INSERT INTO {table_name} (url_id, bucket, count) "
+            f"SELECT url_id, date_trunc('{precision}', check_time "
+            "AT TIME ZONE 'UTC') AT TIME ZONE 'UTC', count(*) "
+            "FROM transitions "
+            "WHERE url_id IS NOT NULL AND check_time IS NOT NULL "
+            "GROUP BY 1, 2",
+        )
+
+
+def downgrade() -> None:
+    for table_name in ROLLUPS:
+        op.drop_table(table_name)
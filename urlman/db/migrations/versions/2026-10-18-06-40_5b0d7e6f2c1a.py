@@ -0,0 +1,23 @@
+"""Add sequence of generated short codes
+
+Revision ID: 5b0d7e6f2c1a
+Revises: c067b87a476d
+Create Date: 2026-10-18 06:40:12.118203
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5b0d7e6f2c1a"
+down_revision = "c067b87a476d"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(sa.schema.CreateSequence(sa.Sequence("short_code_seq")))
+
+
+def downgrade() -> None:
+    op.execute(sa.schema.DropSequence(sa.Sequence("short_code_seq")))
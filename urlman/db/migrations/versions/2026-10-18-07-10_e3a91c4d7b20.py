@@ -0,0 +1,140 @@
+"""Partition transitions by months of check_time
+
+Revision ID: e3a91c4d7b20
+Revises: 5b0d7e6f2c1a
+Create Date: 2026-10-18 07:10:37.402113
+
+Transitions are copied to the partitioned table in one transaction,
+so the migration takes as long as rewriting the whole table.
+Transitions without check_time are kept in the default partition
+with the Unix epoch as check_time.
+"""
+from datetime import datetime, timezone
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "e3a91c4d7b20"
+down_revision = "5b0d7e6f2c1a"
+branch_labels = None
+depends_on = None
+
+PARTITIONS_AHEAD = 3
+
+
+def _next_month(start: datetime) -> datetime:
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def _month_start(moment: datetime) -> datetime:
+    return moment.astimezone(timezone.utc).replace(
+        day=1,
+        hour=0,
+        minute=0,
+        second=0,
+        microsecond=0,
+    )
+
+
+def upgrade() -> None:
+    op.rename_table("transitions", "transitions_old")
+    op.execute(
+        "ALTER TABLE transitions_old "
+        "RENAME CONSTRAINT transitions_pkey TO transitions_old_pkey",
+    )
+    op.execute(
+        "ALTER TABLE transitions_old "
+        "RENAME CONSTRAINT transitions_url_id_fkey TO transitions_old_url_id_fkey",
+    )
+    op.execute("ALTER SEQUENCE transitions_id_seq OWNED BY NONE")
+    op.create_table(
+        "transitions",
+        sa.Column(
+            "id",
+            sa.Integer(),
+            server_default=sa.text("nextval('transitions_id_seq')"),
+            nullable=False,
+        ),
+        sa.Column("ip", sa.String(length=255), nullable=True),
+        sa.Column("check_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("url_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["url_id"],
+            ["urls.id"],
+        ),
+        sa.PrimaryKeyConstraint("id", "check_time"),
+        postgresql_partition_by="RANGE (check_time)",
+    )
+    op.execute("ALTER SEQUENCE transitions_id_seq OWNED BY transitions.id")
+    op.execute("CREATE TABLE transitions_default PARTITION OF transitions DEFAULT")
+
+    # Partitions of the months having transitions and of the months ahead.
+    months = set(
+        op.get_bind()
+        .scalars(
+            sa.text(
+                "SELECT DISTINCT date_trunc('month', check_time AT TIME ZONE 'UTC') "
+                "AT TIME ZONE 'UTC' FROM transitions_old "
+                "WHERE check_time IS NOT NULL",
+            ),
+        )
+        .all(),
+    )
+    month = _month_start(datetime.now(timezone.utc))
+    for _ in range(PARTITIONS_AHEAD + 1):
+        months.add(month)
+        month = _next_month(month)
+    for start in sorted(months):
+        start = _month_start(start)
+        op.execute(
+            f"CREATE TABLE transitions_p{start:%Y%m} PARTITION OF transitions "
+            f"FOR VALUES FROM ('{start.isoformat()}') "
+            f"TO ('{_next_month(start).isoformat()}')",
+        )
+
+    op.execute(
+        "INSERT INTO transitions (id, ip, check_time, url_id) "
+        "SELECT id, ip, coalesce(check_time, to_timestamp(0)), url_id "
+        "FROM transitions_old",
+    )
+    op.drop_table("transitions_old")
+
+
+def downgrade() -> None:
+    op.create_table(
+        "transitions_old",
+        sa.Column(
+            "id",
+            sa.Integer(),
+            server_default=sa.text("nextval('transitions_id_seq')"),
+            nullable=False,
+        ),
+        sa.Column("ip", sa.String(length=255), nullable=True),
+        sa.Column("check_time", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("url_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["url_id"],
+            ["urls.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.execute(
+        "INSERT INTO transitions_old (id, ip, check_time, url_id) "
+        "SELECT id, ip, check_time, url_id FROM transitions",
+    )
+    op.execute("ALTER SEQUENCE transitions_id_seq OWNED BY NONE")
+    op.drop_table("transitions")
+    op.rename_table("transitions_old", "transitions")
+    op.execute(
+        "ALTER TABLE transitions "
+        "RENAME CONSTRAINT transitions_old_pkey TO transitions_pkey",
+    )
+    op.execute(
+        "ALTER TABLE transitions "
+        "RENAME CONSTRAINT transitions_old_url_id_fkey TO transitions_url_id_fkey",
+    )
+    op.execute("ALTER SEQUENCE transitions_id_seq OWNED BY transitions.id")
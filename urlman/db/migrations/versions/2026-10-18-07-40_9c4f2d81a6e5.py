@@ -0,0 +1,91 @@
+"""Add indexes of redirects, url lists and transitions
+
+Revision ID: 9c4f2d81a6e5
+Revises: e3a91c4d7b20
+Create Date: 2026-10-18 07:40:09.651844
+
+Indexes are built CONCURRENTLY, so tables stay writable.
+Partitioned transitions can't be indexed concurrently at once:
+the index is created on the parent only, then on every partition
+concurrently, and the partition indexes are attached to it.
+"""
+from typing import List
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9c4f2d81a6e5"
+down_revision = "e3a91c4d7b20"
+branch_labels = None
+depends_on = None
+
+TRANSITIONS_INDEXES = {
+    "ix_transitions_url_id_check_time": "btree (url_id, check_time, id)",
+    "ix_transitions_check_time_brin": "brin (check_time)",
+}
+
+
+def _transitions_partitions() -> List[str]:
+    return (
+        op.get_bind()
+        .scalars(
+            sa.text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE pg_inherits.inhparent = 'transitions'::regclass "
+                "ORDER BY child.relname",
+            ),
+        )
+        .all()
+    )
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_urls_short_code_active",
+            "urls",
+            ["short_code"],
+            postgresql_include=["id", "url", "is_protected", "key"],
+            postgresql_where=sa.text("is_deleted = false"),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_urls_user_id_created_at_active",
+            "urls",
+            ["user_id", "created_at", "id"],
+            postgresql_where=sa.text("is_deleted = false"),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_urls_created_at",
+            "urls",
+            ["created_at"],
+            postgresql_concurrently=True,
+        )
+        for index_name, definition in TRANSITIONS_INDEXES.items():
+            op.execute(
+                f"CREATE INDEX {index_name} ON ONLY transitions USING {definition}",
+            )
+            for partition in _transitions_partitions():
+                partition_index = f"{partition}_{index_name[3:]}"
+                op.execute(
+                    f"CREATE INDEX CONCURRENTLY {partition_index} "
+                    f"ON {partition} USING {definition}",
+                )
+                op.execute(
+                    f"ALTER INDEX {index_name} ATTACH PARTITION {partition_index}",
+                )
+
+
+def downgrade() -> None:
+    for index_name in TRANSITIONS_INDEXES:
+        op.drop_index(index_name, table_name="transitions")
+    with op.get_context().autocommit_block():
+        for index_name in (
+            "ix_urls_created_at",
+            "ix_urls_user_id_created_at_active",
+            "ix_urls_short_code_active",
+        ):
+            op.drop_index(index_name, table_name="urls", postgresql_concurrently=True)
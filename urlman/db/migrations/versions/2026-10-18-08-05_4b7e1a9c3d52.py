@@ -0,0 +1,26 @@
+"""Add revocation time of users tokens
+
+Revision ID: 4b7e1a9c3d52
+Revises: 9c4f2d81a6e5
+Create Date: 2026-10-18 08:05:21.318407
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "4b7e1a9c3d52"
+down_revision = "9c4f2d81a6e5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column("tokens_revoked_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("users", "tokens_revoked_at")
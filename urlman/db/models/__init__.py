@@ -2,6 +2,10 @@ import pkgutil
 from pathlib import Path
 
 from urlman.db.models.transition import TransitionModel
+from urlman.db.models.transition_rollup import (
+    TransitionDailyModel,
+    TransitionHourlyModel,
+)
 from urlman.db.models.urls import UrlModel
 from urlman.db.models.user import UserModel
 
@@ -21,5 +25,7 @@ __all__ = [
     "UrlModel",
     "UserModel",
     "TransitionModel",
+    "TransitionHourlyModel",
+    "TransitionDailyModel",
     "load_all_models",
 ]
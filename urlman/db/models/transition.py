@@ -1,4 +1,14 @@
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, func
+from sqlalchemy import (
+    DDL,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    event,
+    func,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -6,13 +16,30 @@ from urlman.db.base import Base
 
 
 class TransitionModel(Base):
-    """Transition db model."""
+    """
+    Transition db model.
+
+    The table is partitioned by months of ``check_time``.
+    Partitions are created ahead by ``create_partitions``,
+    rows out of their ranges go to the default partition.
+    """
 
     __tablename__ = "transitions"
+    __table_args__ = (
+        Index("ix_transitions_url_id_check_time", "url_id", "check_time", "id"),
+        # Scans of periods over all urls, e.g. exports and backfills.
+        Index(
+            "ix_transitions_check_time_brin",
+            "check_time",
+            postgresql_using="brin",
+        ),
+        {"postgresql_partition_by": "RANGE (check_time)"},
+    )
 
     id = Column(
         Integer,
         primary_key=True,
+        autoincrement=True,
     )
     ip = Column(
         String(255),
@@ -20,6 +47,7 @@ class TransitionModel(Base):
     )
     check_time = Column(
         DateTime(timezone=True),
+        primary_key=True,
         default=func.now(),
     )
 
@@ -31,3 +59,10 @@ class TransitionModel(Base):
         "UrlModel",
         back_populates="transitions",
     )
+
+
+event.listen(
+    TransitionModel.__table__,
+    "after_create",
+    DDL("CREATE TABLE transitions_default PARTITION OF transitions DEFAULT"),
+)
@@ -0,0 +1,46 @@
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+
+from urlman.db.base import Base
+
+
+class TransitionHourlyModel(Base):
+    """Transitions count of url per hour."""
+
+    __tablename__ = "transitions_hourly"
+
+    url_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("urls.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    bucket = Column(
+        DateTime(timezone=True),
+        primary_key=True,
+    )
+    count = Column(
+        BigInteger,
+        nullable=False,
+        default=0,
+    )
+
+
+class TransitionDailyModel(Base):
+    """Transitions count of url per day."""
+
+    __tablename__ = "transitions_daily"
+
+    url_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("urls.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    bucket = Column(
+        DateTime(timezone=True),
+        primary_key=True,
+    )
+    count = Column(
+        BigInteger,
+        nullable=False,
+        default=0,
+    )
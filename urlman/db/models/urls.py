@@ -1,15 +1,37 @@
-from sqlalchemy import Boolean, Column, ForeignKey, String
+from sqlalchemy import Boolean, Column, ForeignKey, Index, Sequence, String, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
 from urlman.db.base import Base
+from urlman.db.meta import meta
 from urlman.db.mixins import SoftDeleteMixin, TimeStampMixin, UUIDMixin
 
+# Source of generated short codes.
+short_code_seq = Sequence("short_code_seq", metadata=meta)
+
 
 class UrlModel(UUIDMixin, TimeStampMixin, SoftDeleteMixin, Base):
     """Url db model."""
 
     __tablename__ = "urls"
+    __table_args__ = (
+        # Redirects read only the index, without visiting the table.
+        Index(
+            "ix_urls_short_code_active",
+            "short_code",
+            postgresql_include=["id", "url", "is_protected", "key"],
+            postgresql_where=text("is_deleted = false"),
+        ),
+        Index(
+            "ix_urls_user_id_created_at_active",
+            "user_id",
+            "created_at",
+            "id",
+            postgresql_where=text("is_deleted = false"),
+        ),
+        # Incremental refresh of the short codes filter.
+        Index("ix_urls_created_at", "created_at"),
+    )
 
     url = Column(
         String(length=255),
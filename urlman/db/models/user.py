@@ -36,5 +36,10 @@ class UserModel(UUIDMixin, TimeStampMixin, SoftDeleteMixin, Base):
         DateTime(timezone=True),
         nullable=True,
     )
+    # Tokens issued before this moment are rejected.
+    tokens_revoked_at = Column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
 
     urls = relationship("UrlModel", back_populates="user")
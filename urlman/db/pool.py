@@ -0,0 +1,100 @@
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from urlman.services.metrics import Histogram
+
+
+class PoolMetrics:
+    """Counters of a connection pool and time spent waiting for it."""
+
+    def __init__(self) -> None:
+        self.wait_time = Histogram()
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidations = 0
+
+    def listen(self, engine: AsyncEngine) -> None:
+        """
+        Count events of the engine pool.
+
+        Listeners are set on the engine, so they survive pool recreation.
+
+        :param engine: measured engine.
+        """
+        event.listen(engine.sync_engine, "connect", self._on_connect)
+        event.listen(engine.sync_engine, "checkout", self._on_checkout)
+        event.listen(engine.sync_engine, "invalidate", self._on_invalidate)
+
+    def stats(self, pool: AsyncAdaptedQueuePool) -> Dict[str, Any]:
+        """
+        Get current usage and counters of the pool.
+
+        :param pool: measured pool.
+        :return: pool size, checked out and overflow connections,
+            counters and wait time histogram in seconds.
+        """
+        return {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "invalidations": self.invalidations,
+            "wait_time": self.wait_time.stats(),
+        }
+
+    def _on_connect(self, *args: Any) -> None:
+        self.connects += 1
+
+    def _on_checkout(self, *args: Any) -> None:
+        self.checkouts += 1
+
+    def _on_invalidate(self, *args: Any) -> None:
+        self.invalidations += 1
+
+
+class MeasuredQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool measuring how long checkouts wait for a connection.
+
+    The wait includes opening a connection when the pool grows
+    and the pre-ping of the checked out connection.
+    """
+
+    def __init__(
+        self,
+        creator: Any,
+        metrics: Optional[PoolMetrics] = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(creator, **kwargs)
+        self.metrics = metrics
+
+    def recreate(self) -> "MeasuredQueuePool":
+        """
+        Create a new pool with the same settings and metrics.
+
+        :return: new pool.
+        """
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def connect(self) -> Any:
+        """
+        Check out a connection, measuring the wait.
+
+        :return: connection proxy.
+        """
+        if self.metrics is None:
+            return super().connect()
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            self.metrics.wait_time.observe(time.perf_counter() - started)
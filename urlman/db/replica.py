@@ -0,0 +1,124 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# A streaming replica which replayed everything it received is not lagging,
+# even if the primary had no writes for a while. Without a streaming WAL
+# receiver it gets nothing to replay, so the lag is unknown (NULL).
+# The status is hidden from roles without pg_read_all_stats,
+# then a running receiver is taken as streaming.
+LAG_QUERY = (
+    "SELECT CASE "
+    "WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN NOT EXISTS (SELECT FROM pg_stat_wal_receiver "
+    "WHERE coalesce(status, 'streaming') = 'streaming') THEN NULL "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class ReplicaMonitor:
+    """
+    Tracks whether the read replica can serve reads.
+
+    The replica is checked every ``check_interval`` seconds,
+    it is unavailable while it can't be queried, doesn't stream WAL
+    from the primary or lags behind it more than ``max_lag`` seconds.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        *,
+        max_lag: float = 5,
+        check_interval: float = 5,
+    ) -> None:
+        self.engine = engine
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.checks = 0
+        self.failures = 0
+        self.fallbacks = 0
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def is_available(self) -> bool:
+        """
+        Check whether reads can go to the replica.
+
+        :return: last check result, unavailable answers are counted.
+        """
+        if not self.healthy:
+            self.fallbacks += 1
+        return self.healthy
+
+    async def check(self) -> bool:
+        """
+        Query lag of the replica.
+
+        :return: whether the replica is available.
+        """
+        self.checks += 1
+        try:
+            lag = await asyncio.wait_for(self._query_lag(), self.check_interval)
+        except Exception:
+            self.failures += 1
+            self.lag = None
+            if self.healthy:
+                logger.exception("Read replica is unavailable")
+            self.healthy = False
+            return False
+        self.lag = None if lag is None else float(lag)
+        healthy = (self.lag is not None) and (self.lag <= self.max_lag)
+        if healthy != self.healthy:
+            logger.warning(
+                "Read replica lag is %s, available: %s",
+                "unknown" if self.lag is None else f"{self.lag:.1f}s",
+                healthy,
+            )
+        self.healthy = healthy
+        return healthy
+
+    async def start(self) -> None:
+        """Check the replica and keep checking it in background."""
+        await self.check()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop checking the replica."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get replica state and counters.
+
+        :return: availability, last lag, checks, failures and fallbacks.
+        """
+        return {
+            "healthy": self.healthy,
+            "lag": self.lag,
+            "max_lag": self.max_lag,
+            "checks": self.checks,
+            "failures": self.failures,
+            "fallbacks": self.fallbacks,
+        }
+
+    async def _query_lag(self) -> Optional[float]:
+        # Connecting is inside the check timeout, so an unreachable replica
+        # is marked unavailable without waiting for the connect timeout.
+        async with self.engine.connect() as conn:
+            return await conn.scalar(text(LAG_QUERY))
+
+    async def _run(self) -> None:
+        while True:  # noqa: WPS457
+            await asyncio.sleep(self.check_interval)
+            await self.check()
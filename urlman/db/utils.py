@@ -28,6 +28,7 @@ async def create_database() -> None:
                 f'ENCODING "utf8" TEMPLATE template1',
             ),
         )
+    await engine.dispose()
 
 
 async def drop_database() -> None:
@@ -43,3 +44,4 @@ async def drop_database() -> None:
         )
         await conn.execute(text(disc_users))
         await conn.execute(text(f'DROP DATABASE "{settings.db_base}"'))
+    await engine.dispose()
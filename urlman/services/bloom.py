@@ -0,0 +1,74 @@
+import hashlib
+import math
+from typing import Dict, Iterator
+
+
+class BloomFilter:
+    """
+    Probabilistic set of strings without false negatives.
+
+    The number of bits and hash functions is chosen
+    from the expected capacity and the target false-positive rate.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001) -> None:
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.bits_count = math.ceil(
+            -self.capacity * math.log(error_rate) / (math.log(2) ** 2),
+        )
+        self.hashes_count = max(
+            round(self.bits_count / self.capacity * math.log(2)),
+            1,
+        )
+        self.items_count = 0
+        self._bits = bytearray(math.ceil(self.bits_count / 8))
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+    def __len__(self) -> int:
+        return self.items_count
+
+    def add(self, item: str) -> None:
+        """
+        Add item to the filter.
+
+        :param item: string to add.
+        """
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.items_count += 1
+
+    def false_positive_rate(self) -> float:
+        """
+        Estimate false-positive rate for the current number of items.
+
+        :return: probability that a missing item is reported as present.
+        """
+        exponent = -self.hashes_count * self.items_count / self.bits_count
+        return (1 - math.exp(exponent)) ** self.hashes_count
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Get filter size and accuracy.
+
+        :return: items, capacity, memory and estimated false-positive rate.
+        """
+        return {
+            "items": self.items_count,
+            "capacity": self.capacity,
+            "hashes": self.hashes_count,
+            "memory_bytes": len(self._bits),
+            "false_positive_rate": self.false_positive_rate(),
+        }
+
+    def _positions(self, item: str) -> Iterator[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for number in range(self.hashes_count):
+            yield (first + number * second) % self.bits_count
@@ -0,0 +1,461 @@
+import abc
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+from urlman.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Bounded in-process LRU cache with a time to live for every entry.
+
+    The cache lives inside one worker, so it is not shared between
+    uvicorn processes.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Get value from the cache.
+
+        :param key: cache key.
+        :return: cached value or None if it is missing or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, cached_value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]  # noqa: WPS420
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return cached_value
+
+    def set(
+        self,
+        key: Hashable,
+        cached_value: Any,
+        ttl: Optional[float] = None,
+    ) -> None:
+        """
+        Put value to the cache, evicting the least recently used entry.
+
+        :param key: cache key.
+        :param cached_value: value to store.
+        :param ttl: time to live of the entry, cache ttl by default.
+        """
+        if self.maxsize <= 0:
+            return
+        if ttl is None:
+            ttl = self.ttl
+        self._entries[key] = (time.monotonic() + ttl, cached_value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def add(
+        self,
+        key: Hashable,
+        cached_value: Any,
+        ttl: Optional[float] = None,
+    ) -> bool:
+        """
+        Put value to the cache unless the key has a live value.
+
+        :param key: cache key.
+        :param cached_value: value to store.
+        :param ttl: time to live of the entry, cache ttl by default.
+        :return: whether the value was stored.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return False
+        self.set(key, cached_value, ttl=ttl)
+        return True
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Remove value from the cache.
+
+        :param key: cache key.
+        """
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all values from the cache."""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache counters.
+
+        :return: size, hits, misses and evictions of the cache.
+        """
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class CacheBackend(abc.ABC):
+    """
+    Storage of serialized values shared by the cached lookups.
+
+    Values are strings, so every lookup decides itself
+    which fields are cached and how they are serialized.
+    ``shared`` tells whether all workers see the same values.
+    """
+
+    shared = True
+
+    def __init__(self, *, namespace: str, ttl: float) -> None:
+        self.namespace = namespace
+        self.ttl = ttl
+
+    @abc.abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        """
+        Get value from the cache.
+
+        :param key: cache key.
+        :return: cached value or None.
+        """
+
+    @abc.abstractmethod
+    async def set(
+        self,
+        key: str,
+        cached_value: str,
+        ttl: Optional[float] = None,
+    ) -> None:
+        """
+        Put value to the cache.
+
+        :param key: cache key.
+        :param cached_value: serialized value.
+        :param ttl: time to live of the entry, backend ttl by default.
+        """
+
+    @abc.abstractmethod
+    async def add(
+        self,
+        key: str,
+        cached_value: str,
+        ttl: Optional[float] = None,
+    ) -> None:
+        """
+        Put value to the cache unless the key has a value.
+
+        Lookups caching what they read use it, so they don't
+        overwrite a value written after their read.
+
+        :param key: cache key.
+        :param cached_value: serialized value.
+        :param ttl: time to live of the entry, backend ttl by default.
+        """
+
+    @abc.abstractmethod
+    async def delete(self, key: str) -> None:
+        """
+        Remove value from the cache.
+
+        :param key: cache key.
+        """
+
+    @abc.abstractmethod
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        """
+        Remove several values from the cache at once.
+
+        :param keys: cache keys.
+        """
+
+    @abc.abstractmethod
+    async def clear(self) -> None:
+        """Remove all values of the namespace from the cache."""
+
+    @abc.abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache counters of the current worker.
+
+        :return: cache counters.
+        """
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Cache backend keeping values in memory of the worker."""
+
+    shared = False
+
+    def __init__(self, *, namespace: str, ttl: float, maxsize: int) -> None:
+        super().__init__(namespace=namespace, ttl=ttl)
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str) -> Optional[str]:
+        """
+        Get value from the cache.
+
+        :param key: cache key.
+        :return: cached value or None.
+        """
+        return self._cache.get(key)
+
+    async def set(
+        self,
+        key: str,
+        cached_value: str,
+        ttl: Optional[float] = None,
+    ) -> None:
+        """
+        Put value to the cache.
+
+        :param key: cache key.
+        :param cached_value: serialized value.
+        :param ttl: time to live of the entry, backend ttl by default.
+        """
+        self._cache.set(key, cached_value, ttl=ttl)
+
+    async def add(
+        self,
+        key: str,
+        cached_value: str,
+        ttl: Optional[float] = None,
+    ) -> None:
+        """
+        Put value to the cache unless the key has a value.
+
+        :param key: cache key.
+        :param cached_value: serialized value.
+        :param ttl: time to live of the entry, backend ttl by default.
+        """
+        self._cache.add(key, cached_value, ttl=ttl)
+
+    async def delete(self, key: str) -> None:
+        """
+        Remove value from the cache.
+
+        :param key: cache key.
+        """
+        self._cache.invalidate(key)
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        """
+        Remove several values from the cache at once.
+
+        :param keys: cache keys.
+        """
+        for key in keys:
+            self._cache.invalidate(key)
+
+    async def clear(self) -> None:
+        """Remove all values from the cache."""
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache counters.
+
+        :return: size, hits, misses and evictions of the cache.
+        """
+        return self._cache.stats()
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Cache backend keeping values in Redis shared by all workers.
+
+    Redis errors are logged and treated as cache misses,
+    so the lookups fall back to the database.
+    """
+
+    def __init__(
+        self,
+        *,
+        namespace: str,
+        ttl: float,
+        url: str = "redis://localhost:6379/0",
+        client: Any = None,
+    ) -> None:
+        super().__init__(namespace=namespace, ttl=ttl)
+        if client is None:
+            from redis import asyncio as aioredis
+
+            client = aioredis.from_url(url, decode_responses=True)
+        self.client = client
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        """
+        Get value from the cache.
+
+        :param key: cache key.
+        :return: cached value or None.
+        """
+        try:
+            cached_value = await self.client.get(self._key(key))
+        except Exception:
+            self._log_error("get")
+            self.misses += 1
+            return None
+        if cached_value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if isinstance(cached_value, bytes):
+            return cached_value.decode()
+        return cached_value
+
+    async def set(
+        self,
+        key: str,
+        cached_value: str,
+        ttl: Optional[float] = None,
+    ) -> None:
+        """
+        Put value to the cache.
+
+        :param key: cache key.
+        :param cached_value: serialized value.
+        :param ttl: time to live of the entry, backend ttl by default.
+        """
+        if ttl is None:
+            ttl = self.ttl
+        try:
+            await self.client.set(
+                self._key(key),
+                cached_value,
+                px=max(int(ttl * 1000), 1),
+            )
+        except Exception:
+            self._log_error("set")
+
+    async def add(
+        self,
+        key: str,
+        cached_value: str,
+        ttl: Optional[float] = None,
+    ) -> None:
+        """
+        Put value to the cache unless the key has a value.
+
+        :param key: cache key.
+        :param cached_value: serialized value.
+        :param ttl: time to live of the entry, backend ttl by default.
+        """
+        if ttl is None:
+            ttl = self.ttl
+        try:
+            await self.client.set(
+                self._key(key),
+                cached_value,
+                px=max(int(ttl * 1000), 1),
+                nx=True,
+            )
+        except Exception:
+            self._log_error("set")
+
+    async def delete(self, key: str) -> None:
+        """
+        Remove value from the cache.
+
+        :param key: cache key.
+        """
+        try:
+            await self.client.delete(self._key(key))
+        except Exception:
+            self._log_error("delete")
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        """
+        Remove several values from the cache at once.
+
+        :param keys: cache keys.
+        """
+        redis_keys = [self._key(key) for key in keys]
+        if not redis_keys:
+            return
+        try:
+            await self.client.delete(*redis_keys)
+        except Exception:
+            self._log_error("delete")
+
+    async def clear(self) -> None:
+        """Remove all values of the namespace from the cache."""
+        try:
+            async for key in self.client.scan_iter(match=self._key("*")):
+                await self.client.delete(key)
+        except Exception:
+            self._log_error("clear")
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache counters of the current worker.
+
+        :return: hits, misses and errors of the cache.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+
+    def _key(self, key: str) -> str:
+        return f"urlman:{self.namespace}:{key}"
+
+    def _log_error(self, operation: str) -> None:
+        self.errors += 1
+        logger.warning("Redis cache %s failed", operation, exc_info=True)
+
+
+def create_cache_backend(
+    *,
+    namespace: str,
+    ttl: float,
+    maxsize: int,
+    local_ttl: Optional[float] = None,
+) -> CacheBackend:
+    """
+    Create cache backend configured in settings.
+
+    Invalidations of the in-process cache are not seen by other workers,
+    so with several workers its entries live at most ``local_ttl`` seconds.
+
+    :param namespace: prefix of the cache keys.
+    :param ttl: default time to live of the entries.
+    :param maxsize: size limit of the in-process cache.
+    :param local_ttl: time to live of the in-process cache of several workers.
+    :return: cache backend.
+    """
+    if settings.cache_backend == "redis":
+        return RedisCacheBackend(
+            namespace=namespace,
+            ttl=ttl,
+            url=settings.redis_url,
+        )
+    if local_ttl is not None and settings.workers_count > 1:
+        ttl = min(ttl, local_ttl)
+    return MemoryCacheBackend(namespace=namespace, ttl=ttl, maxsize=maxsize)
@@ -0,0 +1,32 @@
+import base64
+import binascii
+from typing import Any, List
+
+import ujson
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Encode keyset position to an opaque cursor.
+
+    :param values: JSON-serializable values of the sort key.
+    :return: url-safe cursor.
+    """
+    return base64.urlsafe_b64encode(ujson.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """
+    Decode keyset position from an opaque cursor.
+
+    :param cursor: cursor returned by encode_cursor.
+    :raises ValueError: if cursor is malformed.
+    :return: values of the sort key.
+    """
+    try:
+        cursor_values = ujson.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeError, ValueError) as exc:
+        raise ValueError("Malformed cursor") from exc
+    if not isinstance(cursor_values, list):
+        raise ValueError("Malformed cursor")
+    return cursor_values
@@ -1,23 +1,100 @@
-import random
-import string
-
-from urlman.services import GEN_DELIMS
-
-
-async def generate_shortcode(
-    length: int = 8,
-    upper_case: bool = True,
-    digits: bool = True,
-    gen_delims: bool = False,
-) -> str:
-    """Generate shortcode for URl."""
-    temp = string.ascii_lowercase
-    if upper_case:
-        temp.join(string.ascii_uppercase)
-    if digits:
-        temp.join(string.digits)
-    if gen_delims:
-        temp.join(GEN_DELIMS)
-    return "".join(
-        [random.choice(temp) for i in range(0, length)],
-    )
+from collections import deque
+from typing import Deque, List
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from urlman.db.models.urls import short_code_seq
+from urlman.settings import settings
+
+# Prime multiplier spreading sequential ids over all codes of the same length.
+SCRAMBLE_MULTIPLIER = 1580030173
+
+
+def encode_id(number: int, alphabet: str, length: int) -> str:
+    """
+    Encode sequence value to a short code.
+
+    Values below ``len(alphabet) ** length`` are scrambled by a bijection,
+    so neighbour ids don't give neighbour codes, and padded to ``length``.
+    Bigger values get longer codes, so codes never repeat.
+
+    :param number: non-negative sequence value.
+    :param alphabet: characters of the code.
+    :param length: length of the code.
+    :return: short code.
+    """
+    base = len(alphabet)
+    capacity = base ** length
+    if number < capacity:
+        number = number * SCRAMBLE_MULTIPLIER % capacity
+    chars = []
+    while number:
+        number, remainder = divmod(number, base)
+        chars.append(alphabet[remainder])
+    return "".join(reversed(chars)).rjust(length, alphabet[0])
+
+
+class ShortCodeAllocator:
+    """
+    Allocator of unique short codes backed by a Postgres sequence.
+
+    Every worker takes a block of sequence values in one query
+    and encodes them, so new codes need no uniqueness checks.
+    Codes chosen by users are not reserved and can still collide.
+    """
+
+    def __init__(
+        self,
+        *,
+        alphabet: str,
+        length: int,
+        block_size: int = 100,
+    ) -> None:
+        if len(set(alphabet)) != len(alphabet) or len(alphabet) < 2:
+            raise ValueError("Alphabet must have at least two unique characters")
+        self.alphabet = alphabet
+        self.length = length
+        self.block_size = block_size
+        self._ids: Deque[int] = deque()
+
+    async def allocate(self, session: AsyncSession) -> str:
+        """
+        Get new short code.
+
+        :param session: database session.
+        :return: unique short code.
+        """
+        codes = await self.allocate_many(1, session)
+        return codes[0]
+
+    async def allocate_many(self, count: int, session: AsyncSession) -> List[str]:
+        """
+        Get several new short codes.
+
+        :param count: number of codes.
+        :param session: database session.
+        :return: unique short codes.
+        """
+        while len(self._ids) < count:
+            await self._fetch_block(
+                max(count - len(self._ids), self.block_size), session
+            )
+        return [
+            encode_id(self._ids.popleft(), self.alphabet, self.length)
+            for _ in range(count)
+        ]
+
+    async def _fetch_block(self, size: int, session: AsyncSession) -> None:
+        stmt = select(short_code_seq.next_value()).select_from(
+            func.generate_series(1, size),
+        )
+        result = await session.execute(stmt)
+        self._ids.extend(result.scalars().all())
+
+
+shortcode_allocator = ShortCodeAllocator(
+    alphabet=settings.shortcode_alphabet,
+    length=settings.shortcode_length,
+    block_size=settings.shortcode_block_size,
+)
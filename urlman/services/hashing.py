@@ -1,7 +1,18 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
 from passlib.hash import sha256_crypt
 
 from urlman.settings import settings
 
+ResultType = TypeVar("ResultType")
+
+
+class HashingBusyError(Exception):
+    """Raised when no hashing process gets free in time."""
+
 
 def hash_password(password: str) -> str:
     """
@@ -24,3 +35,82 @@ def verify_password(db_password: str, verifiable_password: str) -> bool:
     """
     verifiable_password = verifiable_password + settings.hash_salt
     return sha256_crypt.verify(verifiable_password, db_password)
+
+
+class PasswordHasher:
+    """
+    Runs password hashing in a pool of processes.
+
+    Hashing takes thousands of rounds, so it would block the event loop
+    and every request of the worker. At most ``workers`` hashes run at once,
+    the rest wait for a free process up to ``queue_timeout`` seconds
+    and are rejected afterwards. Until started, hashes run in place.
+    """
+
+    def __init__(self) -> None:
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._queue_timeout = 0.0
+
+    def start(self, *, workers: int, queue_timeout: float) -> None:
+        """
+        Start hashing processes.
+
+        @param workers: number of processes, 0 keeps hashing in place
+        @param queue_timeout: seconds to wait for a free process
+        """
+        if workers <= 0:
+            return
+        # Forking would copy the event loop and open connections.
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self._slots = asyncio.Semaphore(workers)
+        self._queue_timeout = queue_timeout
+
+    def stop(self) -> None:
+        """Stop hashing processes, cancelling waiting hashes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self._slots = None
+
+    async def hash(self, password: str) -> str:
+        """
+        Hash password.
+
+        @param password: raw password
+        @return: hashed password
+        """
+        return await self._run(hash_password, password)
+
+    async def verify(self, db_password: str, verifiable_password: str) -> bool:
+        """
+        Verify entered password.
+
+        @param db_password: user password hash
+        @param verifiable_password: comparison password
+        @return: password match
+        """
+        return await self._run(verify_password, db_password, verifiable_password)
+
+    async def _run(
+        self,
+        func: Callable[..., ResultType],
+        *args: Any,
+    ) -> ResultType:
+        if self._executor is None or self._slots is None:
+            return func(*args)
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self._queue_timeout)
+        except asyncio.TimeoutError:
+            raise HashingBusyError()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._slots.release()
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,284 @@
+import bisect
+import math
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+# Upper bounds in seconds, from a pool hit to a request queuing for seconds.
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+
+
+class Histogram:
+    """
+    Distribution of observed values over fixed buckets.
+
+    Counts are kept per bucket and summed up only by ``stats``,
+    so an observation costs a binary search.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.count = 0
+        self.sum = 0.0
+        # The last counter is for values above every bucket.
+        self._counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        """
+        Add an observed value.
+
+        :param value: observed value.
+        """
+        self._counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative_counts(self) -> Dict[str, int]:
+        """
+        Count values not greater than every bucket bound.
+
+        :return: counts by upper bounds, "+Inf" counts all values.
+        """
+        counts = {}
+        total = 0
+        for bound, bucket_count in zip(self.buckets, self._counts):
+            total += bucket_count
+            counts[str(bound)] = total
+        counts["+Inf"] = self.count
+        return counts
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Get summary of the observed values.
+
+        :return: count, sum, mean and cumulative bucket counts.
+        """
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "buckets": self.cumulative_counts(),
+        }
+
+
+LabelValues = Tuple[str, ...]
+
+
+class Metric:
+    """
+    Metric family in the Prometheus text format.
+
+    Every distinct tuple of label values is a separate series,
+    so labels must only take a bounded set of values.
+    """
+
+    metric_type = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> Iterator[Tuple[str, LabelValues, Dict[str, str], float]]:
+        """
+        Get current samples of the family.
+
+        :yield: name suffix, label values, extra labels and the value.
+        """
+        yield from ()
+
+    def render(self) -> List[str]:
+        """
+        Render family to lines of the text format.
+
+        :return: HELP, TYPE and sample lines.
+        """
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        for suffix, labelvalues, extra_labels, sample_value in self.samples():
+            labels = {**dict(zip(self.labelnames, labelvalues)), **extra_labels}
+            lines.append(
+                f"{self.name}{suffix}{_format_labels(labels)} "
+                f"{_format_value(sample_value)}",
+            )
+        return lines
+
+
+class Counter(Metric):
+    """Monotonically increasing values by labels."""
+
+    metric_type = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        """
+        Increase the value of the series.
+
+        :param labelvalues: values of the labels in order of their names.
+        :param amount: increment.
+        """
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        """
+        Get the value of the series.
+
+        :param labelvalues: values of the labels in order of their names.
+        :return: current value.
+        """
+        return self._values.get(labelvalues, 0)
+
+    def samples(self) -> Iterator[Tuple[str, LabelValues, Dict[str, str], float]]:
+        """
+        Get current samples of the family.
+
+        :yield: name suffix, label values, extra labels and the value.
+        """
+        for labelvalues, sample_value in list(self._values.items()):
+            yield "", labelvalues, {}, sample_value
+
+
+class Gauge(Counter):
+    """Values by labels which go up and down."""
+
+    metric_type = "gauge"
+
+    def set(self, sample_value: float, *labelvalues: str) -> None:
+        """
+        Set the value of the series.
+
+        :param sample_value: new value.
+        :param labelvalues: values of the labels in order of their names.
+        """
+        self._values[labelvalues] = sample_value
+
+    def dec(self, *labelvalues: str, amount: float = 1) -> None:
+        """
+        Decrease the value of the series.
+
+        :param labelvalues: values of the labels in order of their names.
+        :param amount: decrement.
+        """
+        self.inc(*labelvalues, amount=-amount)
+
+
+class HistogramMetric(Metric):
+    """Histograms by labels."""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        self._histograms: Dict[LabelValues, Histogram] = {}
+
+    def observe(self, sample_value: float, *labelvalues: str) -> None:
+        """
+        Add an observed value to the series.
+
+        :param sample_value: observed value.
+        :param labelvalues: values of the labels in order of their names.
+        """
+        histogram = self._histograms.get(labelvalues)
+        if histogram is None:
+            histogram = self.add(Histogram(self.buckets), *labelvalues)
+        histogram.observe(sample_value)
+
+    def add(self, histogram: Histogram, *labelvalues: str) -> Histogram:
+        """
+        Expose a histogram collected elsewhere as a series.
+
+        :param histogram: histogram of the series.
+        :param labelvalues: values of the labels in order of their names.
+        :return: the histogram.
+        """
+        self._histograms[labelvalues] = histogram
+        return histogram
+
+    def samples(self) -> Iterator[Tuple[str, LabelValues, Dict[str, str], float]]:
+        """
+        Get current samples of the family.
+
+        :yield: name suffix, label values, extra labels and the value.
+        """
+        for labelvalues, histogram in list(self._histograms.items()):
+            for bound, bucket_count in histogram.cumulative_counts().items():
+                yield "_bucket", labelvalues, {"le": bound}, bucket_count
+            yield "_sum", labelvalues, {}, histogram.sum
+            yield "_count", labelvalues, {}, histogram.count
+
+
+def render(metrics: Iterable[Metric]) -> str:
+    """
+    Render metric families in the Prometheus text format.
+
+    :param metrics: metric families.
+    :return: text of the exposition.
+    """
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    lines.append("")
+    return "\n".join(lines)
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{0}="{1}"'.format(
+            name,
+            str(label_value)
+            .replace("\\", r"\\")
+            .replace('"', r"\"")
+            .replace("\n", r"\n"),
+        )
+        for name, label_value in labels.items()
+    )
+    return f"{{{pairs}}}"
+
+
+def _format_value(sample_value: float) -> str:
+    if isinstance(sample_value, bool):
+        return str(int(sample_value))
+    if math.isnan(sample_value):
+        return "NaN"
+    if math.isinf(sample_value):
+        return "+Inf" if sample_value > 0 else "-Inf"
+    if isinstance(sample_value, int) or float(sample_value).is_integer():
+        return str(int(sample_value))
+    return repr(float(sample_value))
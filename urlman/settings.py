@@ -1,5 +1,7 @@
+import string
 from pathlib import Path
 from tempfile import gettempdir
+from typing import Literal, Optional
 
 from fastapi.security import HTTPBearer
 from pydantic import BaseSettings
@@ -23,11 +25,100 @@ class Settings(BaseSettings):
     db_pass: str = "urlman"
     db_base: str = "urlman"
     db_echo: bool = False
+    # Connection pool of every worker
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    # Seconds a request waits for a free connection before failing
+    db_pool_timeout: float = 30
+    # Connections older than this many seconds are reopened, -1 never
+    db_pool_recycle: int = -1
+    db_pool_pre_ping: bool = False
+    db_connect_timeout: float = 60
+    # Prepared statements cached by asyncpg per connection, 0 for pgbouncer
+    db_statement_cache_size: int = 100
+    # Optional read replica for listings and analytics, it is connected
+    # with the primary credentials and the primary database name by default
+    db_replica_host: Optional[str] = None
+    db_replica_port: int = 5432
+    db_replica_base: Optional[str] = None
+    # Reads go to the primary while the replica lags more seconds than this
+    db_replica_max_lag: float = 5
+    db_replica_check_interval: float = 5
+    # Statements slower than this many seconds are logged, None disables it
+    db_slow_query_threshold: Optional[float] = 0.5
+    # Log statements executed this many times within one request,
+    # which usually are lazy loads in a loop. Meant for development and tests.
+    db_detect_n_plus_one: bool = False
+    db_n_plus_one_threshold: int = 5
     hash_salt: str = "salt1337"
+    # Processes hashing passwords, 0 hashes inside the event loop
+    password_hash_workers: int = 2
+    # Seconds a hash waits for a free process before the request gets 503
+    password_hash_queue_timeout: float = 1
     jwt_alg: str = "HS256"
     jwt_iss: str = "urlman"
     jwt_secret: str = "secret"
     jwt_expires: int = 7 * 24 * 60
+    # Verified tokens remembered by a worker, 0 verifies every request
+    jwt_cache_size: int = 10000
+    # Cache of the redirect and current user lookups: "memory" or "redis"
+    cache_backend: Literal["memory", "redis"] = "memory"
+    redis_url: str = "redis://localhost:6379/0"
+    # Size limits are used only by the in-process cache. With the memory
+    # backend and several workers urls are cached only url_cache_local_ttl
+    # seconds, so urls deleted or changed by another worker keep redirecting
+    # that long. Redis shares invalidations.
+    url_cache_size: int = 1024
+    url_cache_ttl: int = 60
+    url_cache_local_ttl: float = 2
+    # With the memory backend and several workers users are cached only
+    # user_cache_local_ttl seconds, so deletion and token revocation made by
+    # another worker are seen that late. Redis shares invalidations.
+    user_cache_size: int = 1024
+    user_cache_ttl: int = 60
+    user_cache_local_ttl: float = 2
+    # Unknown short codes are remembered for this many seconds
+    url_negative_cache_ttl: int = 5
+    # Generated short codes
+    shortcode_alphabet: str = string.digits + string.ascii_letters
+    shortcode_length: int = 7
+    # Sequence values taken by a worker at once
+    shortcode_block_size: int = 100
+    # Bulk creation of urls, inserted chunks are capped by the limit
+    # of 32767 bind parameters of a statement
+    urls_bulk_max_items: int = 50000
+    urls_bulk_chunk_size: int = 1000
+    # Transitions of hard-deleted urls unlinked in one transaction
+    urls_bulk_transitions_batch_size: int = 10000
+    # Import of urls files
+    urls_import_batch_size: int = 10000
+    urls_import_max_errors: int = 1000
+    # Number of latest transitions returned with a single url
+    url_recent_transitions: int = 10
+    # Bloom filter of existing short codes, codes of other workers are
+    # rejected until the next refresh
+    shortcode_filter_enabled: bool = True
+    shortcode_filter_error_rate: float = 0.001
+    shortcode_filter_refresh_interval: float = 1
+    # Buffered writing of transitions
+    transitions_batch_size: int = 500
+    transitions_flush_interval: float = 1
+    transitions_buffer_size: int = 10000
+    # What to drop when the buffer is full: drop_newest, drop_oldest or block
+    transitions_overflow_policy: Literal[
+        "drop_newest",
+        "drop_oldest",
+        "block",
+    ] = "drop_newest"
+    # How long "block" policy waits for a flush before dropping
+    transitions_put_timeout: float = 0.5
+    # Rows fetched from the server-side cursor at once by exports
+    transitions_export_fetch_size: int = 10000
+    # Monthly partitions of transitions created ahead of the current month
+    transitions_partitions_ahead: int = 3
+    transitions_partitions_check_interval: float = 3600
+    # Partitions older than this are dropped, None keeps all transitions
+    transitions_retention_days: Optional[int] = None
     auth_scheme = HTTPBearer(auto_error=False)
 
     @property
@@ -46,6 +137,24 @@ class Settings(BaseSettings):
             path=f"/{self.db_base}",
         )
 
+    @property
+    def db_replica_url(self) -> Optional[URL]:
+        """
+        Assemble read replica URL from settings.
+
+        :return: replica URL or None if there is no replica.
+        """
+        if self.db_replica_host is None:
+            return None
+        return URL.build(
+            scheme="postgresql+asyncpg",
+            host=self.db_replica_host,
+            port=self.db_replica_port,
+            user=self.db_user,
+            password=self.db_pass,
+            path=f"/{self.db_replica_base or self.db_base}",
+        )
+
     class Config:
         env_file = ".env"
         env_prefix = "URLMAN_"
@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from urlman.db.models import UrlModel, UserModel
+from urlman.services.bloom import BloomFilter
+from urlman.web.api.urls.repos.filters import ShortCodeFilter
+
+
+def test_bloom_filter_has_no_false_negatives() -> None:
+    """Checks that added items are always found and the error rate holds."""
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for number in range(1000):
+        bloom.add(f"code{number}")
+
+    assert all(f"code{number}" in bloom for number in range(1000))
+    false_positives = sum(f"miss{number}" in bloom for number in range(10000))
+    assert false_positives < 300
+    assert bloom.stats()["false_positive_rate"] == pytest.approx(0.01, rel=0.5)
+
+
+@pytest.mark.asyncio
+async def test_shortcode_filter_refreshes_new_codes(dbsession: AsyncSession) -> None:
+    """
+    Checks that codes created after the load are found after the refresh.
+
+    :param dbsession: database session.
+    """
+    user = UserModel(username="bloom", email="bloom@test.com", password="-")
+    dbsession.add(UrlModel(url="https://test.com", short_code="old", user=user))
+    await dbsession.commit()
+    shortcode_filter = ShortCodeFilter(min_capacity=10)
+    await shortcode_filter.load(dbsession)
+
+    dbsession.add(UrlModel(url="https://test.com", short_code="new", user=user))
+    await dbsession.commit()
+    assert not shortcode_filter.may_exist("new")
+    await shortcode_filter.refresh(dbsession)
+
+    assert shortcode_filter.may_exist("old")
+    assert shortcode_filter.may_exist("new")
+    assert not shortcode_filter.may_exist("unknown")
+    assert shortcode_filter.stats()["rejected"] == 2
+
+
+@pytest.mark.asyncio
+async def test_shortcode_filter_refreshes_empty_table(dbsession: AsyncSession) -> None:
+    """
+    Checks that codes created after loading an empty table are found.
+
+    :param dbsession: database session.
+    """
+    shortcode_filter = ShortCodeFilter(min_capacity=10)
+    await shortcode_filter.load(dbsession)
+
+    user = UserModel(username="bloom", email="bloom@test.com", password="-")
+    dbsession.add(UrlModel(url="https://test.com", short_code="first", user=user))
+    await dbsession.commit()
+    await shortcode_filter.refresh(dbsession)
+
+    assert shortcode_filter.may_exist("first")
+
+
+@pytest.mark.asyncio
+async def test_shortcode_filter_finds_codes_of_long_transactions(
+    _engine: AsyncEngine,
+) -> None:
+    """
+    Checks that codes committed after a refresh by a transaction
+    started before it are found by the next refresh.
+
+    :param _engine: current engine.
+    """
+    shortcode_filter = ShortCodeFilter(min_capacity=10)
+    async with _engine.connect() as conn:
+        async with conn.begin() as long_transaction:
+            user_id = await conn.scalar(
+                UserModel.__table__.insert()
+                .values(username="long", email="long@test.com", password="-")
+                .returning(UserModel.id),
+            )
+            await conn.execute(
+                UrlModel.__table__.insert().values(
+                    url="https://test.com",
+                    short_code="late",
+                    user_id=user_id,
+                ),
+            )
+            async with AsyncSession(_engine) as session:
+                await shortcode_filter.load(session)
+            assert not shortcode_filter.may_exist("late")
+            await long_transaction.commit()
+
+    try:
+        async with AsyncSession(_engine) as session:
+            await shortcode_filter.refresh(session)
+        assert shortcode_filter.may_exist("late")
+    finally:
+        async with _engine.begin() as conn:
+            await conn.execute(delete(UrlModel).where(UrlModel.user_id == user_id))
+            await conn.execute(delete(UserModel).where(UserModel.id == user_id))
+
+
+@pytest.mark.asyncio
+async def test_shortcode_filter_rebuilds_in_background(
+    _engine: AsyncEngine,
+    dbsession: AsyncSession,
+) -> None:
+    """
+    Checks that the background refresh finds new codes
+    and rebuilds a full filter.
+
+    :param _engine: current engine.
+    :param dbsession: database session.
+    """
+    shortcode_filter = ShortCodeFilter(refresh_interval=0.01, min_capacity=1)
+    shortcode_filter.engine = _engine
+    async with AsyncSession(_engine) as session:
+        await shortcode_filter.load(session)
+    old_bloom = shortcode_filter.bloom
+
+    async with _engine.begin() as conn:
+        user_id = await conn.scalar(
+            UserModel.__table__.insert()
+            .values(username="full", email="full@test.com", password="-")
+            .returning(UserModel.id),
+        )
+        await conn.execute(
+            UrlModel.__table__.insert(),
+            [
+                {
+                    "url": "https://test.com",
+                    "short_code": f"full{number}",
+                    "user_id": user_id,
+                }
+                for number in range(3)
+            ],
+        )
+
+    shortcode_filter.start()
+    try:
+        for _ in range(100):
+            if shortcode_filter.bloom is not old_bloom:
+                break
+            await asyncio.sleep(0.01)
+        assert shortcode_filter.bloom is not old_bloom
+        assert all(shortcode_filter.may_exist(f"full{number}") for number in range(3))
+    finally:
+        await shortcode_filter.stop()
+        async with _engine.begin() as conn:
+            await conn.execute(delete(UrlModel).where(UrlModel.user_id == user_id))
+            await conn.execute(delete(UserModel).where(UserModel.id == user_id))
@@ -0,0 +1,91 @@
+import time
+import uuid
+
+import pytest
+
+from urlman.services.cache import RedisCacheBackend, TTLCache, create_cache_backend
+from urlman.settings import settings
+from urlman.web.api.urls.repos.selectors import dump_url_redirect, load_url_redirect
+from urlman.web.api.urls.schemas import UrlRedirect
+
+
+def test_cache_evicts_least_recently_used() -> None:
+    """Checks that cache keeps only maxsize recently used entries."""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_expires_entries() -> None:
+    """Checks that expired entries are counted as misses."""
+    cache = TTLCache(maxsize=2, ttl=0.01)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert not cache
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_serializes_redirect() -> None:
+    """Checks redirect targets round trip through the Redis backend."""
+    aioredis = pytest.importorskip("fakeredis.aioredis")
+    cache = RedisCacheBackend(
+        namespace="url",
+        ttl=60,
+        client=aioredis.FakeRedis(decode_responses=True),
+    )
+    redirect = UrlRedirect(
+        id=uuid.uuid4(),
+        url="https://test.com",
+        is_protected=True,
+        key="key",
+    )
+    assert await cache.get("code") is None
+    await cache.set("code", dump_url_redirect(redirect))
+
+    assert load_url_redirect(await cache.get("code")) == redirect
+    await cache.delete("code")
+    assert await cache.get("code") is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "errors": 0}
+
+
+def test_cache_add_keeps_live_entries() -> None:
+    """Checks that add doesn't overwrite values which are not expired."""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", "deleted")
+    assert not cache.add("a", "user")
+    assert cache.add("b", "user", ttl=0.01)
+    time.sleep(0.02)
+
+    assert cache.add("b", "other")
+    assert cache.get("a") == "deleted"
+    assert cache.get("b") == "other"
+
+
+def test_memory_backend_of_several_workers_is_short_lived(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """
+    Checks that in-process caches of several workers use the local ttl.
+
+    :param monkeypatch: monkeypatch of the settings.
+    """
+    monkeypatch.setattr(settings, "cache_backend", "memory")
+    monkeypatch.setattr(settings, "workers_count", 4)
+    cache = create_cache_backend(namespace="test", ttl=60, maxsize=2, local_ttl=2)
+    assert cache.ttl == 2
+
+    monkeypatch.setattr(settings, "workers_count", 1)
+    cache = create_cache_backend(namespace="test", ttl=60, maxsize=2, local_ttl=2)
+    assert cache.ttl == 60
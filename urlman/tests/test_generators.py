@@ -0,0 +1,35 @@
+import string
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from urlman.services.generators import ShortCodeAllocator, encode_id
+
+
+def test_encode_id_is_collision_free() -> None:
+    """Checks that every id of the code space gets its own code."""
+    codes = {encode_id(number, "abc", 4) for number in range(3 ** 4)}
+    longer = encode_id(3 ** 4, "abc", 4)
+
+    assert len(codes) == 3 ** 4
+    assert all(len(code) == 4 for code in codes)
+    assert len(longer) == 5
+
+
+@pytest.mark.asyncio
+async def test_allocator_takes_blocks(dbsession: AsyncSession) -> None:
+    """
+    Checks that allocator hands out unique codes of configured shape.
+
+    :param dbsession: database session.
+    """
+    allocator = ShortCodeAllocator(
+        alphabet=string.digits + string.ascii_letters,
+        length=6,
+        block_size=10,
+    )
+    codes = [await allocator.allocate(dbsession) for _ in range(15)]
+    codes.extend(await allocator.allocate_many(30, dbsession))
+
+    assert len(set(codes)) == 45
+    assert all(len(code) == 6 for code in codes)
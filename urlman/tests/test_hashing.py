@@ -0,0 +1,27 @@
+import asyncio
+
+import pytest
+
+from urlman.services.hashing import HashingBusyError, PasswordHasher
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_rejects_when_busy() -> None:
+    """Checks that hashes run in processes and waiting too long is rejected."""
+    hasher = PasswordHasher()
+    hasher.start(workers=1, queue_timeout=0.01)
+    try:
+        hashed = await hasher.hash("password")
+        assert await hasher.verify(hashed, "password")
+        assert not await hasher.verify(hashed, "wrong")
+
+        results = await asyncio.gather(
+            hasher.hash("first"),
+            hasher.hash("second"),
+            return_exceptions=True,
+        )
+    finally:
+        hasher.stop()
+
+    assert isinstance(results[0], str)
+    assert isinstance(results[1], HashingBusyError)
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from urlman.db.pool import MeasuredQueuePool, PoolMetrics
+from urlman.settings import settings
+
+
+@pytest.mark.asyncio
+async def test_pool_metrics_measure_waits(_engine: AsyncEngine) -> None:
+    """
+    Checks that checkouts waiting for a busy connection are measured.
+
+    :param _engine: engine of the test database.
+    """
+    pool_metrics = PoolMetrics()
+    engine = create_async_engine(
+        str(settings.db_url),
+        poolclass=MeasuredQueuePool,
+        metrics=pool_metrics,
+        pool_size=1,
+        max_overflow=0,
+    )
+    pool_metrics.listen(engine)
+
+    async def hold_connection() -> None:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT pg_sleep(0.1)"))
+
+    try:
+        holder = asyncio.create_task(hold_connection())
+        await asyncio.sleep(0.05)
+        assert pool_metrics.stats(engine.pool)["checked_out"] == 1
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        await holder
+    finally:
+        await engine.dispose()
+
+    pool_stats = pool_metrics.stats(engine.pool)
+    assert pool_stats["connects"] == 1
+    assert pool_stats["checkouts"] == 2
+    assert pool_stats["checked_out"] == 0
+    assert pool_stats["wait_time"]["count"] == 2
+    wait_buckets = pool_stats["wait_time"]["buckets"]
+    assert wait_buckets["+Inf"] - wait_buckets["0.025"] >= 1
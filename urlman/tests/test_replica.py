@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from urlman.db.replica import ReplicaMonitor
+from urlman.settings import settings
+
+
+@pytest.mark.asyncio
+async def test_replica_monitor_times_out_connect() -> None:
+    """Checks that a replica which doesn't answer the connect is unavailable."""
+    accepted = []
+    server = await asyncio.start_server(
+        lambda _, writer: accepted.append(writer),
+        "127.0.0.1",
+        0,
+    )
+    port = server.sockets[0].getsockname()[1]
+    silent_engine = create_async_engine(
+        str(settings.db_url.with_host("127.0.0.1").with_port(port)),
+    )
+    replica = ReplicaMonitor(silent_engine, check_interval=0.1)
+    replica.healthy = True
+    try:
+        assert not await asyncio.wait_for(replica.check(), timeout=5)
+    finally:
+        await silent_engine.dispose()
+        for writer in accepted:
+            writer.close()
+        server.close()
+        await server.wait_closed()
+    assert replica.stats()["failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_replica_monitor_falls_back(_engine: AsyncEngine) -> None:
+    """
+    Checks that a reachable database serves reads and a missing one doesn't.
+
+    :param _engine: engine of the test database.
+    """
+    replica = ReplicaMonitor(_engine, max_lag=1)
+    assert await replica.check()
+    assert replica.is_available()
+    assert replica.lag == 0
+
+    missing_engine = create_async_engine(
+        str(settings.db_url.with_path("/urlman_missing_replica")),
+    )
+    missing_replica = ReplicaMonitor(missing_engine, max_lag=1)
+    try:
+        assert not await missing_replica.check()
+    finally:
+        await missing_engine.dispose()
+    assert not missing_replica.is_available()
+    assert missing_replica.stats()["failures"] == 1
+    assert missing_replica.stats()["fallbacks"] == 1
@@ -0,0 +1,281 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from urlman.db.models import (
+    TransitionDailyModel,
+    TransitionHourlyModel,
+    TransitionModel,
+    UrlModel,
+    UserModel,
+)
+from urlman.web.api.transitions.exceptions import TransitionCursorException
+from urlman.web.api.transitions.repos.partitions import (
+    create_partitions,
+    detach_expired_partitions,
+    drop_detached_partitions,
+    get_partition_names,
+)
+from urlman.web.api.transitions.repos.selectors import get_transitions_page
+from urlman.web.api.transitions.repos.services import (
+    backfill_rollups,
+    update_rollups,
+)
+from urlman.web.api.transitions.repos.writer import TransitionWriter
+
+
+@pytest.mark.asyncio
+async def test_writer_flushes_batches(_engine: AsyncEngine) -> None:
+    """
+    Checks that writer inserts buffered transitions, counts them
+    in rollups and drops overflow.
+
+    :param _engine: current engine.
+    """
+    async with _engine.begin() as conn:
+        user_id = (
+            await conn.execute(
+                UserModel.__table__.insert()
+                .values(username="writer", email="writer@test.com", password="-")
+                .returning(UserModel.id),
+            )
+        ).scalar()
+        url_id = (
+            await conn.execute(
+                UrlModel.__table__.insert()
+                .values(url="https://test.com", short_code="writer", user_id=user_id)
+                .returning(UrlModel.id),
+            )
+        ).scalar()
+
+    writer = TransitionWriter(engine=_engine, batch_size=2, buffer_size=3)
+    accepted = [writer.add(client_ip="127.0.0.1", url_id=url_id) for _ in range(4)]
+    await writer.flush()
+
+    async with _engine.begin() as conn:
+        written = await conn.scalar(
+            select(func.count()).where(TransitionModel.url_id == url_id),
+        )
+        rollups = [
+            await conn.scalar(
+                select(func.sum(model.count)).where(model.url_id == url_id),
+            )
+            for model in (TransitionHourlyModel, TransitionDailyModel)
+        ]
+        await backfill_rollups(connection=conn)
+        backfilled = await conn.scalar(
+            select(func.sum(TransitionDailyModel.count)).where(
+                TransitionDailyModel.url_id == url_id,
+            ),
+        )
+        await conn.execute(
+            delete(TransitionModel).where(TransitionModel.url_id == url_id),
+        )
+        await conn.execute(delete(UrlModel).where(UrlModel.id == url_id))
+        await conn.execute(delete(UserModel).where(UserModel.id == user_id))
+
+    assert accepted == [True, True, True, False]
+    assert written == 3
+    assert rollups == [3, 3]
+    assert backfilled == 3
+    assert writer.stats() == {"buffered": 0, "flushed": 3, "dropped": 1}
+
+
+@pytest.mark.asyncio
+async def test_writer_skips_deleted_urls(_engine: AsyncEngine) -> None:
+    """
+    Checks that transitions of a deleted url don't make the writer
+    drop the rest of the batch, also when flushed on stop.
+
+    :param _engine: current engine.
+    """
+    async with _engine.begin() as conn:
+        user_id = (
+            await conn.execute(
+                UserModel.__table__.insert()
+                .values(username="deleted", email="deleted@test.com", password="-")
+                .returning(UserModel.id),
+            )
+        ).scalar()
+        url_id = (
+            await conn.execute(
+                UrlModel.__table__.insert()
+                .values(url="https://test.com", short_code="deleted", user_id=user_id)
+                .returning(UrlModel.id),
+            )
+        ).scalar()
+
+    writer = TransitionWriter(engine=_engine, batch_size=10, flush_interval=60)
+    await writer.start()
+    for transition_url_id in (url_id, uuid.uuid4(), url_id):
+        writer.add(client_ip="127.0.0.1", url_id=transition_url_id)
+    await writer.stop()
+
+    async with _engine.begin() as conn:
+        written = await conn.scalar(
+            select(func.count()).where(TransitionModel.url_id == url_id),
+        )
+        for model in (TransitionHourlyModel, TransitionDailyModel, TransitionModel):
+            await conn.execute(delete(model).where(model.url_id == url_id))
+        await conn.execute(delete(UrlModel).where(UrlModel.id == url_id))
+        await conn.execute(delete(UserModel).where(UserModel.id == user_id))
+
+    assert written == 2
+    assert writer.stats() == {"buffered": 0, "flushed": 2, "dropped": 1}
+
+
+@pytest.mark.asyncio
+async def test_writer_overflow_policies(_engine: AsyncEngine) -> None:
+    """
+    Checks what writer drops when the buffer is full.
+
+    :param _engine: current engine.
+    """
+    url_id = uuid.uuid4()
+    oldest = TransitionWriter(
+        engine=_engine,
+        buffer_size=2,
+        overflow_policy="drop_oldest",
+    )
+    for client_ip in ("1", "2", "3"):
+        assert await oldest.put(client_ip=client_ip, url_id=url_id)
+    assert [row["ip"] for row in oldest._buffer] == ["2", "3"]
+
+    blocking = TransitionWriter(
+        engine=_engine,
+        buffer_size=1,
+        overflow_policy="block",
+        put_timeout=0.01,
+    )
+    assert await blocking.put(client_ip="1", url_id=url_id)
+    assert not await blocking.put(client_ip="2", url_id=url_id)
+    assert oldest.dropped == blocking.dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_transitions_keyset_pages(dbsession: AsyncSession) -> None:
+    """
+    Checks that cursors walk all transitions once in a stable order.
+
+    :param dbsession: database session.
+    """
+    user = UserModel(username="pages", email="pages@test.com", password="-")
+    url = UrlModel(url="https://test.com", short_code="pages", user=user)
+    check_time = datetime.now(timezone.utc)
+    dbsession.add_all(
+        [
+            TransitionModel(ip=str(number), check_time=check_time, url=url)
+            for number in range(5)
+        ],
+    )
+    await dbsession.commit()
+
+    seen, cursor = [], None
+    for _ in range(3):
+        page = await get_transitions_page(
+            url=url,
+            cursor=cursor,
+            size=2,
+            session=dbsession,
+        )
+        seen.extend(transition.ip for transition in page.items)
+        cursor = page.next_cursor
+
+    assert seen == ["0", "1", "2", "3", "4"]
+    assert cursor is None
+    with pytest.raises(TransitionCursorException):
+        await get_transitions_page(url=url, cursor="bad", size=2, session=dbsession)
+
+
+@pytest.mark.asyncio
+async def test_partitions_are_created_and_dropped(dbsession: AsyncSession) -> None:
+    """
+    Checks that new partitions take rows from the default one
+    and expired partitions are dropped.
+
+    :param dbsession: database session.
+    """
+    connection = await dbsession.connection()
+    await connection.execute(
+        TransitionModel.__table__.insert().values(
+            ip="0",
+            check_time=datetime(2030, 2, 10, tzinfo=timezone.utc),
+        ),
+    )
+
+    created = await create_partitions(
+        since=datetime(2030, 1, 15, tzinfo=timezone.utc),
+        until=datetime(2030, 2, 1, tzinfo=timezone.utc),
+        connection=connection,
+    )
+    assert created == ["transitions_p203001", "transitions_p203002"]
+    partition = await connection.scalar(
+        text("SELECT tableoid::regclass::text FROM transitions WHERE ip = '0'"),
+    )
+    assert partition == "transitions_p203002"
+
+    detached = await detach_expired_partitions(
+        before=datetime(2030, 2, 1, tzinfo=timezone.utc),
+        connection=connection,
+    )
+    assert detached == ["transitions_p203001"]
+    assert "transitions_p203001" not in await get_partition_names(connection)
+    dropped = await drop_detached_partitions(
+        before=datetime(2030, 2, 1, tzinfo=timezone.utc),
+        connection=connection,
+    )
+    assert dropped == ["transitions_p203001"]
+    assert "transitions_default" in await get_partition_names(connection)
+
+
+@pytest.mark.asyncio
+async def test_backfill_keeps_dropped_partitions(dbsession: AsyncSession) -> None:
+    """
+    Checks that backfill rebuilds counts of the remaining partitions only.
+
+    :param dbsession: database session.
+    """
+    user = UserModel(username="backfill", email="backfill@test.com", password="-")
+    url = UrlModel(url="https://test.com", short_code="backfill", user=user)
+    dbsession.add(url)
+    await dbsession.flush()
+    connection = await dbsession.connection()
+    await create_partitions(
+        since=datetime(2030, 1, 1, tzinfo=timezone.utc),
+        until=datetime(2030, 2, 1, tzinfo=timezone.utc),
+        connection=connection,
+    )
+    transitions = [
+        {
+            "ip": "0",
+            "url_id": url.id,
+            "check_time": datetime(2030, month, 10, tzinfo=timezone.utc),
+        }
+        for month in (1, 2, 2)
+    ]
+    await connection.execute(TransitionModel.__table__.insert(), transitions)
+    await update_rollups(transitions=transitions, connection=connection)
+    await detach_expired_partitions(
+        before=datetime(2030, 2, 1, tzinfo=timezone.utc),
+        connection=connection,
+    )
+    await connection.execute(
+        delete(TransitionDailyModel).where(
+            TransitionDailyModel.bucket >= datetime(2030, 2, 1, tzinfo=timezone.utc),
+        ),
+    )
+
+    await backfill_rollups(connection=connection)
+
+    daily = await connection.execute(
+        select(TransitionDailyModel.bucket, TransitionDailyModel.count)
+        .where(TransitionDailyModel.url_id == url.id)
+        .order_by(TransitionDailyModel.bucket),
+    )
+    assert daily.all() == [
+        (datetime(2030, 1, 10, tzinfo=timezone.utc), 1),
+        (datetime(2030, 2, 10, tzinfo=timezone.utc), 2),
+    ]
@@ -1,6 +1,21 @@
+from typing import List
+
+import pytest
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
+from starlette.types import Message, Receive, Scope, Send
+
+from urlman.db.models import UserModel
+from urlman.services.metrics import render
+from urlman.settings import settings
+from urlman.web.metrics import (
+    APPLICATION_METRICS,
+    QueryStatsMiddleware,
+    http_requests,
+)
 
 
 def test_health(client: TestClient, fastapi_app: FastAPI) -> None:
@@ -13,3 +28,70 @@ def test_health(client: TestClient, fastapi_app: FastAPI) -> None:
     url = fastapi_app.url_path_for("health_check")
     response = client.get(url)
     assert response.status_code == status.HTTP_200_OK
+
+
+def test_metrics_are_labelled_by_route(
+    client: TestClient,
+    fastapi_app: FastAPI,
+) -> None:
+    """
+    Checks that requests are counted by route templates, not by raw paths.
+
+    :param client: client for the app.
+    :param fastapi_app: current FastAPI application.
+    """
+    route = "/api/urls/redirect/{short_code}"
+    before = http_requests.value("GET", route, "404")
+    for short_code in ("first", "second"):
+        response = client.get(
+            fastapi_app.url_path_for("redirect", short_code=short_code),
+            allow_redirects=False,
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    assert http_requests.value("GET", route, "404") == before + 2
+    exposition = render(APPLICATION_METRICS)
+    assert (
+        'urlman_http_requests_total{method="GET",'
+        'route="/api/urls/redirect/{short_code}",status="404"}'
+    ) in exposition
+    assert 'urlman_http_request_duration_seconds_bucket{method="GET",' in exposition
+    assert "first" not in exposition
+
+
+@pytest.mark.asyncio
+async def test_repeated_queries_are_reported(
+    dbsession: AsyncSession,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """
+    Checks that request queries go to Server-Timing and repeats are logged.
+
+    :param dbsession: database session.
+    :param caplog: captured logs.
+    """
+
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        for _ in range(settings.db_n_plus_one_threshold):
+            await dbsession.execute(
+                select(UserModel).where(UserModel.username == "missing")
+            )
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    messages: List[Message] = []
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b""}
+
+    scope = {"type": "http", "method": "GET", "path": "/users", "headers": []}
+    await QueryStatsMiddleware(app)(scope, receive, send)
+
+    headers = dict(messages[0]["headers"])
+    assert headers[b"server-timing"].startswith(
+        f'db;desc="{settings.db_n_plus_one_threshold} queries"'.encode(),
+    )
+    assert "Possible N+1 in GET /users" in caplog.text
@@ -0,0 +1,458 @@
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import pytest
+import ujson
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from urlman.db.models import TransitionModel, UrlModel, UserModel
+from urlman.services.generators import shortcode_allocator
+from urlman.settings import settings
+from urlman.web.api.transitions.repos.services import update_rollups
+from urlman.web.api.transitions.repos.writer import TransitionWriter
+from urlman.web.api.urls.repos.selectors import (
+    NOT_FOUND,
+    _redirect_statements,
+    fetch_redirect_by_shortcode,
+    url_cache,
+)
+
+
+async def add_transition(
+    *,
+    client_ip: str,
+    url_id: uuid.UUID,
+    session: AsyncSession,
+) -> None:
+    """
+    Insert transition and count it in rollups, as the writer does.
+
+    :param client_ip: ip address of the client.
+    :param url_id: id of the shorted url.
+    :param session: database session.
+    """
+    transition = {
+        "ip": client_ip,
+        "check_time": datetime.now(timezone.utc),
+        "url_id": url_id,
+    }
+    session.add(TransitionModel(**transition))
+    await update_rollups(transitions=[transition], connection=session)
+    await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_redirect_uses_cache(
+    fastapi_app: FastAPI,
+    client: TestClient,
+    dbsession: AsyncSession,
+    transition_writer: TransitionWriter,
+) -> None:
+    """
+    Checks that redirect resolves short code once and serves it from cache.
+
+    :param fastapi_app: current application.
+    :param client: client for the app.
+    :param dbsession: database session.
+    :param transition_writer: writer of transitions.
+    """
+    user = UserModel(username="redirect", email="redirect@test.com", password="-")
+    dbsession.add(UrlModel(url="https://test.com", short_code="cached", user=user))
+    await dbsession.commit()
+    await url_cache.clear()
+
+    url = fastapi_app.url_path_for("redirect", short_code="cached")
+    for _ in range(2):
+        response = client.get(url, allow_redirects=False)
+        assert response.status_code == status.HTTP_302_FOUND
+        assert response.headers["location"] == "https://test.com"
+
+    assert url_cache.stats()["hits"] >= 1
+    assert len(transition_writer) == 2
+    assert await url_cache.get("cached") is not None
+
+
+@pytest.mark.asyncio
+async def test_redirect_without_statement_cache(
+    dbsession: AsyncSession,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """
+    Checks that redirect lookup doesn't keep prepared statements
+    when the statement cache is disabled.
+
+    :param dbsession: database session.
+    :param monkeypatch: pytest monkeypatch.
+    """
+    monkeypatch.setattr(settings, "db_statement_cache_size", 0)
+    user = UserModel(username="bouncer", email="bouncer@test.com", password="-")
+    dbsession.add(UrlModel(url="https://test.com", short_code="bouncer", user=user))
+    await dbsession.commit()
+    _redirect_statements.clear()
+
+    redirect = await fetch_redirect_by_shortcode("bouncer", dbsession)
+
+    assert redirect is not None
+    assert redirect.url == "https://test.com"
+    assert not _redirect_statements
+
+
+@pytest.mark.asyncio
+async def test_redirect_caches_unknown_codes(
+    fastapi_app: FastAPI,
+    client: TestClient,
+) -> None:
+    """
+    Checks that unknown short code is looked up in db only once.
+
+    :param fastapi_app: current application.
+    :param client: client for the app.
+    """
+    url = fastapi_app.url_path_for("redirect", short_code="unknown")
+    for _ in range(2):
+        response = client.get(url, allow_redirects=False)
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    assert await url_cache.get("unknown") == NOT_FOUND
+
+
+def test_list_urls_is_paginated(
+    fastapi_app: FastAPI,
+    client: TestClient,
+    auth_headers: Dict[str, str],
+) -> None:
+    """
+    Checks that urls list returns requested page and total count.
+
+    :param fastapi_app: current application.
+    :param client: client for the app.
+    :param auth_headers: authorization headers.
+    """
+    url = fastapi_app.url_path_for("create_url")
+    for number in range(3):
+        client.post(
+            url,
+            json={"url": "https://test.com", "short_code": f"page{number}"},
+            headers=auth_headers,
+        )
+
+    short_codes = []
+    for offset in (0, 2):
+        response = client.get(
+            fastapi_app.url_path_for("get_list_urls"),
+            params={"limit": 2, "offset": offset},
+            headers=auth_headers,
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["total"] == 3
+        short_codes.extend(item["short_code"] for item in response.json()["items"])
+
+    assert sorted(short_codes) == ["page0", "page1", "page2"]
+
+
+@pytest.mark.asyncio
+async def test_single_url_has_latest_transitions(
+    fastapi_app: FastAPI,
+    client: TestClient,
+    dbsession: AsyncSession,
+    auth_headers: Dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """
+    Checks that single url carries total count and only latest transitions.
+
+    :param fastapi_app: current application.
+    :param client: client for the app.
+    :param dbsession: database session.
+    :param auth_headers: authorization headers.
+    :param monkeypatch: pytest monkeypatch.
+    """
+    monkeypatch.setattr(settings, "url_recent_transitions", 2)
+    shorted_url = client.post(
+        fastapi_app.url_path_for("create_url"),
+        json={"url": "https://test.com", "short_code": "recent"},
+        headers=auth_headers,
+    ).json()
+    for number in range(3):
+        await add_transition(
+            client_ip=str(number),
+            url_id=uuid.UUID(shorted_url["id"]),
+            session=dbsession,
+        )
+
+    response = client.get(
+        fastapi_app.url_path_for("get_single_url", url_id=shorted_url["id"]),
+        headers=auth_headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["transitions_count"] == 3
+    assert [item["ip"] for item in response.json()["transitions"]] == ["2", "1"]
+
+
+def test_bulk_create_reports_every_url(
+    fastapi_app: FastAPI,
+    client: TestClient,
+    auth_headers: Dict[str, str],
+) -> None:
+    """
+    Checks that bulk creation reports conflicts and invalid urls per item.
+
+    :param fastapi_app: current application.
+    :param client: client for the app.
+    :param auth_headers: authorization headers.
+    """
+    client.post(
+        fastapi_app.url_path_for("create_url"),
+        json={"url": "https://test.com", "short_code": "taken"},
+        headers=auth_headers,
+    )
+
+    response = client.post(
+        fastapi_app.url_path_for("bulk_create_urls"),
+        json=[
+            {"url": "https://one.com", "short_code": "bulk1"},
+            {"url": "https://two.com"},
+            {"url": "https://three.com", "short_code": "taken"},
+            {"url": "https://four.com", "short_code": "bulk1"},
+            {"url": "https://five.com", "is_protected": True},
+            {"url": "https://six.com", "short_code": "x" * 256},
+        ],
+        headers=auth_headers,
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    results = response.json()
+    assert [item["status"] for item in results] == [
+        "created",
+        "created",
+        "conflict",
+        "conflict",
+        "invalid",
+        "invalid",
+    ]
+    assert results[1]["url"]["url"] == "https://two.com"
+    assert results[1]["short_code"] == results[1]["url"]["short_code"]
+
+    response = client.get(
+        fastapi_app.url_path_for("get_list_urls"),
+        headers=auth_headers,
+    )
+    assert response.json()["total"] == 3
+
+
+def test_bulk_create_replaces_taken_allocated_codes(
+    fastapi_app: FastAPI,
+    client: TestClient,
+    auth_headers: Dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """
+    Checks that allocated codes taken by chosen ones are allocated again
+    and chunks don't exceed the bind parameters limit.
+
+    :param fastapi_app: current application.
+    :param client: client for the app.
+    :param auth_headers: authorization headers.
+    :param monkeypatch: pytest monkeypatch.
+    """
+    client.post(
+        fastapi_app.url_path_for("create_url"),
+        json={"url": "https://test.com", "short_code": "taken"},
+        headers=auth_headers,
+    )
+    allocate_many = shortcode_allocator.allocate_many
+    allocated = []
+
+    async def allocate_taken_first(count: int, session: AsyncSession) -> List[str]:
+        short_codes = await allocate_many(count, session)
+        if not allocated:
+            short_codes[0] = "taken"
+        allocated.append(short_codes)
+        return short_codes
+
+    monkeypatch.setattr(shortcode_allocator, "allocate_many", allocate_taken_first)
+    monkeypatch.setattr(settings, "urls_bulk_chunk_size", 10000)
+    response = client.post(
+        fastapi_app.url_path_for("bulk_create_urls"),
+        json=[{"url": f"https://{number}.com"} for number in range(5000)],
+        headers=auth_headers,
+    )
+
+    assert response.status_code == status.HTTP_201_CREATED
+    results = response.json()
+    assert {item["status"] for item in results} == {"created"}
+    assert results[0]["short_code"] not in {None, "taken"}
+    assert [len(short_codes) for short_codes in allocated] == [5000, 1]
+
+
+@pytest.mark.asyncio
+async def test_bulk_delete_urls(
+    fastapi_app: FastAPI,
+    client: TestClient,
+    dbsession: AsyncSession,
+    auth_headers: Dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """
+    Checks that bulk deletes touch only selected urls of the current user.
+
+    :param fastapi_app: current application.
+    :param client: client for the app.
+    :param dbsession: database session.
+    :param auth_headers: authorization headers.
+    :param monkeypatch: pytest monkeypatch.
+    """
+    monkeypatch.setattr(settings, "urls_bulk_chunk_size", 2)
+    monkeypatch.setattr(settings, "urls_bulk_transitions_batch_size", 1)
+    results = client.post(
+        fastapi_app.url_path_for("bulk_create_urls"),
+        json=[{"url": f"https://{number}.com"} for number in range(5)],
+        headers=auth_headers,
+    ).json()
+    url_ids = [item["url"]["id"] for item in results]
+    for client_ip in ("1", "2", "3"):
+        await add_transition(
+            client_ip=client_ip,
+            url_id=uuid.UUID(url_ids[0]),
+            session=dbsession,
+        )
+
+    response = client.patch(
+        fastapi_app.url_path_for("bulk_delete_urls_soft"),
+        json={"ids": url_ids[:3] + [str(uuid.uuid4())]},
+        headers=auth_headers,
+    )
+    assert response.json() == {"count": 3}
+    response = client.get(
+        fastapi_app.url_path_for("get_list_urls"),
+        headers=auth_headers,
+    )
+    assert response.json()["total"] == 2
+
+    response = client.request(
+        "DELETE",
+        fastapi_app.url_path_for("bulk_delete_urls_hard"),
+        json={"created_before": "2100-01-01T00:00:00+00:00"},
+        headers=auth_headers,
+    )
+    assert response.json() == {"count": 5}
+    url_count = await dbsession.scalar(select(func.count(UrlModel.id)))
+    assert url_count == 0
+    unlinked = await dbsession.scalar(
+        select(func.count()).where(TransitionModel.url_id.is_(None)),
+    )
+    assert unlinked == 3
+
+
+@pytest.mark.asyncio
+async def test_export_transitions(
+    fastapi_app: FastAPI,
+    client: TestClient,
+    dbsession: AsyncSession,
+    auth_headers: Dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """
+    Checks that transitions are streamed as NDJSON and CSV.
+
+    :param fastapi_app: current application.
+    :param client: client for the app.
+    :param dbsession: database session.
+    :param auth_headers: authorization headers.
+    :param monkeypatch: pytest monkeypatch.
+    """
+    monkeypatch.setattr(settings, "transitions_export_fetch_size", 2)
+    url_ids = []
+    for short_code in ("export1", "export2"):
+        shorted_url = client.post(
+            fastapi_app.url_path_for("create_url"),
+            json={"url": "https://test.com", "short_code": short_code},
+            headers=auth_headers,
+        ).json()
+        url_ids.append(shorted_url["id"])
+    for number in range(3):
+        for url_id in url_ids:
+            await add_transition(
+                client_ip=str(number),
+                url_id=uuid.UUID(url_id),
+                session=dbsession,
+            )
+
+    response = client.get(
+        fastapi_app.url_path_for("export_url_transitions", url_id=url_ids[0]),
+        headers=auth_headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [ujson.loads(line) for line in response.text.splitlines()]
+    assert [line["ip"] for line in lines] == ["0", "1", "2"]
+    assert {line["short_code"] for line in lines} == {"export1"}
+
+    response = client.get(
+        fastapi_app.url_path_for("export_user_transitions"),
+        params={"format": "csv"},
+        headers=auth_headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    lines = response.text.splitlines()
+    assert lines[0] == "short_code,ip,check_time"
+    assert len(lines) == 7
+
+
+def test_import_urls(
+    fastapi_app: FastAPI,
+    client: TestClient,
+    auth_headers: Dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """
+    Checks that imported urls are created and rejected lines reported.
+
+    :param fastapi_app: current application.
+    :param client: client for the app.
+    :param auth_headers: authorization headers.
+    :param monkeypatch: pytest monkeypatch.
+    """
+    monkeypatch.setattr(settings, "urls_import_batch_size", 2)
+    client.post(
+        fastapi_app.url_path_for("create_url"),
+        json={"url": "https://test.com", "short_code": "taken"},
+        headers=auth_headers,
+    )
+    csv_file = (
+        "url,short_code,is_protected,key\n"
+        "https://one.com,import1,,\n"
+        "https://two.com,,true,secret\n"
+        "https://three.com,taken,,\n"
+        "https://four.com,,true,\n"
+        "https://five.com,import1,,\n"
+    )
+
+    response = client.post(
+        fastapi_app.url_path_for("import_urls_file"),
+        data=csv_file.encode(),
+        headers=auth_headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    import_result = response.json()
+    assert import_result["created"] == 2
+    assert import_result["conflicts"] == 2
+    assert import_result["invalid"] == 1
+    assert [(error["line"], error["status"]) for error in import_result["errors"]] == [
+        (5, "invalid"),
+        (4, "conflict"),
+        (6, "conflict"),
+    ]
+
+    response = client.post(
+        fastapi_app.url_path_for("import_urls_file"),
+        params={"format": "ndjson"},
+        data=b'{"url": "https://six.com"}\nnot json\n',
+        headers=auth_headers,
+    )
+    assert response.json()["created"] == 1
+    assert response.json()["invalid"] == 1
@@ -0,0 +1,168 @@
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Dict
+
+import pytest
+import ujson
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from urlman.db.models import UserModel
+from urlman.services import cache
+from urlman.settings import settings
+from urlman.web.api.auth import jwt_auth
+from urlman.web.api.users.repos.selectors import user_cache
+
+
+def test_current_user_is_cached(fastapi_app: FastAPI, client: TestClient) -> None:
+    """
+    Checks that authenticated requests reuse cached user until it changes.
+
+    :param fastapi_app: current application.
+    :param client: client for the app.
+    """
+    credentials = {"username": "cached", "password": "password"}
+    client.post(
+        fastapi_app.url_path_for("create_user"),
+        json={**credentials, "email": "cached@test.com"},
+    )
+    token = client.post(
+        fastapi_app.url_path_for("login"),
+        json=credentials,
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    hits = user_cache.stats()["hits"]
+
+    for _ in range(2):
+        response = client.get(fastapi_app.url_path_for("profile"), headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["username"] == "cached"
+    assert user_cache.stats()["hits"] == hits + 1
+
+    response = client.patch(
+        fastapi_app.url_path_for("change_password"),
+        json={"password": "password", "new_password": "changed"},
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    response = client.post(
+        fastapi_app.url_path_for("login"),
+        json={"username": "cached", "password": "changed"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_soft_deleted_user_is_rejected(
+    fastapi_app: FastAPI,
+    client: TestClient,
+    auth_headers: Dict[str, str],
+) -> None:
+    """
+    Checks that cached user and its login are rejected after soft deletion.
+
+    :param fastapi_app: current application.
+    :param client: client for the app.
+    :param auth_headers: authorization headers.
+    """
+    profile = client.get(fastapi_app.url_path_for("profile"), headers=auth_headers)
+    assert profile.status_code == status.HTTP_200_OK
+
+    response = client.patch(
+        fastapi_app.url_path_for("delete_user_soft", user_id=profile.json()["id"]),
+        headers=auth_headers,
+    )
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    response = client.get(fastapi_app.url_path_for("profile"), headers=auth_headers)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    response = client.post(
+        fastapi_app.url_path_for("login"),
+        json={"username": "johndoe", "password": "password"},
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_user_changed_by_other_worker_is_rejected(
+    fastapi_app: FastAPI,
+    client: TestClient,
+    auth_headers: Dict[str, str],
+    dbsession: AsyncSession,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """
+    Checks that user cached by the worker is rejected after token revocation
+    or deletion made by another worker, once the local cache expires.
+
+    :param fastapi_app: current application.
+    :param client: client for the app.
+    :param auth_headers: authorization headers.
+    :param dbsession: database session.
+    :param monkeypatch: monkeypatch of the cache clock.
+    """
+    clock = [time.monotonic()]
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+    assert user_cache.ttl == settings.user_cache_local_ttl
+
+    response = client.get(fastapi_app.url_path_for("profile"), headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert "password" not in ujson.loads(await user_cache.get("johndoe"))
+
+    await dbsession.execute(
+        update(UserModel)
+        .where(UserModel.username == "johndoe")
+        .values(tokens_revoked_at=datetime.now(timezone.utc)),
+    )
+    clock[0] += settings.user_cache_local_ttl
+    response = client.get(fastapi_app.url_path_for("profile"), headers=auth_headers)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    await dbsession.execute(
+        update(UserModel)
+        .where(UserModel.username == "johndoe")
+        .values(tokens_revoked_at=None, is_deleted=True),
+    )
+    clock[0] += settings.user_cache_local_ttl
+    response = client.get(fastapi_app.url_path_for("profile"), headers=auth_headers)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_revoked_tokens_are_rejected(
+    fastapi_app: FastAPI,
+    client: TestClient,
+    auth_headers: Dict[str, str],
+) -> None:
+    """
+    Checks that verified tokens are cached and rejected after revocation.
+
+    :param fastapi_app: current application.
+    :param client: client for the app.
+    :param auth_headers: authorization headers.
+    """
+    hits = jwt_auth.stats()["hits"]
+    for _ in range(2):
+        response = client.get(fastapi_app.url_path_for("profile"), headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+    assert jwt_auth.stats()["hits"] == hits + 1
+
+    response = client.patch(
+        fastapi_app.url_path_for("revoke_tokens"),
+        headers=auth_headers,
+    )
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    response = client.get(fastapi_app.url_path_for("profile"), headers=auth_headers)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    token = client.post(
+        fastapi_app.url_path_for("login"),
+        json={"username": "johndoe", "password": "password"},
+    ).json()["access_token"]
+    response = client.get(
+        fastapi_app.url_path_for("profile"),
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == status.HTTP_200_OK
@@ -1,23 +1,47 @@
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from typing import Any, Dict, NamedTuple
 
 from jwt.api_jwt import decode, encode
 
 from urlman.settings import settings
 
 
+class TokenClaims(NamedTuple):
+    """Verified claims of a token."""
+
+    subject: str
+    issued_at: float
+    expires_at: float
+
+
 class JWTAuth:
-    """JWT authentication class."""
+    """
+    JWT authentication class.
+
+    Clients send the same token with every request, so verified tokens
+    are remembered in a LRU of ``cache_size`` entries until their ``exp``.
+    """
 
     secret = settings.jwt_secret
     exp = settings.jwt_expires
     iss = settings.jwt_iss
     algorithm = settings.jwt_alg
 
+    def __init__(self, cache_size: int = settings.jwt_cache_size) -> None:
+        self.cache_size = cache_size
+        self._verified: "OrderedDict[str, TokenClaims]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
     def encode_token(self, username: str) -> str:
         """Encode payload to JWT."""
         payload = {
             "exp": datetime.utcnow() + timedelta(self.exp),
-            "iat": datetime.utcnow(),
+            # Fractions of a second tell tokens issued after a revocation.
+            "iat": time.time(),
             "iss": self.iss,
             "scope": "access_token",
             "sub": username,
@@ -30,12 +54,57 @@ class JWTAuth:
 
     def decode_token(self, token: str) -> str:
         """Decode JWT to payload."""
+        return self.verify_token(token).subject
+
+    def verify_token(self, token: str) -> TokenClaims:
+        """
+        Get claims of a token, verifying only unknown tokens.
+
+        :param token: encoded JWT.
+        :return: subject, issue and expiration times of the token.
+        """
+        claims = self._verified.get(token)
+        if claims is not None:
+            if claims.expires_at > time.time():
+                self._verified.move_to_end(token)
+                self.hits += 1
+                return claims
+            # Expired, decode raises the same error as for an unknown token.
+            del self._verified[token]
+            self.evictions += 1
+        self.misses += 1
         payload = decode(
             jwt=token,
             key=self.secret,
             algorithms=[self.algorithm],
         )
-        return payload.get("sub")
+        claims = TokenClaims(
+            subject=payload.get("sub"),
+            issued_at=payload.get("iat", 0),
+            expires_at=payload.get("exp", 0),
+        )
+        if self.cache_size > 0 and claims.expires_at:
+            self._verified[token] = claims
+            if len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+                self.evictions += 1
+        return claims
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get counters of the verified tokens cache.
+
+        :return: size, hits, misses, evictions and hit rate.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._verified),
+            "maxsize": self.cache_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
 
 
 jwt_auth = JWTAuth()
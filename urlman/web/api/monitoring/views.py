@@ -1,4 +1,19 @@
-from fastapi import APIRouter
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends
+from starlette.requests import Request
+from starlette.responses import Response
+
+from urlman.services.metrics import Counter, Gauge, HistogramMetric, Metric, render
+from urlman.web.api.auth import jwt_auth
+from urlman.web.api.transitions.dependencies import get_transition_writer
+from urlman.web.api.transitions.repos.writer import TransitionWriter
+from urlman.web.api.urls.repos.filters import shortcode_filter
+from urlman.web.api.urls.repos.selectors import url_cache
+from urlman.web.api.users.repos.selectors import user_cache
+from urlman.web.metrics import APPLICATION_METRICS
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
 
 router = APIRouter()
 
@@ -10,3 +25,139 @@ def health_check() -> None:
 
     It returns 200 if the project is healthy.
     """
+
+
+@router.get("/stats")
+async def worker_stats(
+    request: Request,
+    transition_writer: TransitionWriter = Depends(get_transition_writer),
+) -> Dict[str, Any]:
+    """
+    Get counters of the caches, short code filter, transition writer and db pools.
+
+    Counters belong to the worker which handled the request.
+    """
+    return {
+        "url_cache": url_cache.stats(),
+        "user_cache": user_cache.stats(),
+        "token_cache": jwt_auth.stats(),
+        "shortcode_filter": shortcode_filter.stats(),
+        "transition_writer": transition_writer.stats(),
+        "db_pool": request.app.state.db_pool_metrics.stats(
+            request.app.state.db_engine.pool,
+        ),
+        "db_replica": _replica_stats(request),
+    }
+
+
+def _replica_stats(request: Request) -> Optional[Dict[str, Any]]:
+    replica = request.app.state.db_replica
+    if replica is None:
+        return None
+    return {
+        **replica.stats(),
+        "pool": request.app.state.db_replica_pool_metrics.stats(replica.engine.pool),
+    }
+
+
+@router.get("/metrics", response_class=Response)
+async def worker_metrics(
+    request: Request,
+    transition_writer: TransitionWriter = Depends(get_transition_writer),
+) -> Response:
+    """
+    Get metrics in the Prometheus text format.
+
+    Metrics belong to the worker which handled the request.
+    """
+    return Response(
+        render(
+            [
+                *APPLICATION_METRICS,
+                *_cache_metrics(),
+                *_transition_metrics(transition_writer),
+                *_pool_metrics(request),
+            ],
+        ),
+        media_type=PROMETHEUS_CONTENT_TYPE,
+    )
+
+
+def _cache_metrics() -> List[Metric]:
+    lookups = Counter(
+        "urlman_cache_lookups_total",
+        "Cache lookups by result.",
+        ("cache", "result"),
+    )
+    caches = {
+        "url": url_cache.stats(),
+        "user": user_cache.stats(),
+        "token": jwt_auth.stats(),
+    }
+    for cache_name, cache_stats in caches.items():
+        lookups.inc(cache_name, "hit", amount=cache_stats["hits"])
+        lookups.inc(cache_name, "miss", amount=cache_stats["misses"])
+    rejected = Counter(
+        "urlman_shortcode_filter_rejected_total",
+        "Unknown short codes rejected by the bloom filter.",
+    )
+    rejected.inc(amount=shortcode_filter.stats()["rejected"])
+    return [lookups, rejected]
+
+
+def _transition_metrics(transition_writer: TransitionWriter) -> List[Metric]:
+    writer_stats = transition_writer.stats()
+    written = Counter(
+        "urlman_transitions_written_total",
+        "Transitions written to the database.",
+    )
+    written.inc(amount=writer_stats["flushed"])
+    dropped = Counter(
+        "urlman_transitions_dropped_total",
+        "Transitions dropped because the buffer was full.",
+    )
+    dropped.inc(amount=writer_stats["dropped"])
+    buffered = Gauge(
+        "urlman_transitions_buffered",
+        "Transitions waiting to be written.",
+    )
+    buffered.set(writer_stats["buffered"])
+    return [written, dropped, buffered]
+
+
+def _pool_metrics(request: Request) -> List[Metric]:
+    connections = Gauge(
+        "urlman_db_pool_connections",
+        "Connections of the pool by state.",
+        ("database", "state"),
+    )
+    wait_time = HistogramMetric(
+        "urlman_db_pool_wait_seconds",
+        "Time to check out a connection from the pool.",
+        ("database",),
+    )
+    pools = {
+        "primary": (request.app.state.db_pool_metrics, request.app.state.db_engine)
+    }
+    replica = request.app.state.db_replica
+    if replica is not None:
+        pools["replica"] = (request.app.state.db_replica_pool_metrics, replica.engine)
+    for database, (pool_metrics, engine) in pools.items():
+        pool_stats = pool_metrics.stats(engine.pool)
+        for state in ("checked_in", "checked_out", "overflow"):
+            connections.set(pool_stats[state], database, state)
+        wait_time.add(pool_metrics.wait_time, database)
+    replica_metrics: List[Metric] = []
+    if replica is not None:
+        healthy = Gauge(
+            "urlman_db_replica_healthy",
+            "Whether reads go to the replica.",
+        )
+        healthy.set(int(replica.healthy))
+        lag = Gauge(
+            "urlman_db_replica_lag_seconds",
+            "Replication lag seen by the last check.",
+        )
+        lag.set(replica.lag if replica.lag is not None else float("nan"))
+        replica_metrics = [healthy, lag]
+    return [connections, wait_time, *replica_metrics]
@@ -0,0 +1,13 @@
+from starlette.requests import Request
+
+from urlman.web.api.transitions.repos.writer import TransitionWriter
+
+
+def get_transition_writer(request: Request) -> TransitionWriter:
+    """
+    Get transition writer of the current worker.
+
+    :param request: current request.
+    :return: transition writer.
+    """
+    return request.app.state.transition_writer
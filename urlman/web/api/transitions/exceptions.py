@@ -0,0 +1,11 @@
+from fastapi import HTTPException
+
+
+class TransitionCursorException(HTTPException):
+    """Raised when transitions cursor is malformed."""
+
+    def __init__(self) -> None:
+        super(TransitionCursorException, self).__init__(
+            status_code=400,
+            detail="Invalid cursor.",
+        )
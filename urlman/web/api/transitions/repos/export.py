@@ -0,0 +1,79 @@
+import csv
+import io
+from typing import AsyncIterator, Callable, Dict, Sequence, Tuple
+
+import ujson
+from sqlalchemy.engine import Row
+
+EXPORT_FIELDS = ("short_code", "ip", "check_time")
+
+
+def format_ndjson(rows: Sequence[Row]) -> str:
+    """
+    Format rows as newline delimited JSON.
+
+    :param rows: exported rows.
+    :return: one JSON object per line.
+    """
+    return "".join(
+        ujson.dumps(
+            {
+                "short_code": row.short_code,
+                "ip": row.ip,
+                "check_time": row.check_time.isoformat(),
+            },
+        )
+        + "\n"
+        for row in rows
+    )
+
+
+def format_csv(rows: Sequence[Row]) -> str:
+    """
+    Format rows as CSV lines.
+
+    :param rows: exported rows.
+    :return: CSV lines without the header.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(
+        (row.short_code, row.ip, row.check_time.isoformat()) for row in rows
+    )
+    return buffer.getvalue()
+
+
+def csv_header() -> str:
+    """
+    Get header line of the CSV export.
+
+    :return: CSV line with the field names.
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(EXPORT_FIELDS)
+    return buffer.getvalue()
+
+
+# Media type, file extension and formatter of every export format.
+EXPORT_FORMATS: Dict[str, Tuple[str, str, Callable[[Sequence[Row]], str]]] = {
+    "ndjson": ("application/x-ndjson", "ndjson", format_ndjson),
+    "csv": ("text/csv", "csv", format_csv),
+}
+
+
+async def export_transitions(
+    chunks: AsyncIterator[Sequence[Row]],
+    export_format: str,
+) -> AsyncIterator[str]:
+    """
+    Format streamed chunks of transitions.
+
+    :param chunks: chunks of rows from the database.
+    :param export_format: name of the format.
+    :yield: formatted chunks.
+    """
+    formatter = EXPORT_FORMATS[export_format][2]
+    if export_format == "csv":
+        yield csv_header()
+    async for rows in chunks:
+        yield formatter(rows)
@@ -0,0 +1,287 @@
+import re
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from urlman.settings import settings
+
+PARTITION_NAME = re.compile(r"^transitions_p(\d{4})(\d{2})$")
+
+# Serializes partition changes of several workers.
+LOCK_QUERY = "SELECT pg_advisory_xact_lock(hashtext('transitions_partitions'))"
+
+PARTITIONED_QUERY = (
+    "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('transitions')"
+)
+
+# Partitions detached by an earlier run which were not dropped yet.
+DETACHED_QUERY = (
+    "SELECT relname FROM pg_class "
+    "WHERE relname ~ '^transitions_p[0-9]{6}$' AND relkind = 'r' "
+    "AND NOT relispartition"
+)
+
+# DETACH waits in the lock queue of transitions at most this long,
+# so it doesn't hold up redirects behind a long query.
+DETACH_LOCK_TIMEOUT = "5s"
+
+OLDEST_DEFAULT_QUERY = "SELECT min(check_time) FROM transitions_default"
+
+PARTITIONS_QUERY = (
+    "SELECT child.relname FROM pg_inherits "
+    "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+    "WHERE pg_inherits.inhparent = to_regclass('transitions')"
+)
+
+
+def month_start(moment: datetime) -> datetime:
+    """
+    Get the first moment of the UTC month.
+
+    :param moment: aware datetime.
+    :return: start of the month.
+    """
+    return moment.astimezone(timezone.utc).replace(
+        day=1,
+        hour=0,
+        minute=0,
+        second=0,
+        microsecond=0,
+    )
+
+
+def next_month(start: datetime) -> datetime:
+    """
+    Get start of the next month.
+
+    :param start: start of a month.
+    :return: start of the following month.
+    """
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def partition_name(start: datetime) -> str:
+    """
+    Get name of the partition of the month.
+
+    :param start: start of the month.
+    :return: table name.
+    """
+    return f"transitions_p{start:%Y%m}"
+
+
+async def get_partition_names(connection: AsyncConnection) -> List[str]:
+    """
+    Get names of all transitions partitions.
+
+    :param connection: database connection.
+    :return: names of the partitions, the default one included.
+    """
+    result = await connection.execute(text(PARTITIONS_QUERY))
+    return result.scalars().all()
+
+
+async def get_retained_since(connection: AsyncConnection) -> Optional[datetime]:
+    """
+    Get the moment since which no transitions were deleted by retention.
+
+    Partitions are dropped whole, so the oldest remaining one is complete.
+    Expired rows of the default partition are deleted up to any moment,
+    so the day of its oldest row is treated as incomplete.
+
+    :param connection: database connection.
+    :return: start of a UTC day, None if there are no transitions.
+    """
+    bounds = [
+        start
+        for start in map(_partition_start, await get_partition_names(connection))
+        if start is not None
+    ]
+    oldest_default = await connection.scalar(text(OLDEST_DEFAULT_QUERY))
+    if oldest_default is not None:
+        oldest_day = oldest_default.astimezone(timezone.utc).replace(
+            hour=0,
+            minute=0,
+            second=0,
+            microsecond=0,
+        )
+        bounds.append(oldest_day + timedelta(days=1))
+    return min(bounds, default=None)
+
+
+async def create_partitions(
+    *,
+    since: datetime,
+    until: datetime,
+    connection: AsyncConnection,
+) -> List[str]:
+    """
+    Create monthly partitions covering the period.
+
+    Transitions of the new months already written to the default
+    partition are moved to the new partitions.
+    Does nothing if the table is not partitioned yet.
+
+    :param since: start of the period.
+    :param until: end of the period.
+    :param connection: database connection.
+    :return: names of the created partitions.
+    """
+    if not await connection.scalar(text(PARTITIONED_QUERY)):
+        return []
+    await connection.execute(text(LOCK_QUERY))
+    existing = set(await get_partition_names(connection))
+    created = []
+    start = month_start(since)
+    while start <= until:
+        end = next_month(start)
+        name = partition_name(start)
+        if name not in existing:
+            await _create_partition(name, start, end, connection)
+            created.append(name)
+        start = end
+    return created
+
+
+async def drop_expired_partitions(
+    *,
+    before: datetime,
+    engine: AsyncEngine,
+) -> List[str]:
+    """
+    Drop partitions which end before the moment.
+
+    Partitions are detached in a short transaction of their own, because
+    DETACH holds an ACCESS EXCLUSIVE lock of transitions until commit,
+    which blocks redirects writing transitions. The detached tables
+    are dropped afterwards without locking transitions.
+    Expired rows of the default partition are deleted.
+    Hourly and daily counts are kept.
+
+    :param before: oldest kept check time.
+    :param engine: database engine.
+    :return: names of the dropped partitions.
+    """
+    async with engine.begin() as conn:
+        await detach_expired_partitions(before=before, connection=conn)
+    async with engine.begin() as conn:
+        return await drop_detached_partitions(before=before, connection=conn)
+
+
+async def detach_expired_partitions(
+    *,
+    before: datetime,
+    connection: AsyncConnection,
+) -> List[str]:
+    """
+    Detach partitions which end before the moment.
+
+    Commit soon after, the lock of transitions is held until then.
+
+    :param before: oldest kept check time.
+    :param connection: database connection.
+    :return: names of the detached partitions.
+    """
+    if not await connection.scalar(text(PARTITIONED_QUERY)):
+        return []
+    await connection.execute(text(LOCK_QUERY))
+    await connection.execute(text(f"SET LOCAL lock_timeout = '{DETACH_LOCK_TIMEOUT}'"))
+    detached = []
+    for name in _expired(await get_partition_names(connection), before):
+        await connection.execute(
+            text(f"ALTER TABLE transitions DETACH PARTITION {name}"),
+        )
+        detached.append(name)
+    return detached
+
+
+async def drop_detached_partitions(
+    *,
+    before: datetime,
+    connection: AsyncConnection,
+) -> List[str]:
+    """
+    Drop detached partitions which end before the moment.
+
+    Expired rows of the default partition are deleted.
+
+    :param before: oldest kept check time.
+    :param connection: database connection.
+    :return: names of the dropped tables.
+    """
+    if not await connection.scalar(text(PARTITIONED_QUERY)):
+        return []
+    detached = (await connection.execute(text(DETACHED_QUERY))).scalars().all()
+    dropped = []
+    for name in _expired(detached, before):
+        await connection.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+    await connection.execute(
+        text("DELETE FROM transitions_default WHERE check_time < :before"),
+        {"before": before},
+    )
+    return dropped
+
+
+async def create_future_partitions(
+    connection: AsyncConnection,
+    now: Optional[datetime] = None,
+) -> List[str]:
+    """
+    Create partitions of the current and ``transitions_partitions_ahead`` months.
+
+    :param connection: database connection.
+    :param now: current time.
+    :return: names of the created partitions.
+    """
+    if now is None:
+        now = datetime.now(timezone.utc)
+    until = month_start(now)
+    for _ in range(settings.transitions_partitions_ahead):
+        until = next_month(until)
+    return await create_partitions(since=now, until=until, connection=connection)
+
+
+async def _create_partition(
+    name: str,
+    start: datetime,
+    end: datetime,
+    connection: AsyncConnection,
+) -> None:
+    await connection.execute(
+        text(f"CREATE TABLE {name} (LIKE transitions INCLUDING DEFAULTS)"),
+    )
+    await connection.execute(
+        text(
+            "WITH moved AS (DELETE FROM transitions_default "
+            "WHERE check_time >= :start AND check_time < :end RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved",
+        ),
+        {"start": start, "end": end},
+    )
+    await connection.execute(
+        text(
+            f"ALTER TABLE transitions ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')",
+        ),
+    )
+
+
+def _partition_start(name: str) -> Optional[datetime]:
+    match = PARTITION_NAME.match(name)
+    if match is None:
+        return None
+    return datetime(int(match[1]), int(match[2]), 1, tzinfo=timezone.utc)
+
+
+def _expired(names: List[str], before: datetime) -> List[str]:
+    expired = []
+    for name in sorted(names):
+        start = _partition_start(name)
+        if start is not None and next_month(start) <= before:
+            expired.append(name)
+    return expired
@@ -1,41 +1,174 @@
-from typing import List
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Sequence
 
-from sqlalchemy import func, select
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from urlman.db.models.transition import TransitionModel
+from urlman.db.models.transition_rollup import (
+    TransitionDailyModel,
+    TransitionHourlyModel,
+)
 from urlman.db.models.urls import UrlModel
+from urlman.db.models.user import UserModel
+from urlman.services.cursors import decode_cursor, encode_cursor
+from urlman.settings import settings
+from urlman.web.api.transitions.exceptions import TransitionCursorException
+from urlman.web.api.transitions.schemas import TransitionOut, TransitionPage
 
+ROLLUP_MODELS = {
+    "hour": TransitionHourlyModel,
+    "day": TransitionDailyModel,
+}
 
-async def get_transitions_by_url(
+
+async def get_recent_transitions(
     *,
     url: UrlModel,
+    limit: int,
     session: AsyncSession,
 ) -> List[TransitionModel]:
-    """Get transitions by url."""
+    """Get the latest transitions of url."""
     stmt = (
         select(TransitionModel)
         .where(
-            TransitionModel.url == url,
+            TransitionModel.url_id == url.id,
         )
         .order_by(
-            TransitionModel.check_time,
+            TransitionModel.check_time.desc(),
+            TransitionModel.id.desc(),
         )
+        .limit(limit)
     )
     result = await session.execute(stmt)
     return result.scalars().fetchall()
 
 
-async def get_transitions_count(*, url: UrlModel, session: AsyncSession) -> int:
-    """Get transitions count."""
+async def get_transitions_page(
+    *,
+    url: UrlModel,
+    cursor: Optional[str] = None,
+    size: int,
+    session: AsyncSession,
+) -> TransitionPage:
+    """Get page of url transitions ordered by (check_time, id) after cursor."""
     stmt = (
-        select([func.count()])
-        .select_from(
-            TransitionModel,
-        )
+        select(TransitionModel)
         .where(
-            TransitionModel.url == url,
+            TransitionModel.url_id == url.id,
+        )
+        .order_by(
+            TransitionModel.check_time,
+            TransitionModel.id,
         )
+        .limit(size + 1)
+    )
+    if cursor:
+        try:
+            check_time, transition_id = decode_cursor(cursor)
+            after = (datetime.fromisoformat(check_time), int(transition_id))
+        except (TypeError, ValueError):
+            raise TransitionCursorException()
+        # The plain condition on check_time lets partitions be pruned.
+        stmt = stmt.where(
+            TransitionModel.check_time >= after[0],
+            tuple_(TransitionModel.check_time, TransitionModel.id) > tuple_(*after),
+        )
+    result = await session.execute(stmt)
+    transitions = result.scalars().fetchall()
+    next_cursor = None
+    if len(transitions) > size:
+        transitions = transitions[:size]
+        last = transitions[-1]
+        next_cursor = encode_cursor(last.check_time.isoformat(), last.id)
+    return TransitionPage(
+        items=[TransitionOut.from_orm(transition) for transition in transitions],
+        next_cursor=next_cursor,
+    )
+
+
+async def get_transitions_count(*, url: UrlModel, session: AsyncSession) -> int:
+    """Get transitions count from daily rollups."""
+    stmt = select(func.coalesce(func.sum(TransitionDailyModel.count), 0)).where(
+        TransitionDailyModel.url_id == url.id,
     )
     result = await session.execute(stmt)
     return result.scalar()
+
+
+async def get_transitions_stats(
+    *,
+    url: UrlModel,
+    granularity: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    session: AsyncSession,
+) -> List[TransitionHourlyModel]:
+    """Get transitions counts of url per hour or day."""
+    model = ROLLUP_MODELS[granularity]
+    stmt = (
+        select(model)
+        .where(
+            model.url_id == url.id,
+        )
+        .order_by(
+            model.bucket,
+        )
+    )
+    if since is not None:
+        stmt = stmt.where(model.bucket >= since)
+    if until is not None:
+        stmt = stmt.where(model.bucket < until)
+    result = await session.execute(stmt)
+    return result.scalars().fetchall()
+
+
+async def stream_transitions(
+    *,
+    user: UserModel,
+    url: Optional[UrlModel] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    session: AsyncSession,
+) -> AsyncIterator[Sequence[Row]]:
+    """
+    Stream transitions of url or of all user urls ordered by (check_time, id).
+
+    Rows are read from a server-side cursor and yielded by chunks of
+    ``transitions_export_fetch_size``, so memory use doesn't depend on
+    the number of transitions.
+
+    :param user: owner of the urls.
+    :param url: exported url, all urls of the user by default.
+    :param since: start of the exported period, only its partitions are read.
+    :param until: end of the exported period.
+    :param session: database session.
+    :yield: chunks of rows with short code, ip and check time.
+    """
+    stmt = (
+        select(
+            UrlModel.short_code,
+            TransitionModel.ip,
+            TransitionModel.check_time,
+        )
+        .join(UrlModel, TransitionModel.url_id == UrlModel.id)
+        .where(
+            UrlModel.user_id == user.id,
+            UrlModel.is_deleted == False,
+        )
+        .order_by(
+            TransitionModel.check_time,
+            TransitionModel.id,
+        )
+        .execution_options(yield_per=settings.transitions_export_fetch_size)
+    )
+    if url is not None:
+        stmt = stmt.where(TransitionModel.url_id == url.id)
+    if since is not None:
+        stmt = stmt.where(TransitionModel.check_time >= since)
+    if until is not None:
+        stmt = stmt.where(TransitionModel.check_time < until)
+    result = await session.stream(stmt)
+    async for rows in result.partitions():
+        yield rows
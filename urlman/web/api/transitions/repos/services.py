@@ -1,25 +1,106 @@
-from typing import Optional
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Union
 
-from sqlalchemy import func
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, func, literal_column, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
 
 from urlman.db.models.transition import TransitionModel
-from urlman.db.models.urls import UrlModel
+from urlman.db.models.transition_rollup import (
+    TransitionDailyModel,
+    TransitionHourlyModel,
+)
+from urlman.web.api.transitions.repos.partitions import get_retained_since
 
+ROLLUPS = (
+    (TransitionHourlyModel, "hour"),
+    (TransitionDailyModel, "day"),
+)
 
-async def create_transition(
-    *,
-    client_ip: Optional[str],
-    url: UrlModel,
-    session: AsyncSession,
-) -> Optional[TransitionModel]:
-    """Create url transition."""
-    transition = TransitionModel(
-        ip=client_ip,
-        check_time=func.now(),
-        url=url,
-        url_id=url.id,
+
+def truncate_check_time(check_time: datetime, precision: str) -> datetime:
+    """Truncate transition time to the start of UTC hour or day."""
+    bucket = check_time.astimezone(timezone.utc).replace(
+        minute=0,
+        second=0,
+        microsecond=0,
     )
-    session.add(transition)
-    await session.commit()
-    return transition
+    if precision == "day":
+        bucket = bucket.replace(hour=0)
+    return bucket
+
+
+async def update_rollups(
+    *,
+    transitions: List[Dict[str, Any]],
+    connection: Union[AsyncConnection, AsyncSession],
+) -> None:
+    """Add transitions to hourly and daily counts of urls."""
+    for model, precision in ROLLUPS:
+        counts = Counter(
+            (
+                transition["url_id"],
+                truncate_check_time(transition["check_time"], precision),
+            )
+            for transition in transitions
+        )
+        stmt = insert(model).values(
+            [
+                {"url_id": url_id, "bucket": bucket, "count": bucket_count}
+                for (url_id, bucket), bucket_count in sorted(counts.items())
+            ],
+        )
+        await connection.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[model.url_id, model.bucket],
+                set_={"count": model.count + stmt.excluded.count},
+            ),
+        )
+
+
+async def backfill_rollups(
+    *,
+    connection: AsyncConnection,
+    since: Optional[datetime] = None,
+) -> None:
+    """
+    Recalculate hourly and daily counts of urls from transitions.
+
+    Only buckets since the moment are rebuilt, older ones are kept,
+    because their transitions could be deleted by retention.
+    Transitions are locked against writes until the transaction ends.
+
+    :param connection: database connection.
+    :param since: oldest rebuilt moment, rounded up to the start of a UTC day,
+        by default the moment since which no transitions were deleted.
+    """
+    await connection.execute(text("LOCK TABLE transitions IN SHARE MODE"))
+    if since is None:
+        since = await get_retained_since(connection)
+        if since is None:
+            return
+    day = truncate_check_time(since, "day")
+    if day < since:
+        day += timedelta(days=1)
+    for model, precision in ROLLUPS:
+        utc = literal_column("'UTC'")
+        bucket = func.timezone(
+            utc,
+            func.date_trunc(
+                literal_column(f"'{precision}'"),
+                func.timezone(utc, TransitionModel.check_time),
+            ),
+        )
+        await connection.execute(delete(model).where(model.bucket >= day))
+        await connection.execute(
+            insert(model).from_select(
+                ["url_id", "bucket", "count"],
+                select(TransitionModel.url_id, bucket, func.count())
+                .where(
+                    TransitionModel.url_id.isnot(None),
+                    TransitionModel.check_time >= day,
+                )
+                .group_by(TransitionModel.url_id, bucket),
+            ),
+        )
@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Literal, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from urlman.db.models.transition import TransitionModel
+from urlman.db.models.urls import UrlModel
+from urlman.web.api.transitions.repos.services import update_rollups
+
+logger = logging.getLogger(__name__)
+
+OverflowPolicy = Literal["drop_newest", "drop_oldest", "block"]
+
+
+class TransitionWriter:
+    """
+    Buffered writer of url transitions.
+
+    Transitions are collected in memory of the worker and
+    written with multi-row INSERTs when the batch is full
+    or the flush interval has passed. Hourly and daily counts
+    of urls are updated in the same transaction.
+
+    When the buffer is full the overflow policy decides what is lost:
+    ``drop_newest`` rejects the incoming transition, ``drop_oldest``
+    discards the oldest buffered one and ``block`` makes ``put`` wait
+    up to ``put_timeout`` seconds for a flush before dropping the incoming
+    one.
+
+    A batch rejected because some of its urls were hard-deleted
+    meanwhile is written again without the transitions of those urls.
+    """
+
+    def __init__(
+        self,
+        *,
+        engine: AsyncEngine,
+        batch_size: int = 500,
+        flush_interval: float = 1,
+        buffer_size: int = 10000,
+        overflow_policy: OverflowPolicy = "drop_newest",
+        put_timeout: float = 0.5,
+    ) -> None:
+        self.engine = engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+        self.overflow_policy = overflow_policy
+        self.put_timeout = put_timeout
+        self.flushed = 0
+        self.dropped = 0
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._flush_requested = asyncio.Event()
+        self._space_freed = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._stopping = False
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def add(self, *, client_ip: Optional[str], url_id: uuid.UUID) -> bool:
+        """
+        Put transition to the buffer without waiting.
+
+        The ``block`` policy behaves like ``drop_newest`` here.
+
+        :param client_ip: ip address of the client.
+        :param url_id: id of the shorted url.
+        :return: False if the buffer is full and transition was dropped.
+        """
+        if len(self._buffer) >= self.buffer_size:
+            if self.overflow_policy != "drop_oldest":
+                self.dropped += 1
+                return False
+            self._buffer.popleft()
+            self.dropped += 1
+        self._buffer.append(
+            {
+                "ip": client_ip,
+                "check_time": datetime.now(timezone.utc),
+                "url_id": url_id,
+            },
+        )
+        if len(self._buffer) >= self.batch_size:
+            self._flush_requested.set()
+        return True
+
+    async def put(self, *, client_ip: Optional[str], url_id: uuid.UUID) -> bool:
+        """
+        Put transition to the buffer applying the overflow policy.
+
+        :param client_ip: ip address of the client.
+        :param url_id: id of the shorted url.
+        :return: False if transition was dropped.
+        """
+        if self.overflow_policy == "block" and len(self._buffer) >= self.buffer_size:
+            await self._wait_for_space()
+        return self.add(client_ip=client_ip, url_id=url_id)
+
+    async def flush(self) -> None:
+        """Write all buffered transitions to the database."""
+        async with self._flush_lock:
+            while self._buffer:
+                batch_len = min(self.batch_size, len(self._buffer))
+                batch = [self._buffer.popleft() for _ in range(batch_len)]
+                try:
+                    written = await self._write_batch(batch)
+                except Exception:
+                    logger.exception("Failed to write %d transitions", batch_len)
+                    self.dropped += batch_len
+                    return
+                self.flushed += written
+                self.dropped += batch_len - written
+                self._space_freed.set()
+
+    async def start(self) -> None:
+        """Start periodic flushing."""
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stop periodic flushing and write the rest of the buffer.
+
+        The flushing task is not cancelled, so a batch being written
+        when the worker stops is not lost.
+        """
+        if self._task is not None:
+            self._stopping = True
+            self._flush_requested.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get writer counters.
+
+        :return: buffered, flushed and dropped transitions.
+        """
+        return {
+            "buffered": len(self._buffer),
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+        }
+
+    async def _wait_for_space(self) -> None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.put_timeout
+        while len(self._buffer) >= self.buffer_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                return
+            self._space_freed.clear()
+            self._flush_requested.set()
+            try:
+                await asyncio.wait_for(self._space_freed.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return
+
+    async def _write_batch(self, batch: List[Dict[str, Any]]) -> int:
+        try:
+            await self._write(batch)
+        except IntegrityError:
+            existing = await self._without_deleted_urls(batch)
+            logger.warning(
+                "Discarding %d transitions of deleted urls",
+                len(batch) - len(existing),
+            )
+            if existing:
+                await self._write(existing)
+            return len(existing)
+        return len(batch)
+
+    async def _without_deleted_urls(
+        self,
+        batch: List[Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        url_ids = {transition["url_id"] for transition in batch}
+        async with self.engine.connect() as conn:
+            result = await conn.execute(
+                select(UrlModel.id).where(UrlModel.id.in_(url_ids)),
+            )
+            existing_ids = set(result.scalars())
+        return [
+            transition for transition in batch if transition["url_id"] in existing_ids
+        ]
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> None:
+        async with self.engine.begin() as conn:
+            await conn.execute(insert(TransitionModel).values(batch))
+            await update_rollups(transitions=batch, connection=conn)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(
+                    self._flush_requested.wait(),
+                    timeout=self.flush_interval,
+                )
+            except asyncio.TimeoutError:
+                pass  # noqa: WPS420
+            self._flush_requested.clear()
+            await self.flush()
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel
 
@@ -13,3 +13,24 @@ class TransitionOut(BaseModel):
     class Config:
         title = "TransitionOutSchema"
         orm_mode = True
+
+
+class TransitionPage(BaseModel):
+    """Page of transitions with the cursor of the next page scheme."""
+
+    items: List[TransitionOut]
+    next_cursor: Optional[str] = None
+
+    class Config:
+        title = "TransitionPageSchema"
+
+
+class TransitionStatsOut(BaseModel):
+    """Output transitions count per hour or day scheme."""
+
+    bucket: datetime
+    count: int
+
+    class Config:
+        title = "TransitionStatsOutSchema"
+        orm_mode = True
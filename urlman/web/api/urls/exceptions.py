@@ -19,3 +19,13 @@ class UrlKeyMatchingException(HTTPException):
             status_code=400,
             detail="Wrong URL key.",
         )
+
+
+class UrlBulkLimitException(HTTPException):
+    """Raised when too many urls are sent at once."""
+
+    def __init__(self, limit: int) -> None:
+        super(UrlBulkLimitException, self).__init__(
+            status_code=413,
+            detail=f"No more than {limit} urls can be processed at once.",
+        )
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from urlman.db.models import UrlModel
+from urlman.services.bloom import BloomFilter
+from urlman.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Urls of transactions still running are not visible to a refresh, but their
+# creation time is at least the start of their transaction. The next refresh
+# looks for urls created since the oldest transaction open before this one,
+# the own one included. It is queried first, so the snapshot of the activity
+# precedes the one of urls.
+WATERMARK_QUERY = (
+    "SELECT min(xact_start) FROM pg_stat_activity " "WHERE datname = current_database()"
+)
+LOAD_CHUNK_SIZE = 10000
+
+
+class ShortCodeFilter:
+    """
+    Bloom filter of the short codes existing in the database.
+
+    Every worker keeps its own filter. Codes created by other workers
+    are added by a background task refreshing the filter every
+    ``refresh_interval`` seconds with its own connection of ``engine``,
+    so they are rejected at most that long after their commit.
+    Until the filter is loaded every code is reported as existing.
+
+    A filter grown over its capacity is rebuilt from all urls
+    by the same task, the old filter is used until the new one is ready.
+    """
+
+    def __init__(
+        self,
+        *,
+        error_rate: float = 0.001,
+        refresh_interval: float = 1,
+        min_capacity: int = 100000,
+    ) -> None:
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self.min_capacity = min_capacity
+        self.bloom: Optional[BloomFilter] = None
+        self.rejected = 0
+        self.refreshes = 0
+        self.engine: Optional[AsyncEngine] = None
+        self._watermark: Optional[datetime] = None
+        self._refresh_task: Optional["asyncio.Task[None]"] = None
+
+    def add(self, short_code: str) -> None:
+        """
+        Add code created by the current worker.
+
+        :param short_code: created short code.
+        """
+        if self.bloom is not None and short_code not in self.bloom:
+            self.bloom.add(short_code)
+
+    def may_exist(self, short_code: str) -> bool:
+        """
+        Check whether the short code can exist.
+
+        :param short_code: checked short code.
+        :return: False only if the code definitely does not exist.
+        """
+        if self.bloom is None or short_code in self.bloom:
+            return True
+        self.rejected += 1
+        return False
+
+    async def load(self, session: AsyncSession) -> None:
+        """
+        Build the filter from all urls.
+
+        :param session: database session.
+        """
+        watermark = await session.scalar(text(WATERMARK_QUERY))
+        urls_count = await session.scalar(select(func.count(UrlModel.id)))
+        bloom = BloomFilter(
+            capacity=max(urls_count * 2, self.min_capacity),
+            error_rate=self.error_rate,
+        )
+        await self._load_codes(bloom, None, session)
+        self.bloom = bloom
+        self._watermark = watermark
+
+    async def refresh(self, session: AsyncSession) -> None:
+        """
+        Add urls created since the previous load or refresh.
+
+        A filter grown over its capacity is built again.
+
+        :param session: database session.
+        """
+        if self.bloom is None or self._watermark is None:
+            await self.load(session)
+            return
+        self.refreshes += 1
+        watermark = await session.scalar(text(WATERMARK_QUERY))
+        await self._load_codes(self.bloom, self._watermark, session)
+        self._watermark = watermark
+        if len(self.bloom) > self.bloom.capacity:
+            await self.load(session)
+
+    def start(self) -> None:
+        """Start refreshing the filter with connections of the engine."""
+        if self.engine is not None and self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_periodically())
+
+    async def stop(self) -> None:
+        """Stop refreshing the filter."""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+            self._refresh_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get filter counters.
+
+        :return: size, memory, false-positive rate and rejected lookups.
+        """
+        filter_stats: Dict[str, Any] = {
+            "rejected": self.rejected,
+            "refreshes": self.refreshes,
+        }
+        if self.bloom is not None:
+            filter_stats.update(self.bloom.stats())
+        return filter_stats
+
+    async def _refresh_periodically(self) -> None:
+        while True:  # noqa: WPS457
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                async with AsyncSession(self.engine) as session:
+                    await self.refresh(session)
+            except Exception:
+                logger.exception("Failed to refresh short codes filter")
+
+    async def _load_codes(
+        self,
+        bloom: BloomFilter,
+        since: Optional[datetime],
+        session: AsyncSession,
+    ) -> None:
+        stmt = select(UrlModel.short_code).execution_options(
+            yield_per=LOAD_CHUNK_SIZE,
+        )
+        if since is not None:
+            stmt = stmt.where(UrlModel.created_at >= since)
+        result = await session.stream_scalars(stmt)
+        async for short_code in result:
+            if short_code not in bloom:
+                bloom.add(short_code)
+
+
+shortcode_filter = ShortCodeFilter(
+    error_rate=settings.shortcode_filter_error_rate,
+    refresh_interval=settings.shortcode_filter_refresh_interval,
+)
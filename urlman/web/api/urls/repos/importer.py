@@ -0,0 +1,232 @@
+import codecs
+import csv
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import ujson
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from urlman.db.models.user import UserModel
+from urlman.services.generators import shortcode_allocator
+from urlman.settings import settings
+from urlman.web.api.urls.repos.filters import shortcode_filter
+from urlman.web.api.urls.repos.selectors import url_cache
+from urlman.web.api.urls.repos.services import check_url
+from urlman.web.api.urls.schemas import UrlImportError, UrlImportResult, UrlIn
+
+IMPORT_FIELDS = ("url", "short_code", "is_protected", "key")
+STAGING_COLUMNS = ("line", "id", "url", "short_code", "is_protected", "key")
+
+CREATE_STAGING_QUERY = (
+    "CREATE TEMPORARY TABLE url_import ("
+    "line integer, id uuid, url text, short_code text, "
+    "is_protected boolean, key text"
+    ") ON COMMIT DROP"
+)
+
+# The first line of every short code wins, the rest are conflicts.
+MERGE_QUERY = (
+    "INSERT INTO urls (id, url, short_code, is_protected, key, "
+    "is_deleted, user_id, created_at, updated_at) "
+    "SELECT DISTINCT ON (short_code) id, url, short_code, is_protected, key, "
+    "false, :user_id, now(), now() "
+    "FROM url_import ORDER BY short_code, line "
+    "ON CONFLICT (short_code) DO NOTHING "
+    "RETURNING short_code"
+)
+
+CONFLICTS_QUERY = (
+    "SELECT line, short_code FROM url_import "
+    "WHERE NOT EXISTS (SELECT 1 FROM urls WHERE urls.id = url_import.id) "
+    "ORDER BY line"
+)
+
+DROP_STAGING_QUERY = "DROP TABLE url_import"
+
+ImportRecord = Tuple[int, Dict[str, Any]]
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Split stream of bytes to text lines.
+
+    :param chunks: chunks of UTF-8 encoded file.
+    :yield: lines without line breaks.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    tail = ""
+    async for chunk in chunks:
+        lines = (tail + decoder.decode(chunk)).split("\n")
+        tail = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail.rstrip("\r")
+
+
+async def iter_records(
+    chunks: AsyncIterator[bytes],
+    import_format: str,
+) -> AsyncIterator[ImportRecord]:
+    """
+    Parse urls from CSV with a header or from NDJSON, one url per line.
+
+    Malformed lines are yielded as records without fields,
+    so they are reported as invalid instead of failing the import.
+
+    :param chunks: chunks of UTF-8 encoded file.
+    :param import_format: "csv" or "ndjson".
+    :yield: line number and fields of the url.
+    """
+    header: Optional[List[str]] = None
+    line_number = 0
+    async for line in iter_lines(chunks):
+        line_number += 1
+        if not line.strip():
+            continue
+        if import_format == "ndjson":
+            yield line_number, _parse_ndjson_line(line)
+            continue
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        yield line_number, {
+            name: field_value
+            for name, field_value in zip(header, values)
+            if name in IMPORT_FIELDS and field_value != ""
+        }
+
+
+def _parse_ndjson_line(line: str) -> Dict[str, Any]:
+    try:
+        record = ujson.loads(line)
+    except ValueError:
+        return {}
+    return record if isinstance(record, dict) else {}
+
+
+async def import_urls(
+    *,
+    records: AsyncIterator[ImportRecord],
+    user: UserModel,
+    session: AsyncSession,
+) -> UrlImportResult:
+    """
+    Import urls by batches through a staging table.
+
+    Every batch of ``urls_import_batch_size`` valid urls is copied with
+    ``COPY`` to a temporary table, merged into urls skipping taken short
+    codes and committed, so an interrupted import keeps finished batches.
+    Short codes of urls without them are allocated once per batch.
+
+    :param records: parsed lines of the file.
+    :param user: owner of the urls.
+    :param session: database session.
+    :return: counts of created, conflicting and invalid urls
+        with the first ``urls_import_max_errors`` rejected lines.
+    """
+    import_result = UrlImportResult()
+    batch: List[Tuple[int, UrlIn]] = []
+    async for line, record in records:
+        url = _validate_record(line, record, import_result)
+        if url is None:
+            continue
+        batch.append((line, url))
+        if len(batch) >= settings.urls_import_batch_size:
+            await _import_batch(batch, user, session, import_result)
+            batch = []
+    if batch:
+        await _import_batch(batch, user, session, import_result)
+    return import_result
+
+
+def _validate_record(
+    line: int,
+    record: Dict[str, Any],
+    import_result: UrlImportResult,
+) -> Optional[UrlIn]:
+    detail = None
+    try:
+        url = UrlIn.parse_obj(record)
+    except ValidationError as error:
+        detail = "; ".join(
+            f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in error.errors()
+        )
+    else:
+        detail = check_url(url)
+    if detail is None:
+        return url
+    import_result.invalid += 1
+    _add_error(
+        import_result,
+        UrlImportError(
+            line=line,
+            short_code=record.get("short_code"),
+            status="invalid",
+            detail=detail,
+        ),
+    )
+    return None
+
+
+async def _import_batch(
+    batch: List[Tuple[int, UrlIn]],
+    user: UserModel,
+    session: AsyncSession,
+    import_result: UrlImportResult,
+) -> None:
+    generated = iter(
+        await shortcode_allocator.allocate_many(
+            sum(1 for _, url in batch if not url.short_code),
+            session,
+        ),
+    )
+    staged_records = [
+        (
+            line,
+            uuid.uuid4(),
+            url.url,
+            url.short_code or next(generated),
+            url.is_protected,
+            url.key,
+        )
+        for line, url in batch
+    ]
+    await session.execute(text(CREATE_STAGING_QUERY))
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        "url_import",
+        records=staged_records,
+        columns=STAGING_COLUMNS,
+    )
+    merge_result = await session.execute(text(MERGE_QUERY), {"user_id": user.id})
+    created_codes = merge_result.scalars().all()
+    conflicts = (await session.execute(text(CONFLICTS_QUERY))).all()
+    await session.execute(text(DROP_STAGING_QUERY))
+    await session.commit()
+
+    for short_code in created_codes:
+        shortcode_filter.add(short_code)
+    await url_cache.delete_many(created_codes)
+    import_result.created += len(created_codes)
+    import_result.conflicts += len(conflicts)
+    for line, short_code in conflicts:
+        _add_error(
+            import_result,
+            UrlImportError(
+                line=line,
+                short_code=short_code,
+                status="conflict",
+                detail="Short code is already taken",
+            ),
+        )
+
+
+def _add_error(import_result: UrlImportResult, error: UrlImportError) -> None:
+    if len(import_result.errors) < settings.urls_import_max_errors:
+        import_result.errors.append(error)
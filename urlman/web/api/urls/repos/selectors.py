@@ -1,12 +1,41 @@
-from typing import List, Optional
+import uuid
+import weakref
+from typing import Any, Optional
 
+import ujson
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
+from sqlalchemy.sql import Select
 from starlette.requests import Request
 
 from urlman.db.models import UrlModel
 from urlman.db.models.user import UserModel
+from urlman.services.cache import create_cache_backend
+from urlman.settings import settings
+from urlman.web.api.urls.repos.filters import shortcode_filter
+from urlman.web.api.urls.schemas import UrlRedirect
+from urlman.web.metrics import redirects
+
+# Cached value of the short codes which do not exist.
+NOT_FOUND = ""
+
+REDIRECT_QUERY = (
+    "SELECT id, url, is_protected, key FROM urls "
+    "WHERE short_code = $1 AND is_deleted = false"
+)
+
+# Prepared redirect statements of the raw asyncpg connections.
+_redirect_statements: "weakref.WeakKeyDictionary[Any, Any]" = (
+    weakref.WeakKeyDictionary()
+)
+
+url_cache = create_cache_backend(
+    namespace="url",
+    ttl=settings.url_cache_ttl,
+    maxsize=settings.url_cache_size,
+    local_ttl=settings.url_cache_local_ttl,
+)
 
 
 async def get_shorted_url_by_id(
@@ -49,24 +78,105 @@ async def get_url_by_shortcode(
     return result.scalars().first()
 
 
-async def get_list_shorted_urls(
-    user: UserModel,
+async def fetch_redirect_by_shortcode(
+    url_shortcode: str,
     session: AsyncSession,
-) -> List[UrlModel]:
-    """Get shorted urls of current user."""
-    stmt = select(UrlModel).where(
-        UrlModel.user == user,
-        UrlModel.is_deleted == False,
+) -> Optional[UrlRedirect]:
+    """
+    Get redirect target by shortcode with a prepared asyncpg statement.
+
+    With ``db_statement_cache_size`` of 0, e.g. behind pgbouncer in
+    transaction mode, named statements can't be kept on a connection,
+    so the query is sent without preparing it explicitly.
+    """
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    driver_connection = raw_connection.driver_connection
+    if settings.db_statement_cache_size == 0:
+        row = await driver_connection.fetchrow(REDIRECT_QUERY, url_shortcode)
+    else:
+        statement = await _prepare_redirect(driver_connection)
+        row = await statement.fetchrow(url_shortcode)
+    if row is None:
+        return None
+    return UrlRedirect(
+        id=row["id"],
+        url=row["url"],
+        is_protected=bool(row["is_protected"]),
+        key=row["key"],
     )
-    result = await session.execute(stmt)
-    return result.scalars().fetchall()
 
 
-async def get_all_urls(session: AsyncSession) -> List[UrlModel]:
-    """Get all shorted urls."""
-    stmt = select(UrlModel).order_by(UrlModel.created_at)
-    result = await session.execute(stmt)
-    return result.scalars().fetchall()
+async def _prepare_redirect(driver_connection: Any) -> Any:
+    statement = _redirect_statements.get(driver_connection)
+    if statement is None:
+        statement = await driver_connection.prepare(REDIRECT_QUERY)
+        _redirect_statements[driver_connection] = statement
+    return statement
+
+
+def dump_url_redirect(redirect: UrlRedirect) -> str:
+    """Serialize redirect target for the cache."""
+    return ujson.dumps(
+        [str(redirect.id), redirect.url, redirect.is_protected, redirect.key],
+    )
+
+
+def load_url_redirect(cached_redirect: str) -> UrlRedirect:
+    """Deserialize redirect target from the cache."""
+    url_id, url, is_protected, key = ujson.loads(cached_redirect)
+    return UrlRedirect(
+        id=uuid.UUID(url_id),
+        url=url,
+        is_protected=is_protected,
+        key=key,
+    )
+
+
+async def get_redirect_by_shortcode(
+    url_shortcode: str,
+    session: AsyncSession,
+) -> Optional[UrlRedirect]:
+    """Get redirect target by shortcode from filter, cache or db."""
+    if not shortcode_filter.may_exist(url_shortcode):
+        redirects.inc("filtered")
+        return None
+    cached_redirect = await url_cache.get(url_shortcode)
+    if cached_redirect == NOT_FOUND:
+        redirects.inc("cache_not_found")
+        return None
+    if cached_redirect is not None:
+        redirects.inc("cache_hit")
+        return load_url_redirect(cached_redirect)
+    redirect = await fetch_redirect_by_shortcode(
+        url_shortcode=url_shortcode,
+        session=session,
+    )
+    redirects.inc("db_not_found" if redirect is None else "db_hit")
+    if redirect is None:
+        await url_cache.set(
+            url_shortcode,
+            NOT_FOUND,
+            ttl=min(settings.url_negative_cache_ttl, url_cache.ttl),
+        )
+        return None
+    await url_cache.set(url_shortcode, dump_url_redirect(redirect))
+    return redirect
+
+
+def list_shorted_urls_query(user: UserModel) -> Select:
+    """Build query of shorted urls of current user."""
+    return (
+        select(UrlModel)
+        .where(
+            UrlModel.user_id == user.id,
+            UrlModel.is_deleted == False,
+        )
+        .order_by(
+            UrlModel.created_at,
+            UrlModel.id,
+        )
+    )
 
 
 async def get_client_ip(request: Request) -> str:
@@ -1,16 +1,32 @@
-from typing import Optional
+import uuid
+from typing import Any, Dict, List, Optional, Union
 
 from fastapi import HTTPException
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy import func
+from sqlalchemy import any_, bindparam, delete, func, select, tuple_, update
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, insert
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from urlman.db.models.transition import TransitionModel
 from urlman.db.models.urls import UrlModel
 from urlman.db.models.user import UserModel
-from urlman.services.generators import generate_shortcode
+from urlman.services.generators import shortcode_allocator
+from urlman.settings import settings
 from urlman.web.api.urls.exceptions import UrlKeyMatchingException, UrlNotFoundException
-from urlman.web.api.urls.repos.selectors import get_shorted_url_by_id
-from urlman.web.api.urls.schemas import UrlIn, UrlUpdate
+from urlman.web.api.urls.repos.filters import shortcode_filter
+from urlman.web.api.urls.repos.selectors import get_shorted_url_by_id, url_cache
+from urlman.web.api.urls.schemas import (
+    UrlBulkDelete,
+    UrlBulkResult,
+    UrlIn,
+    UrlOut,
+    UrlRedirect,
+    UrlUpdate,
+)
+
+# Bind parameters asyncpg sends with one statement at most.
+MAX_BIND_PARAMS = 32767
 
 
 async def create_shorted_url(
@@ -21,7 +37,7 @@ async def create_shorted_url(
 ) -> Optional[UrlModel]:
     """Create new shorted url."""
     if not url.short_code:
-        url.short_code = await generate_shortcode()
+        url.short_code = await shortcode_allocator.allocate(session)
     if url.is_protected and not url.key:
         raise HTTPException(
             status_code=400,
@@ -37,10 +53,153 @@ async def create_shorted_url(
     )
     session.add(shorted_url)
     await session.commit()
+    shortcode_filter.add(shorted_url.short_code)
+    await url_cache.delete(shorted_url.short_code)
     await session.refresh(shorted_url)
     return shorted_url
 
 
+def check_url(url: UrlIn) -> Optional[str]:
+    """
+    Check url which is inserted without the ORM.
+
+    A value too long for its column would fail the whole multi-row insert.
+
+    :param url: url to create.
+    :return: why the url is invalid, None if it is valid.
+    """
+    if url.is_protected and not url.key:
+        return "Protected url must have a key"
+    for field in ("url", "short_code", "key"):
+        field_value = getattr(url, field)
+        max_length = UrlModel.__table__.columns[field].type.length
+        if field_value and len(field_value) > max_length:
+            return f"{field}: longer than {max_length} characters"
+    return None
+
+
+async def bulk_create_shorted_urls(
+    *,
+    urls: List[UrlIn],
+    user: UserModel,
+    session: AsyncSession,
+) -> List[UrlBulkResult]:
+    """
+    Create many shorted urls with multi-row inserts.
+
+    Urls are inserted by chunks with ``ON CONFLICT DO NOTHING``,
+    so a taken short code doesn't fail the whole request but is reported
+    as a conflict. Allocated codes taken by codes chosen by users are
+    replaced with new ones. Urls failing ``check_url`` are reported
+    as invalid and not inserted. All chunks are committed in one transaction.
+
+    :param urls: urls to create.
+    :param user: owner of the urls.
+    :param session: database session.
+    :return: result for every url in the order of the input.
+    """
+    results: List[UrlBulkResult] = []
+    rows: Dict[str, Dict[str, Any]] = {}
+    indexes: Dict[str, int] = {}
+    generated: Dict[int, UrlIn] = {}
+    for index, url in enumerate(urls):
+        invalid_detail = check_url(url)
+        if invalid_detail is not None:
+            status, detail = "invalid", invalid_detail
+        elif not url.short_code:
+            generated[index] = url
+            status, detail = "created", None
+        elif url.short_code in rows:
+            status, detail = "conflict", "Short code is repeated in the request"
+        else:
+            status, detail = "conflict", "Short code is already taken"
+            indexes[url.short_code] = index
+            rows[url.short_code] = _url_row(url, url.short_code, user)
+        results.append(
+            UrlBulkResult(
+                index=index,
+                status=status,
+                short_code=url.short_code,
+                detail=detail,
+            ),
+        )
+
+    created = {
+        indexes[row.short_code]: row
+        for row in await _insert_urls(rows=list(rows.values()), session=session)
+    }
+    created.update(
+        await _insert_generated_urls(urls=generated, user=user, session=session),
+    )
+    await session.commit()
+    for index, row in created.items():
+        results[index] = UrlBulkResult(
+            index=index,
+            status="created",
+            short_code=row.short_code,
+            url=UrlOut.from_orm(row),
+        )
+        shortcode_filter.add(row.short_code)
+    await url_cache.delete_many(row.short_code for row in created.values())
+    return results
+
+
+async def _insert_generated_urls(
+    *,
+    urls: Dict[int, UrlIn],
+    user: UserModel,
+    session: AsyncSession,
+) -> Dict[int, Row]:
+    created: Dict[int, Row] = {}
+    pending = list(urls)
+    while pending:
+        short_codes = await shortcode_allocator.allocate_many(len(pending), session)
+        indexes = dict(zip(short_codes, pending))
+        rows = [
+            _url_row(urls[index], short_code, user)
+            for short_code, index in indexes.items()
+        ]
+        for row in await _insert_urls(rows=rows, session=session):
+            created[indexes[row.short_code]] = row
+        pending = [index for index in pending if index not in created]
+    return created
+
+
+def _url_row(url: UrlIn, short_code: str, user: UserModel) -> Dict[str, Any]:
+    return {
+        "id": uuid.uuid4(),
+        "url": url.url,
+        "short_code": short_code,
+        "is_protected": url.is_protected,
+        "key": url.key,
+        "is_deleted": False,
+        "user_id": user.id,
+    }
+
+
+async def _insert_urls(
+    *,
+    rows: List[Dict[str, Any]],
+    session: AsyncSession,
+) -> List[Row]:
+    inserted: List[Row] = []
+    # Every column of a row can be a bind parameter of the statement.
+    chunk_size = min(
+        settings.urls_bulk_chunk_size,
+        MAX_BIND_PARAMS // len(UrlModel.__table__.columns),
+    )
+    for start in range(0, len(rows), chunk_size):
+        stmt = (
+            insert(UrlModel)
+            .values(rows[start : start + chunk_size])
+            .on_conflict_do_nothing(index_elements=[UrlModel.short_code])
+            .returning(*UrlModel.__table__.columns)
+        )
+        result = await session.execute(stmt)
+        inserted.extend(result.all())
+    return inserted
+
+
 async def update_shorted_url(
     *,
     url_id: str,
@@ -68,6 +227,7 @@ async def update_shorted_url(
         raise UrlKeyMatchingException()
 
     await session.commit()
+    await url_cache.delete(url.short_code)
     await session.refresh(url)
     return url
 
@@ -87,6 +247,7 @@ async def delete_shorted_url(
         raise UrlNotFoundException()
     await session.delete(url)
     await session.commit()
+    await url_cache.delete(url.short_code)
 
 
 async def soft_delete_shorted_url(
@@ -99,6 +260,7 @@ async def soft_delete_shorted_url(
     url = await get_shorted_url_by_id(
         session=session,
         url_id=url_id,
+        child=True,
     )
 
     if (url is None) or (url.user != user) or url.is_deleted:
@@ -107,12 +269,159 @@ async def soft_delete_shorted_url(
     url.is_deleted = True
     url.deleted_at = func.now()
     await session.commit()
+    await url_cache.delete(url.short_code)
     return url
 
 
+async def bulk_soft_delete_shorted_urls(
+    *,
+    selection: UrlBulkDelete,
+    user: UserModel,
+    session: AsyncSession,
+) -> int:
+    """
+    Mark selected urls of the user as deleted.
+
+    Every chunk of ``urls_bulk_chunk_size`` urls is updated
+    with one statement and committed, so rows are not locked
+    until the whole selection is processed.
+
+    :param selection: ids of the urls and/or the creation date limit.
+    :param user: owner of the urls.
+    :param session: database session.
+    :return: number of deleted urls.
+    """
+    deleted_count = 0
+    for chunk in await _select_url_id_chunks(selection, user, session):
+        short_codes = await _soft_delete_urls(chunk, user, session)
+        await url_cache.delete_many(short_codes)
+        deleted_count += len(short_codes)
+    return deleted_count
+
+
+async def bulk_delete_shorted_urls(
+    *,
+    selection: UrlBulkDelete,
+    user: UserModel,
+    session: AsyncSession,
+) -> int:
+    """
+    Delete selected urls of the user from db.
+
+    Unlike the single delete, urls already marked as deleted are
+    removed too. Transitions are kept without the url as the ORM does,
+    rollups are removed by the database cascade.
+
+    Every chunk of urls is marked as deleted first, so redirects stop
+    writing their transitions. Transitions are unlinked in batches of
+    ``urls_bulk_transitions_batch_size`` committed one by one, then
+    the urls are deleted with the transitions written meanwhile unlinked.
+
+    :param selection: ids of the urls and/or the creation date limit.
+    :param user: owner of the urls.
+    :param session: database session.
+    :return: number of deleted urls.
+    """
+    deleted_count = 0
+    for chunk in await _select_url_id_chunks(selection, user, session):
+        await url_cache.delete_many(
+            await _soft_delete_urls(chunk, user, session),
+        )
+        await _unlink_transitions(chunk, session)
+        await session.execute(
+            update(TransitionModel)
+            .where(TransitionModel.url_id == any_(_url_ids_param(chunk)))
+            .values(url_id=None)
+            .execution_options(synchronize_session=False),
+        )
+        stmt = (
+            delete(UrlModel)
+            .where(
+                UrlModel.id == any_(_url_ids_param(chunk)),
+                UrlModel.user_id == user.id,
+            )
+            .returning(UrlModel.short_code)
+            .execution_options(synchronize_session=False)
+        )
+        short_codes = (await session.execute(stmt)).scalars().all()
+        await session.commit()
+        await url_cache.delete_many(short_codes)
+        deleted_count += len(short_codes)
+    return deleted_count
+
+
+async def _soft_delete_urls(
+    url_ids: List[uuid.UUID],
+    user: UserModel,
+    session: AsyncSession,
+) -> List[str]:
+    stmt = (
+        update(UrlModel)
+        .where(
+            UrlModel.id == any_(_url_ids_param(url_ids)),
+            UrlModel.user_id == user.id,
+            UrlModel.is_deleted == False,
+        )
+        .values(is_deleted=True, deleted_at=func.now())
+        .returning(UrlModel.short_code)
+        .execution_options(synchronize_session=False)
+    )
+    short_codes = (await session.execute(stmt)).scalars().all()
+    await session.commit()
+    return short_codes
+
+
+async def _unlink_transitions(
+    url_ids: List[uuid.UUID],
+    session: AsyncSession,
+) -> None:
+    batch_size = settings.urls_bulk_transitions_batch_size
+    batch = (
+        select(TransitionModel.id, TransitionModel.check_time)
+        .where(TransitionModel.url_id == any_(_url_ids_param(url_ids)))
+        .limit(batch_size)
+    )
+    stmt = (
+        update(TransitionModel)
+        .where(tuple_(TransitionModel.id, TransitionModel.check_time).in_(batch))
+        .values(url_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    unlinked = batch_size
+    while unlinked == batch_size:
+        unlinked = (await session.execute(stmt)).rowcount
+        await session.commit()
+
+
+async def _select_url_id_chunks(
+    selection: UrlBulkDelete,
+    user: UserModel,
+    session: AsyncSession,
+) -> List[List[uuid.UUID]]:
+    stmt = select(UrlModel.id).where(UrlModel.user_id == user.id)
+    if selection.ids is not None:
+        stmt = stmt.where(UrlModel.id == any_(_url_ids_param(selection.ids)))
+    if selection.created_before is not None:
+        stmt = stmt.where(UrlModel.created_at < selection.created_before)
+    url_ids = (await session.execute(stmt.order_by(UrlModel.id))).scalars().all()
+    chunk_size = settings.urls_bulk_chunk_size
+    return [
+        url_ids[start : start + chunk_size]
+        for start in range(0, len(url_ids), chunk_size)
+    ]
+
+
+def _url_ids_param(url_ids: List[uuid.UUID]) -> Any:
+    return bindparam(
+        None,
+        url_ids,
+        type_=ARRAY(UUID(as_uuid=True)),
+    )
+
+
 async def confirm_url_key(
     *,
-    shorted_url: UrlModel,
+    shorted_url: Union[UrlModel, UrlRedirect],
     key: Optional[str],
     raise_exception: bool = True,
 ) -> bool:
@@ -1,8 +1,8 @@
 import uuid
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, NamedTuple, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, root_validator
 
 from urlman.web.api.transitions.schemas import TransitionOut
 
@@ -47,8 +47,9 @@ class UrlOut(UrlBase):
 
 
 class UrlExtended(UrlOut):
-    """Output Url scheme."""
+    """Output Url scheme with the latest transitions."""
 
+    transitions_count: int = 0
     transitions: List[TransitionOut]
 
     class Config:
@@ -64,6 +65,74 @@ class UrlIn(UrlBase):
         orm_mode = True
 
 
+class UrlBulkResult(BaseModel):
+    """Result of creating one url of the bulk scheme."""
+
+    index: int
+    status: Literal["created", "conflict", "invalid"]
+    short_code: Optional[str]
+    url: Optional[UrlOut] = None
+    detail: Optional[str] = None
+
+    class Config:
+        title = "UrlBulkResultScheme"
+
+
+class UrlImportError(BaseModel):
+    """Rejected line of the imported file scheme."""
+
+    line: int
+    short_code: Optional[str]
+    status: Literal["conflict", "invalid"]
+    detail: str
+
+    class Config:
+        title = "UrlImportErrorScheme"
+
+
+class UrlImportResult(BaseModel):
+    """Summary of the imported file scheme."""
+
+    created: int = 0
+    conflicts: int = 0
+    invalid: int = 0
+    errors: List[UrlImportError] = []
+
+    class Config:
+        title = "UrlImportResultScheme"
+
+
+class UrlBulkDelete(BaseModel):
+    """Selection of urls deleted at once."""
+
+    ids: Optional[List[uuid.UUID]] = None
+    created_before: Optional[datetime] = None
+
+    @root_validator
+    def selection_validation(cls, values):
+        """Selection must not match all urls implicitly."""
+        if values.get("ids") is None and values.get("created_before") is None:
+            raise ValueError("ids or created_before must be given")
+        return values
+
+    class Config:
+        title = "UrlBulkDeleteScheme"
+        schema_extra = {
+            "example": {
+                "created_before": "2022-01-01T00:00:00+00:00",
+            },
+        }
+
+
+class UrlBulkDeleteResult(BaseModel):
+    """Number of urls deleted at once."""
+
+    count: int
+
+    class Config:
+        title = "UrlBulkDeleteResultScheme"
+
+
 class UrlUpdate(BaseModel):
     """Update Url scheme."""
 
@@ -73,3 +142,12 @@ class UrlUpdate(BaseModel):
 
     class Config:
         title = "UrlUpdateScheme"
+
+
+class UrlRedirect(NamedTuple):
+    """Fields of shorted url needed by the redirect."""
+
+    id: uuid.UUID
+    url: str
+    is_protected: bool
+    key: Optional[str]
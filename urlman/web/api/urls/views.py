@@ -1,32 +1,68 @@
-from typing import Optional
+from datetime import datetime
+from typing import AsyncIterator, List, Literal, Optional, Sequence
 
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import RedirectResponse
-from fastapi_pagination import LimitOffsetPage, paginate
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import RedirectResponse, StreamingResponse
+from fastapi_pagination import LimitOffsetPage
+from fastapi_pagination.ext.async_sqlalchemy import paginate
+from sqlalchemy.engine import Row
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.background import BackgroundTask
 from starlette.requests import Request
 
-from urlman.db.dependencies import get_db_session
+from urlman.db.dependencies import get_db_read_session, get_db_session
 from urlman.db.models.user import UserModel
-from urlman.web.api.transitions.repos.selectors import get_transitions_by_url
-from urlman.web.api.transitions.repos.services import create_transition
-from urlman.web.api.transitions.schemas import TransitionOut
-from urlman.web.api.urls.exceptions import UrlNotFoundException
+from urlman.settings import settings
+from urlman.web.api.transitions.dependencies import get_transition_writer
+from urlman.web.api.transitions.repos.export import (
+    EXPORT_FORMATS,
+    export_transitions,
+)
+from urlman.web.api.transitions.repos.selectors import (
+    get_recent_transitions,
+    get_transitions_count,
+    get_transitions_page,
+    get_transitions_stats,
+    stream_transitions,
+)
+from urlman.web.api.transitions.repos.writer import TransitionWriter
+from urlman.web.api.transitions.schemas import (
+    TransitionOut,
+    TransitionPage,
+    TransitionStatsOut,
+)
+from urlman.web.api.urls.exceptions import (
+    UrlBulkLimitException,
+    UrlNotFoundException,
+)
+from urlman.web.api.urls.repos.importer import import_urls, iter_records
 from urlman.web.api.urls.repos.selectors import (
     get_client_ip,
-    get_list_shorted_urls,
+    get_redirect_by_shortcode,
     get_shorted_url_by_id,
-    get_url_by_shortcode,
+    list_shorted_urls_query,
 )
 from urlman.web.api.urls.repos.services import (
+    bulk_create_shorted_urls,
+    bulk_delete_shorted_urls,
+    bulk_soft_delete_shorted_urls,
     confirm_url_key,
     create_shorted_url,
     delete_shorted_url,
     soft_delete_shorted_url,
     update_shorted_url,
 )
-from urlman.web.api.urls.schemas import UrlExtended, UrlIn, UrlOut, UrlUpdate
+from urlman.web.api.urls.schemas import (
+    UrlBulkDelete,
+    UrlBulkDeleteResult,
+    UrlBulkResult,
+    UrlExtended,
+    UrlImportResult,
+    UrlIn,
+    UrlOut,
+    UrlUpdate,
+)
 from urlman.web.api.users.repos.selectors import get_current_user
 
 router = APIRouter()
@@ -38,21 +74,13 @@ async def redirect(
     request: Request,
     key: Optional[str] = None,
     session: AsyncSession = Depends(get_db_session),
+    transition_writer: TransitionWriter = Depends(get_transition_writer),
 ):
     """Redirecting endpoint."""
-    try:
-        shorted_url = await get_url_by_shortcode(
-            url_shortcode=short_code,
-            session=session,
-        )
-        client_ip = await get_client_ip(request=request)
-        await create_transition(
-            client_ip=client_ip,
-            url=shorted_url,
-            session=session,
-        )
-    except IntegrityError as ie:
-        raise HTTPException(status_code=400, detail=str(ie.orig))
+    shorted_url = await get_redirect_by_shortcode(
+        url_shortcode=short_code,
+        session=session,
+    )
     if not shorted_url:
         raise UrlNotFoundException()
     if shorted_url.is_protected:
@@ -61,10 +89,102 @@ async def redirect(
             key=key,
             raise_exception=True,
         )
+    client_ip = await get_client_ip(request=request)
+    # Transition is buffered after the response is sent,
+    # so waiting of the "block" overflow policy doesn't delay it.
     return RedirectResponse(
         url=shorted_url.url,
         status_code=302,
+        background=BackgroundTask(
+            transition_writer.put,
+            client_ip=client_ip,
+            url_id=shorted_url.id,
+        ),
+    )
+
+
+@router.post("/import", response_model=UrlImportResult, status_code=200)
+async def import_urls_file(
+    request: Request,
+    import_format: Literal["csv", "ndjson"] = Query("csv", alias="format"),
+    current_user: UserModel = Depends(get_current_user),
+    session: AsyncSession = Depends(get_db_session),
+):
+    """
+    Import urls from the CSV or NDJSON request body.
+
+    CSV must have a header with any of url, short_code,
+    is_protected and key columns.
+    """
+    try:
+        import_result = await import_urls(
+            records=iter_records(request.stream(), import_format),
+            user=current_user,
+            session=session,
+        )
+    except IntegrityError as ie:
+        raise HTTPException(status_code=400, detail=str(ie.orig))
+    return import_result
+
+
+@router.patch(
+    "/bulk/soft_delete",
+    response_model=UrlBulkDeleteResult,
+    status_code=200,
+)
+async def bulk_delete_urls_soft(
+    selection: UrlBulkDelete,
+    current_user: UserModel = Depends(get_current_user),
+    session: AsyncSession = Depends(get_db_session),
+):
+    """Soft delete urls selected by ids and/or creation date."""
+    _check_bulk_limit(selection)
+    try:
+        count = await bulk_soft_delete_shorted_urls(
+            selection=selection,
+            user=current_user,
+            session=session,
+        )
+    except IntegrityError as ie:
+        raise HTTPException(status_code=400, detail=str(ie.orig))
+    return UrlBulkDeleteResult(count=count)
+
+
+@router.delete("/bulk", response_model=UrlBulkDeleteResult, status_code=200)
+async def bulk_delete_urls_hard(
+    selection: UrlBulkDelete,
+    current_user: UserModel = Depends(get_current_user),
+    session: AsyncSession = Depends(get_db_session),
+):
+    """Delete urls selected by ids and/or creation date."""
+    _check_bulk_limit(selection)
+    try:
+        count = await bulk_delete_shorted_urls(
+            selection=selection,
+            user=current_user,
+            session=session,
+        )
+    except IntegrityError as ie:
+        raise HTTPException(status_code=400, detail=str(ie.orig))
+    return UrlBulkDeleteResult(count=count)
+
+
+@router.get("/transitions/export", status_code=200)
+async def export_user_transitions(
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: UserModel = Depends(get_current_user),
+    session: AsyncSession = Depends(get_db_read_session),
+):
+    """Stream transitions of all current user urls."""
+    chunks = stream_transitions(
+        user=current_user,
+        since=since,
+        until=until,
+        session=session,
     )
+    return _export_response(chunks, export_format, "transitions")
 
 
 @router.get("/{url_id}", response_model=UrlExtended, status_code=200)
@@ -73,33 +193,44 @@ async def get_single_url(
     current_user: UserModel = Depends(get_current_user),
     session: AsyncSession = Depends(get_db_session),
 ):
-    """Get single shorted url by id."""
+    """Get single shorted url by id with the latest transitions."""
     try:
         shorted_url = await get_shorted_url_by_id(
             url_id=url_id,
+            child=True,
+            session=session,
+        )
+        if not shorted_url:
+            raise UrlNotFoundException()
+        transitions_count = await get_transitions_count(
+            url=shorted_url,
+            session=session,
+        )
+        transitions = await get_recent_transitions(
+            url=shorted_url,
+            limit=settings.url_recent_transitions,
             session=session,
         )
     except IntegrityError as ie:
         raise HTTPException(status_code=400, detail=str(ie.orig))
-    if not shorted_url:
-        raise UrlNotFoundException()
-    return shorted_url
+    return UrlExtended(
+        **UrlOut.from_orm(shorted_url).dict(),
+        transitions_count=transitions_count,
+        transitions=[TransitionOut.from_orm(transition) for transition in transitions],
+    )
 
 
 @router.get("", response_model=LimitOffsetPage[UrlOut], status_code=200)
 async def get_list_urls(
     current_user: UserModel = Depends(get_current_user),
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncSession = Depends(get_db_read_session),
 ):
     """Get list of current users urls."""
     try:
-        urls = await get_list_shorted_urls(
-            user=current_user,
-            session=session,
-        )
+        page = await paginate(session, list_shorted_urls_query(user=current_user))
     except IntegrityError as ie:
         raise HTTPException(400, detail=str(ie.orig))
-    return paginate(urls)
+    return page
 
 
 @router.post("", response_model=UrlOut, status_code=201)
@@ -120,6 +251,26 @@ async def create_url(
     return shorted_url
 
 
+@router.post("/bulk", response_model=List[UrlBulkResult], status_code=201)
+async def bulk_create_urls(
+    urls: List[UrlIn],
+    current_user: UserModel = Depends(get_current_user),
+    session: AsyncSession = Depends(get_db_session),
+):
+    """Create many shorted urls reporting the result of each one."""
+    if len(urls) > settings.urls_bulk_max_items:
+        raise UrlBulkLimitException(settings.urls_bulk_max_items)
+    try:
+        results = await bulk_create_shorted_urls(
+            urls=urls,
+            user=current_user,
+            session=session,
+        )
+    except IntegrityError as ie:
+        raise HTTPException(status_code=400, detail=str(ie.orig))
+    return results
+
+
 @router.patch("/{url_id}", response_model=UrlOut, status_code=200)
 async def update_url(
     url_id: str,
@@ -176,26 +327,115 @@ async def delete_url_hard(
 
 @router.get(
     "/{url_id}/transitions",
-    response_model=LimitOffsetPage[TransitionOut],
+    response_model=TransitionPage,
     status_code=200,
 )
 async def get_url_transitions(
     url_id: str,
+    cursor: Optional[str] = None,
+    size: int = Query(50, ge=1, le=500),
     current_user: UserModel = Depends(get_current_user),
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncSession = Depends(get_db_read_session),
 ):
-    """Get all url transitions."""
+    """Get url transitions page by page, oldest first."""
     try:
         url = await get_shorted_url_by_id(
             url_id=url_id,
+            child=True,
             session=session,
         )
-        if url.user != current_user:
+        if (url is None) or (url.user_id != current_user.id):
             raise UrlNotFoundException()
-        transitions = await get_transitions_by_url(
+        page = await get_transitions_page(
             url=url,
+            cursor=cursor,
+            size=size,
             session=session,
         )
     except IntegrityError as ie:
         raise HTTPException(status_code=400, detail=str(ie.orig))
-    return paginate(transitions)
+    return page
+
+
+@router.get(
+    "/{url_id}/stats",
+    response_model=List[TransitionStatsOut],
+    status_code=200,
+)
+async def get_url_stats(
+    url_id: str,
+    granularity: Literal["hour", "day"] = "day",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: UserModel = Depends(get_current_user),
+    session: AsyncSession = Depends(get_db_read_session),
+):
+    """Get url transitions count per hour or day."""
+    try:
+        url = await get_shorted_url_by_id(
+            url_id=url_id,
+            child=True,
+            session=session,
+        )
+        if (url is None) or (url.user_id != current_user.id):
+            raise UrlNotFoundException()
+        stats = await get_transitions_stats(
+            url=url,
+            granularity=granularity,
+            since=since,
+            until=until,
+            session=session,
+        )
+    except IntegrityError as ie:
+        raise HTTPException(status_code=400, detail=str(ie.orig))
+    return stats
+
+
+@router.get("/{url_id}/transitions/export", status_code=200)
+async def export_url_transitions(
+    url_id: str,
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: UserModel = Depends(get_current_user),
+    session: AsyncSession = Depends(get_db_read_session),
+):
+    """Stream url transitions, oldest first."""
+    try:
+        url = await get_shorted_url_by_id(
+            url_id=url_id,
+            child=True,
+            session=session,
+        )
+    except IntegrityError as ie:
+        raise HTTPException(status_code=400, detail=str(ie.orig))
+    if (url is None) or (url.user_id != current_user.id):
+        raise UrlNotFoundException()
+    chunks = stream_transitions(
+        user=current_user,
+        url=url,
+        since=since,
+        until=until,
+        session=session,
+    )
+    return _export_response(chunks, export_format, f"transitions_{url.short_code}")
+
+
+def _export_response(
+    chunks: AsyncIterator[Sequence[Row]],
+    export_format: str,
+    filename: str,
+) -> StreamingResponse:
+    media_type, extension, _ = EXPORT_FORMATS[export_format]
+    return StreamingResponse(
+        export_transitions(chunks, export_format),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{extension}"',
+        },
+    )
+
+
+def _check_bulk_limit(selection: UrlBulkDelete) -> None:
+    if selection.ids and len(selection.ids) > settings.urls_bulk_max_items:
+        raise UrlBulkLimitException(settings.urls_bulk_max_items)
@@ -40,3 +40,14 @@ class UserPasswordMismatchException(HTTPException):
             status_code=400,
             detail="Passwords don't match",
         )
+
+
+class PasswordHashingBusyException(HTTPException):
+    """Raised when passwords can't be hashed because of the load."""
+
+    def __init__(self) -> None:
+        super(PasswordHashingBusyException, self).__init__(
+            status_code=503,
+            detail="Too many password checks, try again later.",
+            headers={"Retry-After": "1"},
+        )
@@ -1,13 +1,19 @@
-from typing import List, Optional
+import uuid
+from datetime import datetime
+from typing import Optional
 
+import ujson
 from fastapi import Depends
+from fastapi.encoders import jsonable_encoder
 from fastapi.security import HTTPAuthorizationCredentials
-from sqlalchemy import select
+from sqlalchemy import DateTime, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, make_transient_to_detached
+from sqlalchemy.sql import Select
 
 from urlman.db.dependencies import get_db_session
 from urlman.db.models import UserModel
+from urlman.services.cache import create_cache_backend
 from urlman.settings import settings
 from urlman.web.api.auth import jwt_auth
 from urlman.web.api.users.exceptions import (
@@ -15,6 +21,18 @@ from urlman.web.api.users.exceptions import (
     UserNotProvidedException,
 )
 
+# Cached value of the deleted users, their tokens are rejected without the db.
+DELETED = ""
+# Password hashes are not cached, they are read from the db when verified.
+UNCACHED_USER_COLUMNS = frozenset(("password",))
+
+user_cache = create_cache_backend(
+    namespace="user",
+    ttl=settings.user_cache_ttl,
+    maxsize=settings.user_cache_size,
+    local_ttl=settings.user_cache_local_ttl,
+)
+
 
 async def get_user_by_id(*, user_id: str, session: AsyncSession) -> Optional[UserModel]:
     """Get user by id(UUID) from db."""
@@ -42,26 +60,59 @@ async def get_user_by_username(
     return result.scalars().first()
 
 
-async def get_users(*, session: AsyncSession) -> List[UserModel]:
-    """Get all active user."""
-    stmt = (
+def dump_user(user: UserModel) -> str:
+    """Serialize user columns for the cache, the password excluded."""
+    return ujson.dumps(
+        {
+            column.key: jsonable_encoder(getattr(user, column.key))
+            for column in UserModel.__table__.columns
+            if column.key not in UNCACHED_USER_COLUMNS
+        },
+    )
+
+
+def load_user(cached_user: str) -> UserModel:
+    """Deserialize detached user from the cache."""
+    user_data = ujson.loads(cached_user)
+    for column in UserModel.__table__.columns:
+        if isinstance(column.type, DateTime) and user_data.get(column.key):
+            user_data[column.key] = datetime.fromisoformat(user_data[column.key])
+    user_data["id"] = uuid.UUID(user_data["id"])
+    user = UserModel(**user_data)
+    make_transient_to_detached(user)
+    return user
+
+
+async def get_cached_user_by_username(
+    *,
+    username: str,
+    session: AsyncSession,
+) -> Optional[UserModel]:
+    """Get user by username from cache or db."""
+    cached_user = await user_cache.get(username)
+    if cached_user == DELETED:
+        return None
+    if cached_user is not None:
+        return await session.merge(load_user(cached_user), load=False)
+    user = await get_user_by_username(username=username, session=session)
+    if user is not None:
+        # Deletion written meanwhile is not overwritten with the read user.
+        await user_cache.add(username, dump_user(user))
+    return user
+
+
+def users_query() -> Select:
+    """Build query of all active users."""
+    return (
         select(UserModel)
         .where(
             UserModel.is_deleted == False,
         )
         .order_by(
             UserModel.created_at,
+            UserModel.id,
         )
     )
-    result = await session.execute(stmt)
-    return result.scalars().fetchall()
-
-
-async def get_all_users(*, session: AsyncSession) -> List[UserModel]:
-    """Get all users from db."""
-    stmt = select(UserModel).order_by(UserModel.created_at)
-    result = await session.execute(stmt)
-    return result.scalars().fetchall()
 
 
 async def get_current_user(
@@ -71,10 +122,17 @@ async def get_current_user(
 ) -> Optional[UserModel]:
     """Getting the current user."""
     try:
-        username = jwt_auth.decode_token(token=token.credentials)
+        claims = jwt_auth.verify_token(token=token.credentials)
     except Exception:
         raise UserNotProvidedException()
-    user = await get_user_by_username(username=username, session=session)
-    if user is None:
+    user = await get_cached_user_by_username(
+        username=claims.subject,
+        session=session,
+    )
+    if (user is None) or user.is_deleted:
+        raise UserCredentialsException()
+    if (user.tokens_revoked_at is not None) and (
+        claims.issued_at < user.tokens_revoked_at.timestamp()
+    ):
         raise UserCredentialsException()
     return user
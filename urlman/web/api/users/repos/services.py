@@ -1,3 +1,4 @@
+from datetime import datetime, timezone
 from typing import Optional
 
 from fastapi.encoders import jsonable_encoder
@@ -5,18 +6,40 @@ from sqlalchemy import func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from urlman.db.models.user import UserModel
-from urlman.services.hashing import hash_password, verify_password
+from urlman.services.hashing import HashingBusyError, password_hasher
 from urlman.web.api.users.exceptions import (
+    PasswordHashingBusyException,
     UserNotFoundException,
     UserPasswordMismatchException,
 )
-from urlman.web.api.users.repos.selectors import get_user_by_id
+from urlman.web.api.users.repos.selectors import (
+    DELETED,
+    dump_user,
+    get_user_by_id,
+    user_cache,
+)
 from urlman.web.api.users.schemas import UserChangePassword, UserIn, UserUpdate
 
 
+async def hash_user_password(password: str) -> str:
+    """Hash password without blocking the event loop."""
+    try:
+        return await password_hasher.hash(password)
+    except HashingBusyError:
+        raise PasswordHashingBusyException()
+
+
+async def check_user_password(*, user: UserModel, password: str) -> bool:
+    """Verify user password without blocking the event loop."""
+    try:
+        return await password_hasher.verify(user.password, password)
+    except HashingBusyError:
+        raise PasswordHashingBusyException()
+
+
 async def register_user(*, user: UserIn, session: AsyncSession) -> UserModel:
     """Create new user."""
-    hashed_password = hash_password(user.password)
+    hashed_password = await hash_user_password(user.password)
     user = UserModel(
         username=user.username,
         email=user.email,
@@ -26,6 +49,7 @@ async def register_user(*, user: UserIn, session: AsyncSession) -> UserModel:
     )
     session.add(user)
     await session.commit()
+    await user_cache.delete(user.username)
     await session.refresh(user)
     return user
 
@@ -43,9 +67,10 @@ async def update_user(
     )
     if user is None:
         raise UserNotFoundException()
+    username = user.username
 
     updated_data = data.dict(exclude_none=True, exclude_unset=True)
-    hashed_password = hash_password(updated_data.get("password"))
+    hashed_password = await hash_user_password(updated_data.get("password"))
     updated_data["password"] = hashed_password
 
     user_data = jsonable_encoder(
@@ -58,6 +83,7 @@ async def update_user(
         if field in updated_data:
             setattr(user, field, updated_data.get(field))
     await session.commit()
+    await user_cache.delete(username)
     return user
 
 
@@ -77,6 +103,7 @@ async def soft_delete_user(
     user.is_deleted = True
     user.deleted_at = func.now()
     await session.commit()
+    await user_cache.set(user.username, DELETED)
     return user
 
 
@@ -94,6 +121,17 @@ async def delete_user(
         raise UserNotFoundException()
     await session.delete(user)
     await session.commit()
+    await user_cache.set(user.username, DELETED)
+
+
+async def revoke_user_tokens(*, user: UserModel, session: AsyncSession) -> None:
+    """Reject all tokens issued to the user until now."""
+    user.tokens_revoked_at = datetime.now(timezone.utc)
+    await session.commit()
+    await session.refresh(user)
+    # Lookups which read the user before the revocation only add to the cache,
+    # so they don't replace the revoked user.
+    await user_cache.set(user.username, dump_user(user))
 
 
 async def change_user_password(
@@ -102,13 +140,19 @@ async def change_user_password(
     creds: UserChangePassword,
     session: AsyncSession,
 ) -> None:
-    """Change user password."""
+    """Change user password, verifying the current one read from the db."""
     creds_data = creds.dict(exclude_none=True, exclude_unset=True)
-    if verify_password(
-        db_password=user.password,
-        verifiable_password=creds_data.pop("password"),
-    ):
-        user.password = hash_password(creds_data.pop("new_password"))
+    user = await session.get(
+        UserModel,
+        user.id,
+        populate_existing=True,
+        with_for_update=True,
+    )
+    if user is None:
+        raise UserNotFoundException()
+    if await check_user_password(user=user, password=creds_data.pop("password")):
+        user.password = await hash_user_password(creds_data.pop("new_password"))
         await session.commit()
+        await user_cache.delete(user.username)
     else:
         raise UserPasswordMismatchException()
@@ -1,11 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi_pagination import LimitOffsetPage, paginate
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi_pagination import LimitOffsetPage
+from fastapi_pagination.ext.async_sqlalchemy import paginate
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from urlman.db.dependencies import get_db_session
+from urlman.db.dependencies import get_db_read_session, get_db_session
 from urlman.db.models import UserModel
-from urlman.services.hashing import verify_password
 from urlman.web.api.auth import jwt_auth
 from urlman.web.api.auth.schemas import AccessToken
 from urlman.web.api.users.exceptions import UserNotFoundException
@@ -13,12 +13,14 @@ from urlman.web.api.users.repos.selectors import (
     get_current_user,
     get_user_by_id,
     get_user_by_username,
-    get_users,
+    users_query,
 )
 from urlman.web.api.users.repos.services import (
     change_user_password,
+    check_user_password,
     delete_user,
     register_user,
+    revoke_user_tokens,
     soft_delete_user,
     update_user,
 )
@@ -64,15 +66,11 @@ async def get_single_user(
 
 @router.get("", response_model=LimitOffsetPage[UserOut], status_code=200)
 async def get_list_users(
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncSession = Depends(get_db_read_session),
     current_user: UserModel = Depends(get_current_user),
 ):
     """Get list of undeleted active Users."""
-    users = await get_users(
-        session=session,
-    )
-
-    return paginate(users)
+    return await paginate(session, users_query())
 
 
 @router.post("/register", response_model=UserOut, status_code=201)
@@ -101,11 +99,11 @@ async def login(
         )
     except IntegrityError as ie:
         raise HTTPException(status_code=400, detail=str(ie.orig))
-    if user is None:
+    if (user is None) or user.is_deleted:
         raise UserNotFoundException()
-    if not verify_password(
-        db_password=user.password,
-        verifiable_password=user_credentials.password,
+    if not await check_user_password(
+        user=user,
+        password=user_credentials.password,
     ):
         raise UserNotFoundException()
     access_token = jwt_auth.encode_token(username=user.username)
@@ -129,6 +127,16 @@ async def change_password(
         raise HTTPException(status_code=400, detail=str(ie.orig))
 
 
+@router.patch("/revoke_tokens", status_code=204)
+async def revoke_tokens(
+    current_user: UserModel = Depends(get_current_user),
+    session: AsyncSession = Depends(get_db_session),
+):
+    """Revoke all tokens of the current user, including the used one."""
+    await revoke_user_tokens(user=current_user, session=session)
+    return Response(status_code=204)
+
+
 @router.patch("/{user_id}", response_model=UserOut, status_code=200)
 async def update_single_user(
     user_id: str,
@@ -164,6 +172,7 @@ async def delete_user_soft(
         )
     except IntegrityError as ie:
         raise HTTPException(status_code=400, detail=str(ie.orig))
+    return Response(status_code=204)
 
 
 @router.delete("/{user_id}", status_code=200)
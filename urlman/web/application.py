@@ -6,6 +6,7 @@ from fastapi_pagination import add_pagination
 
 from urlman.web.api.router import api_router
 from urlman.web.lifetime import shutdown, startup
+from urlman.web.metrics import MetricsMiddleware, QueryStatsMiddleware
 
 tags_metadata = [
     {
@@ -40,6 +41,8 @@ def get_app() -> FastAPI:
     app.on_event("shutdown")(shutdown(app))
 
     app.include_router(router=api_router, prefix="/api")
+    app.add_middleware(QueryStatsMiddleware)
+    app.add_middleware(MetricsMiddleware)
 
     add_pagination(app)
     return app
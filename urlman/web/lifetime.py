@@ -1,29 +1,64 @@
+import asyncio
+import logging
 from asyncio import current_task
 from typing import Awaitable, Callable
 
 from fastapi import FastAPI
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_scoped_session,
     create_async_engine,
 )
 from sqlalchemy.orm import sessionmaker
 
+from urlman.db.pool import MeasuredQueuePool, PoolMetrics
+from urlman.db.replica import ReplicaMonitor
+from urlman.services.hashing import password_hasher
 from urlman.settings import settings
+from urlman.web.api.transitions.repos.partitions import create_future_partitions
+from urlman.web.api.transitions.repos.writer import TransitionWriter
+from urlman.web.api.urls.repos.filters import shortcode_filter
+from urlman.web.metrics import listen_queries
 
+logger = logging.getLogger(__name__)
 
-def _setup_db(app: FastAPI) -> None:
+
+def _create_engine(url: str, pool_metrics: PoolMetrics) -> AsyncEngine:
     """
-    Create connection to the database.
+    Create engine with the configured pool.
 
-    This function creates SQLAlchemy engine instance,
-    session_factory for creating sessions
-    and stores them in the application's state property.
+    :param url: database URL.
+    :param pool_metrics: metrics of the engine pool.
+    :return: engine.
+    """
+    engine = create_async_engine(
+        url,
+        echo=settings.db_echo,
+        poolclass=MeasuredQueuePool,
+        metrics=pool_metrics,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args={
+            "timeout": settings.db_connect_timeout,
+            "statement_cache_size": settings.db_statement_cache_size,
+        },
+    )
+    pool_metrics.listen(engine)
+    return engine
 
-    :param app: fastAPI application.
+
+def _create_session_factory(engine: AsyncEngine) -> async_scoped_session:
     """
-    engine = create_async_engine(str(settings.db_url), echo=settings.db_echo)
-    session_factory = async_scoped_session(
+    Create factory of sessions scoped by the current task.
+
+    :param engine: engine of the sessions.
+    :return: session factory.
+    """
+    return async_scoped_session(
         sessionmaker(
             engine,
             expire_on_commit=False,
@@ -31,8 +66,131 @@ def _setup_db(app: FastAPI) -> None:
         ),
         scopefunc=current_task,
     )
+
+
+def _setup_db(app: FastAPI) -> None:
+    """
+    Create connection to the database.
+
+    This function creates SQLAlchemy engine instance,
+    session_factory for creating sessions
+    and stores them in the application's state property.
+
+    :param app: fastAPI application.
+    """
+    pool_metrics = PoolMetrics()
+    engine = _create_engine(str(settings.db_url), pool_metrics)
+    listen_queries(engine, "primary")
     app.state.db_engine = engine
-    app.state.db_session_factory = session_factory
+    app.state.db_pool_metrics = pool_metrics
+    app.state.db_session_factory = _create_session_factory(engine)
+
+
+async def _setup_db_replica(app: FastAPI) -> None:
+    """
+    Create connection to the read replica if it is configured.
+
+    :param app: fastAPI application.
+    """
+    app.state.db_replica = None
+    app.state.db_read_session_factory = None
+    if settings.db_replica_url is None:
+        return
+    pool_metrics = PoolMetrics()
+    engine = _create_engine(str(settings.db_replica_url), pool_metrics)
+    listen_queries(engine, "replica")
+    replica = ReplicaMonitor(
+        engine,
+        max_lag=settings.db_replica_max_lag,
+        check_interval=settings.db_replica_check_interval,
+    )
+    await replica.start()
+    app.state.db_replica = replica
+    app.state.db_replica_pool_metrics = pool_metrics
+    app.state.db_read_session_factory = _create_session_factory(engine)
+
+
+async def _setup_transition_writer(app: FastAPI) -> None:
+    """
+    Start buffered writer of transitions.
+
+    :param app: fastAPI application.
+    """
+    writer = TransitionWriter(
+        engine=app.state.db_engine,
+        batch_size=settings.transitions_batch_size,
+        flush_interval=settings.transitions_flush_interval,
+        buffer_size=settings.transitions_buffer_size,
+        overflow_policy=settings.transitions_overflow_policy,
+        put_timeout=settings.transitions_put_timeout,
+    )
+    await writer.start()
+    app.state.transition_writer = writer
+
+
+async def _setup_shortcode_filter(app: FastAPI) -> None:
+    """
+    Build bloom filter of existing short codes and start refreshing it.
+
+    :param app: fastAPI application.
+    """
+    if not settings.shortcode_filter_enabled:
+        return
+    shortcode_filter.engine = app.state.db_engine
+    async with app.state.db_session_factory() as session:
+        await shortcode_filter.load(session)
+    await app.state.db_session_factory.remove()
+    shortcode_filter.start()
+
+
+def _check_cache_backend() -> None:
+    """Warn that invalidations of the in-process caches are not shared."""
+    if settings.cache_backend == "memory" and settings.workers_count > 1:
+        logger.warning(
+            "Memory cache of %d workers: urls and users changed by a worker "
+            "are seen by the others only after %s and %s seconds, "
+            "use the redis cache backend to share invalidations",
+            settings.workers_count,
+            settings.url_cache_local_ttl,
+            settings.user_cache_local_ttl,
+        )
+
+
+def _setup_password_hasher() -> None:
+    """Start processes hashing passwords."""
+    password_hasher.start(
+        workers=settings.password_hash_workers,
+        queue_timeout=settings.password_hash_queue_timeout,
+    )
+
+
+async def _maintain_transition_partitions(app: FastAPI) -> None:
+    """
+    Create future partitions of transitions periodically.
+
+    :param app: fastAPI application.
+    """
+    while True:  # noqa: WPS457
+        try:
+            async with app.state.db_engine.begin() as conn:
+                created = await create_future_partitions(conn)
+        except Exception:
+            logger.exception("Failed to create transitions partitions")
+        else:
+            if created:
+                logger.info("Created transitions partitions %s", created)
+        await asyncio.sleep(settings.transitions_partitions_check_interval)
+
+
+def _setup_transition_partitions(app: FastAPI) -> None:
+    """
+    Start creation of future partitions of transitions.
+
+    :param app: fastAPI application.
+    """
+    app.state.partitions_task = asyncio.create_task(
+        _maintain_transition_partitions(app),
+    )
 
 
 def startup(app: FastAPI) -> Callable[[], Awaitable[None]]:
@@ -47,7 +205,13 @@ def startup(app: FastAPI) -> Callable[[], Awaitable[None]]:
     """
 
     async def _startup() -> None:
+        _check_cache_backend()
         _setup_db(app)
+        await _setup_db_replica(app)
+        _setup_password_hasher()
+        _setup_transition_partitions(app)
+        await _setup_transition_writer(app)
+        await _setup_shortcode_filter(app)
 
     return _startup
 
@@ -61,6 +225,13 @@ def shutdown(app: FastAPI) -> Callable[[], Awaitable[None]]:
     """
 
     async def _shutdown() -> None:
+        app.state.partitions_task.cancel()
+        await app.state.transition_writer.stop()
+        await shortcode_filter.stop()
+        password_hasher.stop()
         await app.state.db_engine.dispose()
+        if app.state.db_replica is not None:
+            await app.state.db_replica.stop()
+            await app.state.db_replica.engine.dispose()
 
     return _shutdown
@@ -0,0 +1,297 @@
+"""Metrics of the worker exposed in the Prometheus text format."""
+import collections
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from urlman.services.metrics import Counter, Gauge, HistogramMetric, Metric
+from urlman.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Requests which matched no route share one label value.
+UNMATCHED_ROUTE = "unmatched"
+
+http_requests = Counter(
+    "urlman_http_requests_total",
+    "HTTP requests by route template and status code.",
+    ("method", "route", "status"),
+)
+http_request_duration = HistogramMetric(
+    "urlman_http_request_duration_seconds",
+    "Time to handle HTTP requests by route template.",
+    ("method", "route"),
+)
+http_requests_in_flight = Gauge(
+    "urlman_http_requests_in_flight",
+    "HTTP requests being handled.",
+)
+redirects = Counter(
+    "urlman_redirects_total",
+    "Redirect lookups by the place the answer was found.",
+    ("result",),
+)
+db_query_duration = HistogramMetric(
+    "urlman_db_query_duration_seconds",
+    "Time to execute SQL statements through SQLAlchemy.",
+    ("database", "statement"),
+)
+
+APPLICATION_METRICS: List[Metric] = [
+    http_requests,
+    http_request_duration,
+    http_requests_in_flight,
+    redirects,
+    db_query_duration,
+]
+
+STATEMENT_KINDS = frozenset(("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"))
+# Logged statements are cut to this many characters.
+LOGGED_STATEMENT_LENGTH = 1000
+
+
+class RequestQueries:
+    """Statements executed while handling one request."""
+
+    def __init__(self, track_statements: bool = False) -> None:
+        self.count = 0
+        self.duration = 0.0
+        self.statements: Optional["collections.Counter[str]"] = (
+            collections.Counter() if track_statements else None
+        )
+
+    def add(self, statement: str, duration: float) -> None:
+        """
+        Account an executed statement.
+
+        :param statement: SQL statement.
+        :param duration: execution time in seconds.
+        """
+        self.count += 1
+        self.duration += duration
+        if self.statements is not None:
+            self.statements[statement] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """
+        Find statements executed many times.
+
+        :param threshold: minimal number of executions.
+        :return: statements with their executions, most repeated first.
+        """
+        if self.statements is None:
+            return []
+        return [
+            (statement, executions)
+            for statement, executions in self.statements.most_common()
+            if executions >= threshold
+        ]
+
+    def server_timing(self) -> str:
+        """
+        Format totals as a Server-Timing metric.
+
+        :return: value of the Server-Timing header.
+        """
+        return f'db;desc="{self.count} queries";dur={self.duration * 1000:.3f}'
+
+
+# Statements of the request handled by the current task.
+request_queries: ContextVar[Optional[RequestQueries]] = ContextVar(
+    "request_queries",
+    default=None,
+)
+
+
+class MetricsMiddleware:
+    """
+    Measures every HTTP request.
+
+    Requests are labelled with templates of the matched routes,
+    e.g. ``/api/urls/redirect/{short_code}``, so short codes and ids
+    don't create new series.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self._route_templates: Dict[Callable[..., Any], str] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            route = self._route_template(scope)
+            http_requests.inc(scope["method"], route, status)
+            http_request_duration.observe(duration, scope["method"], route)
+
+    def _route_template(self, scope: Scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        if not self._route_templates:
+            self._route_templates = {
+                route.endpoint: route.path
+                for route in scope["app"].routes
+                if hasattr(route, "endpoint")
+            }
+        return self._route_templates.get(endpoint, UNMATCHED_ROUTE)
+
+
+class QueryStatsMiddleware:
+    """
+    Counts statements and database time of every HTTP request.
+
+    Totals are sent in the ``Server-Timing`` header, so statements
+    executed while a response is streamed are not included.
+    With ``db_detect_n_plus_one`` statements repeated within
+    a request are logged as likely N+1 patterns.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries(track_statements=settings.db_detect_n_plus_one)
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", queries.server_timing())
+            await send(message)
+
+        token = request_queries.set(queries)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_queries.reset(token)
+            for statement, executions in queries.repeated(
+                settings.db_n_plus_one_threshold,
+            ):
+                logger.warning(
+                    "Possible N+1 in %s %s, statement executed %d times: %s",
+                    scope["method"],
+                    scope["path"],
+                    executions,
+                    statement[:LOGGED_STATEMENT_LENGTH],
+                )
+
+
+class QueryListener:
+    """
+    Measures statements executed by an engine.
+
+    Durations go to the histogram and to the current request totals,
+    statements slower than ``db_slow_query_threshold`` are logged.
+    """
+
+    def __init__(self, database: str) -> None:
+        self.database = database
+
+    def listen(self, engine: AsyncEngine) -> None:
+        """
+        Listen to the statements of the engine.
+
+        :param engine: measured engine.
+        """
+        sync_engine = engine.sync_engine
+        event.listen(sync_engine, "before_cursor_execute", self.before_execute)
+        event.listen(sync_engine, "after_cursor_execute", self.after_execute)
+        event.listen(sync_engine, "handle_error", self.handle_error)
+
+    def before_execute(self, conn: Any, *args: Any) -> None:
+        """
+        Remember start of the statement.
+
+        :param conn: connection of the statement.
+        :param args: other event arguments.
+        """
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def after_execute(
+        self,
+        conn: Any,
+        cursor: Any,
+        statement: str,
+        *args: Any,
+    ) -> None:
+        """
+        Account the executed statement.
+
+        :param conn: connection of the statement.
+        :param cursor: DBAPI cursor.
+        :param statement: SQL statement.
+        :param args: other event arguments.
+        """
+        duration = time.perf_counter() - conn.info["query_started"].pop()
+        db_query_duration.observe(duration, self.database, statement_kind(statement))
+        queries = request_queries.get()
+        if queries is not None:
+            queries.add(statement, duration)
+        threshold = settings.db_slow_query_threshold
+        if (threshold is not None) and (duration >= threshold):
+            logger.warning(
+                "Slow query on %s took %.3fs: %s",
+                self.database,
+                duration,
+                statement[:LOGGED_STATEMENT_LENGTH],
+            )
+
+    def handle_error(self, context: Any) -> None:
+        """
+        Forget start of the failed statement.
+
+        :param context: exception context.
+        """
+        if context.connection is None:
+            return
+        started = context.connection.info.get("query_started")
+        if started:
+            started.pop()
+
+
+def listen_queries(engine: AsyncEngine, database: str) -> None:
+    """
+    Measure statements executed by the engine.
+
+    :param engine: measured engine.
+    :param database: label of the engine, e.g. "primary".
+    """
+    QueryListener(database).listen(engine)
+
+
+def statement_kind(statement: str) -> str:
+    """
+    Get bounded label of a statement.
+
+    :param statement: SQL statement.
+    :return: first keyword of usual statements, "OTHER" for the rest.
+    """
+    words = statement.lstrip()[:10].split(None, 1)
+    keyword = words[0].upper() if words else ""
+    return keyword if keyword in STATEMENT_KINDS else "OTHER"